@@ -2,6 +2,7 @@ from typing import Optional
 
 from django.contrib import admin
 from django.urls.exceptions import NoReverseMatch
+from django.utils.timezone import now
 from django.utils.translation import gettext_lazy as _
 from django.utils.encoding import force_str
 
@@ -24,6 +25,8 @@ except Exception:  # pragma: no cover - fallback when versioning not installed
     VersioningMixin = object
 
 from . import models
+from .utils import autocomplete
+from .utils.cache import bump_cache_version, bump_section_version
 
 try:
     from djangocms_versioning.admin import ExtendedIndicatorVersionAdminMixin
@@ -36,8 +39,38 @@ except Exception:  # pragma: no cover - fallback when versioning not installed
     VersioningMixin = type("VersioningMixin", (), {})
 
 
+def update_articles(queryset, **values):
+    """
+    Updates the articles of the queryset with the values in one query, and
+    invalidates what saving them one by one would have. Returns the updated
+    articles, as loaded before the update.
+    """
+    # Read the articles first: the update may take them out of the
+    # queryset, e.g. on a changelist filtered by is_published.
+    articles = list(queryset.select_related(None).only(
+        'pk', 'app_config_id', 'serial_id'))
+    models.Article.objects.filter(
+        pk__in=[article.pk for article in articles],
+    ).update(modified_at=now(), **values)
+    models.ArticleChange.objects.record(
+        articles, models.ArticleChange.UPDATED)
+    for app_config_id in {article.app_config_id for article in articles}:
+        bump_section_version(app_config_id)
+    if 'is_published' in values:
+        # The autocomplete indexes list the published articles.
+        for app_config_id in {article.app_config_id for article in articles}:
+            autocomplete.clear_index(app_config_id)
+        # The episode indexes of the serials list the published episodes.
+        for serial_id in {article.serial_id for article in articles}:
+            if serial_id is not None:
+                bump_cache_version('serial', serial_id)
+    return articles
+
+
 def make_published(modeladmin, request, queryset):
-    queryset.update(is_published=True)
+    articles = update_articles(queryset, is_published=True)
+    models.SectionStatistic.objects.refresh_articles(
+        [article.pk for article in articles])
 
 
 make_published.short_description = _(
@@ -45,7 +78,9 @@ make_published.short_description = _(
 
 
 def make_unpublished(modeladmin, request, queryset):
-    queryset.update(is_published=False)
+    articles = update_articles(queryset, is_published=False)
+    models.SectionStatistic.objects.refresh_articles(
+        [article.pk for article in articles])
 
 
 make_unpublished.short_description = _(
@@ -53,7 +88,7 @@ make_unpublished.short_description = _(
 
 
 def make_featured(modeladmin, request, queryset):
-    queryset.update(is_featured=True)
+    update_articles(queryset, is_featured=True)
 
 
 make_featured.short_description = _(
@@ -61,7 +96,7 @@ make_featured.short_description = _(
 
 
 def make_not_featured(modeladmin, request, queryset):
-    queryset.update(is_featured=False)
+    update_articles(queryset, is_featured=False)
 
 
 make_not_featured.short_description = _(
@@ -261,7 +296,8 @@ class NewsBlogConfigAdmin(
             'app_title', 'permalink_type', 'non_permalink_handling',
             'template_prefix', 'paginate_by', 'pagination_pages_start',
             'pagination_pages_visible', 'exclude_featured',
-            'create_authors', 'hide_author', 'author_no_photo', 'search_indexed', 'config.default_published',
+            'create_authors', 'hide_author', 'author_no_photo', 'search_indexed',
+            'response_cache_duration', 'config.default_published',
         )
 
 
@@ -102,6 +102,15 @@ class NewsBlogConfig(TranslatableModel, AppHookConfig):
         help_text=_('Display "No photo" icon if the user does not have one.'),
     )
 
+    response_cache_duration = models.PositiveIntegerField(
+        _('Response cache duration'),
+        blank=True,
+        default=0,
+        help_text=_(
+            'Cache the article list and detail pages for anonymous visitors '
+            'for up to this many seconds. Zero disables the cache.'),
+    )
+
     # ALDRYN_NEWSBLOG_SEARCH
     search_indexed = models.BooleanField(
         _('Include in search index?'),
@@ -25,7 +25,8 @@ class NewsBlogMenu(CMSAttachMenu):
     def get_nodes(self, request):
         nodes = []
         language = get_language_from_request(request, check_path=True)
-        articles = self.get_queryset(request).active_translations(language)
+        articles = self.get_queryset(request).active_translations(
+            language).profile('menu', language)
 
         if hasattr(self, 'instance') and self.instance:
             app = apphook_pool.get_apphook(self.instance.application_urls)
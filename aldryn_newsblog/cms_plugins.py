@@ -1,4 +1,7 @@
+from django.conf import settings
 from django.template.loader import TemplateDoesNotExist, get_template
+from django.utils.timezone import now
+from django.utils.translation import get_language
 from django.utils.translation import gettext_lazy as _
 
 from cms import __version__ as cms_version
@@ -8,7 +11,9 @@ from cms.plugin_pool import plugin_pool
 from looseversion import LooseVersion
 
 from . import forms, models
-from .utils import add_prefix_to_path, default_reverse
+from .compat import toolbar_edit_mode_active
+from .utils import add_prefix_to_path, default_reverse, get_current_article
+from .utils.utilities import get_valid_languages_from_request
 
 
 CMS_GTE_330 = LooseVersion(cms_version) >= LooseVersion('3.3.0')
@@ -49,7 +54,22 @@ class AdjustableCacheMixin:
         cache = False
 
     def get_cache_expiration(self, request, instance, placeholder):
-        return getattr(instance, 'cache_duration', 0)
+        """
+        Returns the configured cache_duration, shortened so that the cache
+        expires when the next scheduled article of the section goes live.
+        """
+        duration = getattr(instance, 'cache_duration', 0)
+        if not duration:
+            return duration
+        articles = models.Article.objects.all()
+        app_config_id = getattr(instance, 'app_config_id', None)
+        if app_config_id is not None:
+            articles = articles.filter(app_config_id=app_config_id)
+        next_publishing_date = articles.next_publishing_date()
+        if next_publishing_date is None:
+            return duration
+        remaining = int((next_publishing_date - now()).total_seconds())
+        return max(min(duration, remaining), 0)
 
     def get_fieldsets(self, request, obj=None):
         """
@@ -124,12 +144,11 @@ class NewsBlogAuthorsPlugin(NewsBlogPlugin):
 
 
 @plugin_pool.register_plugin
-class NewsBlogCategoriesPlugin(NewsBlogPlugin):
+class NewsBlogCategoriesPlugin(AdjustableCacheMixin, NewsBlogPlugin):
     render_template = 'aldryn_newsblog/plugins/categories.html'
     name = _('Categories')
     model = models.NewsBlogCategoriesPlugin
     form = forms.NewsBlogCategoriesPluginForm
-    cache = False
 
     def render(self, context, instance, placeholder):
         context = super().render(context, instance, placeholder)
@@ -180,15 +199,7 @@ class NewsBlogRelatedPlugin(AdjustableCacheMixin, NewsBlogPlugin):
     form = forms.NewsBlogRelatedPluginForm
 
     def get_article(self, request):
-        if request and request.resolver_match:
-            view_name = request.resolver_match.view_name
-            namespace = request.resolver_match.namespace
-            if view_name == f'{namespace}:article-detail':
-                article = models.Article.objects.active_translations(
-                    slug=request.resolver_match.kwargs['slug'])
-                if article.count() == 1:
-                    return article[0]
-        return None
+        return get_current_article(request)
 
     def render(self, context, instance, placeholder):
         context = super().render(context, instance, placeholder)
@@ -224,9 +235,26 @@ class NewsBlogSerialEpisodesPlugin(AdjustableCacheMixin, NewsBlogPlugin):
     render_template = 'aldryn_newsblog/plugins/serial_episodes.html'
     name = _('Serial episodes')
 
+    # Number of episodes displayed before and after the current one.
+    episodes_window = getattr(
+        settings, 'ALDRYN_NEWSBLOG_SERIAL_EPISODES_WINDOW', 5)
+
     def render(self, context, instance, placeholder):
         context = super().render(context, instance, placeholder)
-        article = context.get('article')
-        if article is not None and article.serial is not None:
-            context['serial_episodes'] = article.serial.article_set.exclude(pk=article.pk).order_by('episode')
+        request = context.get('request')
+        article = get_current_article(request) or context.get('article')
+        if article is not None and article.serial_id is not None:
+            edit_mode = bool(
+                request and getattr(request, 'toolbar', None) and  # noqa: W504
+                toolbar_edit_mode_active(request))
+            if request is not None:
+                languages = get_valid_languages_from_request(
+                    article.app_config.namespace, request)
+            else:
+                languages = [get_language()]
+            episodes, total = models.Article.objects.get_serial_episodes(
+                article, languages, self.episodes_window,
+                published=not edit_mode)
+            context['serial_episodes'] = episodes
+            context['serial_episode_total'] = total
         return context
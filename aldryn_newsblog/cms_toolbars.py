@@ -8,12 +8,11 @@ from cms.toolbar_base import CMSToolbar
 from cms.toolbar_pool import toolbar_pool
 
 from aldryn_apphooks_config.utils import get_app_instance
-from aldryn_translation_tools.utils import (
-    get_admin_url, get_object_from_request,
-)
+from aldryn_translation_tools.utils import get_admin_url
 
 from .cms_appconfig import NewsBlogConfig
 from .models import Article
+from .utils import get_current_article
 
 
 @toolbar_pool.register
@@ -22,6 +21,11 @@ class NewsBlogToolbar(CMSToolbar):
     # see https://github.com/divio/django-cms/issues/4135
     watch_models = [Article, ]
     supported_apps = ('aldryn_newsblog',)
+    # The permissions the menu entries depend on.
+    permissions = (
+        'change_newsblogconfig', 'add_newsblogconfig',
+        'change_article', 'add_article', 'delete_article',
+    )
 
     def get_on_delete_redirect_url(self, article, language):
         with override(language):
@@ -41,41 +45,51 @@ class NewsBlogToolbar(CMSToolbar):
 
         return config
 
+    def get_permissions(self, user):
+        """
+        Returns the set of the permissions (of ``permissions``) the user has,
+        checked at once against the user's cached permissions.
+        """
+        if not (user and user.is_active and user.is_authenticated):
+            return set()
+        if user.is_superuser:
+            return set(self.permissions)
+        user_permissions = user.get_all_permissions()
+        return {
+            permission for permission in self.permissions
+            if f'aldryn_newsblog.{permission}' in user_permissions
+        }
+
     def populate(self):
+        user = getattr(self.request, 'user', None)
+        permissions = self.get_permissions(user)
+        if not permissions:
+            # The user can't use any of the menu entries
+            return
+
         config = self.__get_newsblog_config()
         if not config:
             # Do nothing if there is no NewsBlog app_config to work with
             return
 
-        user = getattr(self.request, 'user', None)
         try:
             view_name = self.request.resolver_match.view_name
         except AttributeError:
             view_name = None
 
-        if user and view_name:
+        if view_name:
             language = get_language_from_request(self.request, check_path=True)
 
-            # If we're on an Article detail page, then get the article
-            if view_name == f'{config.namespace}:article-detail':
-                article = get_object_from_request(Article, self.request)
-            else:
-                article = None
-
             menu = self.toolbar.get_or_create_menu('newsblog-app',
                                                    config.get_app_title())
 
-            change_config_perm = user.has_perm(
-                'aldryn_newsblog.change_newsblogconfig')
-            add_config_perm = user.has_perm(
-                'aldryn_newsblog.add_newsblogconfig')
+            change_config_perm = 'change_newsblogconfig' in permissions
+            add_config_perm = 'add_newsblogconfig' in permissions
             config_perms = [change_config_perm, add_config_perm]
 
-            change_article_perm = user.has_perm(
-                'aldryn_newsblog.change_article')
-            delete_article_perm = user.has_perm(
-                'aldryn_newsblog.delete_article')
-            add_article_perm = user.has_perm('aldryn_newsblog.add_article')
+            change_article_perm = 'change_article' in permissions
+            delete_article_perm = 'delete_article' in permissions
+            add_article_perm = 'add_article' in permissions
             article_perms = [change_article_perm, add_article_perm,
                              delete_article_perm, ]
 
@@ -105,6 +119,14 @@ class NewsBlogToolbar(CMSToolbar):
                 url = get_admin_url('aldryn_newsblog_article_add', **url_args)
                 menu.add_modal_item(_('Add new article'), url=url)
 
+            # If we're on an Article detail page, then get the article, but
+            # only if there are entries for it.
+            if (view_name == f'{config.namespace}:article-detail' and  # noqa: W504
+                    (change_article_perm or delete_article_perm)):
+                article = get_current_article(self.request)
+            else:
+                article = None
+
             if change_article_perm and article:
                 url_args = {}
                 if language:
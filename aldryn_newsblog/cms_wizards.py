@@ -11,22 +11,8 @@ from djangocms_text.html import clean_html
 from djangocms_text.widgets import TextEditorWidget
 from parler.forms import TranslatableModelForm
 
-from .cms_appconfig import NewsBlogConfig
 from .models import Article
-from .utils.utilities import is_valid_namespace
-
-
-def get_published_app_configs():
-    """
-    Returns a list of app_configs that are attached to a published page.
-    """
-    published_configs = []
-    for config in NewsBlogConfig.objects.iterator():
-        # We don't want to let people try to create Articles here, as
-        # they'll just 404 on arrival because the apphook isn't active.
-        if is_valid_namespace(config.namespace):
-            published_configs.append(config)
-    return published_configs
+from .utils import get_published_app_configs
 
 
 class NewsBlogArticleWizard(Wizard):
@@ -34,7 +34,7 @@ class LatestArticlesFeed(Feed):
 
     def get_queryset(self):
         qs = Article.objects.published().namespace(self.namespace).translated(
-            *self.valid_languages)
+            *self.valid_languages).profile('feed')
         return qs
 
     def items(self, obj):
@@ -50,6 +50,9 @@ class LatestArticlesFeed(Feed):
     def item_pubdate(self, item):
         return item.publishing_date
 
+    def item_updateddate(self, item):
+        return max(item.publishing_date, item.modified_at)
+
 
 class TagFeed(LatestArticlesFeed):
 
@@ -36,7 +36,7 @@ class NewsBlogAuthorsPluginForm(AutoAppConfigFormMixin, forms.ModelForm):
 class NewsBlogCategoriesPluginForm(AutoAppConfigFormMixin, forms.ModelForm):
     class Meta:
         model = models.NewsBlogCategoriesPlugin
-        fields = ['app_config']
+        fields = ['app_config', 'cache_duration']
 
 
 class NewsBlogFeaturedArticlesPluginForm(AutoAppConfigFormMixin,
@@ -0,0 +1,58 @@
+from django.core.management.base import BaseCommand
+
+from aldryn_newsblog.cms_appconfig import NewsBlogConfig
+from aldryn_newsblog.models import SectionStatistic
+
+
+class Command(BaseCommand):
+    help = (
+        'Compares the stored article counters of tags, categories and '
+        'authors with the actual articles and optionally repairs them.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--repair',
+            action='store_true',
+            dest='repair',
+            default=False,
+            help='Rebuild the counters of sections with mismatches.',
+        )
+
+    def handle(self, *args, **options):
+        statistics = SectionStatistic.objects
+        mismatched = []
+
+        for app_config in NewsBlogConfig.objects.iterator():
+            errors = 0
+            for object_type, __ in SectionStatistic.OBJECT_TYPE_CHOICES:
+                expected = statistics.compute(app_config.pk, object_type)
+                stored = {
+                    object_id: (published, total)
+                    for object_id, published, total in statistics.filter(
+                        app_config=app_config,
+                        object_type=object_type,
+                    ).values_list('object_id', 'published_count', 'total_count')
+                }
+                for object_id in set(expected) | set(stored):
+                    if expected.get(object_id) != stored.get(object_id):
+                        errors += 1
+                        self.stdout.write(
+                            f'{app_config.namespace}: {object_type} {object_id} '
+                            f'stored {stored.get(object_id)}, '
+                            f'expected {expected.get(object_id)}')
+            if errors:
+                mismatched.append(app_config)
+
+        if not mismatched:
+            self.stdout.write('Article statistics are consistent.')
+            return
+
+        if options['repair']:
+            for app_config in mismatched:
+                statistics.rebuild(app_config.pk)
+            self.stdout.write(
+                f'Repaired the statistics of {len(mismatched)} section(s).')
+        else:
+            self.stdout.write(
+                f'{len(mismatched)} section(s) are inconsistent, '
+                'run with --repair to fix them.')
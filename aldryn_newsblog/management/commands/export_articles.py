@@ -0,0 +1,66 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from aldryn_newsblog.models import Article
+from aldryn_newsblog.utils import export
+
+
+class Command(BaseCommand):
+    help = (
+        'Exports articles as JSON Lines, one article per line with its '
+        'translations, tags, categories, author and urls, or as CSV, one '
+        'article translation per row. The JSON Lines may be imported with '
+        'the import_articles command.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--format',
+            dest='format',
+            choices=sorted(export.FORMATS),
+            default='jsonl',
+        )
+        parser.add_argument(
+            '--output',
+            dest='output',
+            default='-',
+            help='The file to write, or "-" for the standard output.',
+        )
+        parser.add_argument(
+            '--section',
+            action='append',
+            dest='sections',
+            default=None,
+            help='The namespace of a section to export, all by default.',
+        )
+        parser.add_argument(
+            '-l',
+            '--language',
+            action='append',
+            dest='languages',
+            default=None,
+        )
+        parser.add_argument(
+            '--chunk-size',
+            dest='chunk_size',
+            type=int,
+            default=500,
+            help='The number of articles read per batch.',
+        )
+
+    def handle(self, *args, **options):
+        articles = Article.objects.all()
+        if options['sections']:
+            articles = articles.filter(
+                app_config__namespace__in=options['sections'])
+            if not articles.exists():
+                raise CommandError(
+                    f'No articles in the sections {options["sections"]}.')
+        lines = export.get_lines(
+            articles, options['format'], options['languages'],
+            options['chunk_size'])
+        if options['output'] == '-':
+            for line in lines:
+                self.stdout.write(line, ending='')
+        else:
+            with open(options['output'], 'w', encoding='utf-8',
+                      newline='') as stream:
+                stream.writelines(lines)
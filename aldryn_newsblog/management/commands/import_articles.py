@@ -0,0 +1,284 @@
+import json
+import sys
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, router, transaction
+from django.utils.dateparse import parse_datetime
+from django.utils.timezone import now
+
+from cms.models import CMSPlugin, Placeholder
+from cms.plugin_pool import plugin_pool
+
+from aldryn_categories.models import Category
+from djangocms_text.html import clean_html
+from taggit.models import Tag, TaggedItem
+
+from aldryn_newsblog.cms_appconfig import NewsBlogConfig
+from aldryn_newsblog.models import (
+    Article, ArticleChange, SectionStatistic, refresh_search_data,
+)
+from aldryn_newsblog.utils import autocomplete, slugs
+from aldryn_newsblog.utils.cache import bump_section_version
+
+
+TRANSLATED_FIELDS = (
+    'title', 'slug', 'lead_in', 'meta_title', 'meta_description',
+    'meta_keywords',
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Imports articles from a JSON Lines file, one article per line, e.g. '
+        '{"section": "news", "publishing_date": "2024-01-31T12:00:00Z", '
+        '"is_published": true, "author": 1, "tags": ["sport"], '
+        '"categories": ["football"], "translations": {"en": {"title": '
+        '"Hello", "lead_in": "<p>Lead</p>", "body": "<p>Content</p>"}}}. '
+        'Per-object signals are not sent: the search data, statistics and '
+        'caches of the imported articles are rebuilt at the end.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path',
+            help='The file to import, or "-" for the standard input.',
+        )
+        parser.add_argument(
+            '--owner',
+            dest='owner',
+            default=None,
+            help='The username of the owner of articles without "owner".',
+        )
+        parser.add_argument(
+            '--section',
+            dest='section',
+            default=None,
+            help='The namespace of the section of articles without "section".',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            dest='chunk_size',
+            type=int,
+            default=500,
+            help='The number of articles created per transaction.',
+        )
+
+    def handle(self, *args, **options):
+        # The objects created in bulk are linked by their primary keys.
+        for model in (Placeholder, Article, CMSPlugin):
+            connection = connections[router.db_for_write(model)]
+            if not connection.features.can_return_rows_from_bulk_insert:
+                raise CommandError(
+                    f'The {connection.vendor} database backend does not '
+                    'return the primary keys of the rows inserted in bulk, '
+                    'which the import requires.')
+        self.owners = {}
+        self.sections = {}
+        self.tags = {}
+        self.categories = {}
+        self.default_owner = options['owner']
+        self.default_section = options['section']
+        self.text_model = plugin_pool.get_plugin('TextPlugin').model
+        self.content_type = ContentType.objects.get_for_model(Article)
+
+        if options['path'] == '-':
+            self.import_lines(enumerate(sys.stdin, 1), options['chunk_size'])
+        else:
+            with open(options['path'], encoding='utf-8') as stream:
+                self.import_lines(enumerate(stream, 1), options['chunk_size'])
+
+    def import_lines(self, lines, chunk_size):
+        article_ids = []
+        try:
+            while True:
+                chunk = [
+                    (number, line)
+                    for number, line in islice(lines, chunk_size)
+                    if line.strip()
+                ]
+                if not chunk:
+                    break
+                with transaction.atomic():
+                    article_ids.extend(self.import_chunk([
+                        self.parse(number, line) for number, line in chunk]))
+                self.stdout.write(f'Imported {len(article_ids)} article(s).')
+        finally:
+            # The chunks imported before an error are committed.
+            if article_ids:
+                self.finish(article_ids)
+
+    def parse(self, number, line):
+        try:
+            data = json.loads(line)
+        except ValueError as e:
+            raise CommandError(f'Line {number}: {e}')
+        if not data.get('translations'):
+            raise CommandError(f'Line {number}: no translations.')
+        publishing_date = now()
+        if data.get('publishing_date'):
+            publishing_date = parse_datetime(data['publishing_date'])
+            if publishing_date is None:
+                raise CommandError(f'Line {number}: invalid publishing_date.')
+        try:
+            article = Article(
+                app_config=self.get_section(data.get('section')),
+                owner=self.get_owner(data.get('owner')),
+                author_id=data.get('author'),
+                publishing_date=publishing_date,
+                is_published=data.get('is_published', False),
+                is_featured=data.get('is_featured', False),
+            )
+            data['categories'] = self.get_categories(data.get('categories', []))
+        except CommandError as e:
+            raise CommandError(f'Line {number}: {e}')
+        return article, data
+
+    def get_owner(self, username):
+        username = username or self.default_owner
+        if username not in self.owners:
+            try:
+                self.owners[username] = get_user_model().objects.get_by_natural_key(
+                    username)
+            except get_user_model().DoesNotExist:
+                raise CommandError(f'Unknown owner "{username}".')
+        return self.owners[username]
+
+    def get_section(self, namespace):
+        namespace = namespace or self.default_section
+        if namespace not in self.sections:
+            try:
+                self.sections[namespace] = NewsBlogConfig.objects.get(
+                    namespace=namespace)
+            except NewsBlogConfig.DoesNotExist:
+                raise CommandError(f'Unknown section "{namespace}".')
+        return self.sections[namespace]
+
+    def get_categories(self, references):
+        """
+        Returns the ids of the given categories, referenced by id or slug.
+        """
+        missing = {
+            reference for reference in references
+            if reference not in self.categories
+        }
+        if missing:
+            self.categories.update(
+                (pk, pk) for pk in Category.objects.filter(
+                    pk__in=[ref for ref in missing if isinstance(ref, int)],
+                ).values_list('pk', flat=True))
+            self.categories.update(Category.objects.filter(
+                translations__slug__in=[
+                    ref for ref in missing if isinstance(ref, str)],
+            ).values_list('translations__slug', 'pk'))
+        unknown = [ref for ref in references if ref not in self.categories]
+        if unknown:
+            raise CommandError(f'Unknown categories {unknown}.')
+        return {self.categories[reference] for reference in references}
+
+    def get_tags(self, names):
+        missing = {name for name in names if name not in self.tags}
+        if missing:
+            self.tags.update(
+                (tag.name, tag)
+                for tag in Tag.objects.filter(name__in=missing))
+            for name in missing - set(self.tags):
+                # Let taggit build a unique slug.
+                self.tags[name] = Tag.objects.create(name=name)
+        return [self.tags[name] for name in names]
+
+    def import_chunk(self, rows):
+        """
+        Creates the articles of the rows, with their content, translations,
+        tags and categories, with a few queries per model for all of them.
+        """
+        placeholders = Placeholder.objects.bulk_create([
+            Placeholder(slot=Article._meta.get_field('content').slotname)
+            for __ in rows
+        ])
+        articles = []
+        for (article, data), placeholder in zip(rows, placeholders):
+            article.content = placeholder
+            articles.append(article)
+        Article.objects.bulk_create(articles)
+
+        translation_model = Article._parler_meta.root_model
+        translations = []
+        plugins = []
+        bodies = []
+        tagged_items = []
+        article_categories = []
+        for article, data in rows:
+            for language, values in data['translations'].items():
+                translations.append(translation_model(
+                    master=article, language_code=language,
+                    **{name: values[name] for name in TRANSLATED_FIELDS
+                       if values.get(name) is not None}))
+                body = clean_html(values.get('body') or '', False)
+                if body:
+                    plugins.append(CMSPlugin(
+                        placeholder=article.content, language=language,
+                        plugin_type='TextPlugin', position=1))
+                    bodies.append(body)
+            tagged_items.extend(
+                TaggedItem(
+                    content_type=self.content_type, object_id=article.pk,
+                    tag=tag)
+                for tag in self.get_tags(data.get('tags', [])))
+            article_categories.extend(
+                Article.categories.through(
+                    article_id=article.pk, category_id=category_id)
+                for category_id in data['categories'])
+
+        slugs.bulk_create_translations(translations)
+        if plugins:
+            CMSPlugin.objects.bulk_create(plugins)
+            self.insert_texts(plugins, bodies)
+        TaggedItem.objects.bulk_create(tagged_items)
+        Article.categories.through.objects.bulk_create(article_categories)
+        ArticleChange.objects.record(articles, ArticleChange.CREATED)
+        return [article.pk for article in articles]
+
+    def insert_texts(self, plugins, bodies):
+        """
+        Inserts the rows of the text plugins next to their CMSPlugin rows:
+        bulk_create() does not support multi-table inheritance, and save()
+        would send the signals.
+        """
+        model = self.text_model
+        connection = connections[router.db_for_write(model)]
+        fields = [
+            field for field in model._meta.get_fields(include_parents=False)
+            if field.concrete and not field.many_to_many
+        ]
+        quote_name = connection.ops.quote_name
+        sql = 'INSERT INTO {} ({}) VALUES ({})'.format(
+            quote_name(model._meta.db_table),
+            ', '.join(quote_name(field.column) for field in fields),
+            ', '.join(['%s'] * len(fields)))
+        rows = []
+        for plugin, body in zip(plugins, bodies):
+            text = model(cmsplugin_ptr_id=plugin.pk, body=body)
+            rows.append([
+                field.get_db_prep_save(field.pre_save(text, True), connection)
+                for field in fields
+            ])
+        with connection.cursor() as cursor:
+            cursor.executemany(sql, rows)
+
+    def finish(self, article_ids, chunk_size=100):
+        """
+        Rebuilds the search data, statistics and caches the per-object
+        signals would have maintained.
+        """
+        refresh_search_data(article_ids, chunk_size)
+
+        for app_config_id in {
+                section.pk for section in self.sections.values()}:
+            SectionStatistic.objects.rebuild(app_config_id)
+            bump_section_version(app_config_id)
+            autocomplete.clear_index(app_config_id)
+        self.stdout.write(
+            f'Rebuilt the search data and statistics of {len(article_ids)} '
+            'article(s).')
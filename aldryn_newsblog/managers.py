@@ -1,26 +1,109 @@
 import datetime
-from collections import Counter
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from itertools import takewhile
 from operator import attrgetter
 
-from django.contrib.contenttypes.models import ContentType
-from django.db import models
+from django.apps import apps
+from django.core.cache import cache
+from django.db import models, transaction
 from django.utils.timezone import now
 
 from aldryn_apphooks_config.managers.base import ManagerMixin, QuerySetMixin
 from aldryn_people.models import Person
 from parler.managers import TranslatableManager, TranslatableQuerySet
-from taggit.models import Tag, TaggedItem
+from parler.utils import get_active_language_choices
+from taggit.models import Tag
 
 from aldryn_newsblog.compat import toolbar_edit_mode_active
+from aldryn_newsblog.utils.cache import get_cache_key, get_cache_version
+
+
+# Django renders boolean lookups against True as the bare column, which
+# SQLite cannot match with the composite indexes of Article. Comparing with
+# an expression keeps the "= true" condition in the SQL.
+TRUE = models.Value(True)
+
+
+# The fields the articles are loaded with for each use, see
+# ArticleQuerySet.profile(): "fields" are the only fields to load (all of
+# them if None), "select_related" the relations to join and
+# "all_languages" whether to load the translations in every language rather
+# than in the language of the use and its fallbacks only.
+FIELD_PROFILES = {
+    'list': {
+        'fields': (
+            'app_config', 'author', 'featured_image', 'publishing_date',
+            'modified_at', 'is_published', 'is_featured',
+        ),
+        'select_related': ('app_config', 'author', 'featured_image'),
+    },
+    'detail': {
+        'fields': None,
+        'select_related': ('app_config', 'author', 'featured_image'),
+        # The language chooser links to every translation.
+        'all_languages': True,
+    },
+    'feed': {
+        'fields': ('app_config', 'publishing_date', 'modified_at'),
+        'select_related': ('app_config',),
+    },
+    'sitemap': {
+        'fields': ('app_config', 'publishing_date', 'modified_at'),
+        'select_related': ('app_config',),
+    },
+    'menu': {
+        'fields': ('app_config', 'publishing_date'),
+        'select_related': ('app_config',),
+    },
+}
 
 
 class ArticleQuerySet(QuerySetMixin, TranslatableQuerySet):
+    def profile(self, name, language=None):
+        """
+        Loads the fields and relations of the articles which the given use
+        needs only, see FIELD_PROFILES, and the translations in one query.
+        The other fields are loaded on access, one query per article, so
+        this is meant for read-only listings.
+
+        The translations are loaded in the given language (the active one by
+        default) and its fallbacks only, unless the profile needs them all.
+        """
+        profile = FIELD_PROFILES[name]
+        qs = self.select_related(None).select_related(
+            *profile['select_related'])
+        if profile['fields'] is not None:
+            qs = qs.only(*profile['fields'])
+        # The translations cannot be deferred: parler reads all their fields
+        # when they are loaded.
+        if profile.get('all_languages'):
+            return qs.prefetch_related('translations')
+        translation_model = self.model._parler_meta.root_model
+        return qs.prefetch_related(models.Prefetch(
+            'translations', queryset=translation_model.objects.filter(
+                language_code__in=get_active_language_choices(language))))
+
     def published(self):
         """
         Returns articles that are published AND have a publishing_date that
         has actually passed.
         """
-        return self.filter(is_published=True, publishing_date__lte=now())
+        return self.filter(is_published=TRUE, publishing_date__lte=now())
+
+    def featured(self):
+        """Returns articles that are marked as featured."""
+        return self.filter(is_featured=TRUE)
+
+    def next_publishing_date(self):
+        """
+        Returns the publishing_date of the next article which is published
+        but scheduled for the future, or None.
+        """
+        return self.filter(
+            is_published=TRUE, publishing_date__gt=now()).order_by(
+                'publishing_date').values_list(
+                    'publishing_date', flat=True).first()
 
 
 class RelatedManager(ManagerMixin, TranslatableManager):
@@ -31,6 +114,15 @@ class RelatedManager(ManagerMixin, TranslatableManager):
     def published(self):
         return self.get_queryset().published()
 
+    def featured(self):
+        return self.get_queryset().featured()
+
+    def next_publishing_date(self):
+        return self.get_queryset().next_publishing_date()
+
+    def profile(self, name, language=None):
+        return self.get_queryset().profile(name, language)
+
     def get_months(self, request, namespace):
         """
         Get months and years with articles count for given request and namespace
@@ -77,13 +169,21 @@ class RelatedManager(ManagerMixin, TranslatableManager):
 
         Return Person queryset annotated with and ordered by 'num_articles'.
         """
-
+        statistics = apps.get_model(
+            'aldryn_newsblog', 'SectionStatistic').objects
+        app_config = self._get_app_config(namespace)
+        if app_config is not None:
+            statistics.ensure_fresh(app_config)
         # This methods relies on the fact that Article.app_config.namespace
         # is effectively unique for Article models
-        return Person.objects.filter(
-            article__app_config__namespace=namespace,
-            article__is_published=True).annotate(
-                num_articles=models.Count('article')).order_by('-num_articles')
+        num_articles = statistics.filter(
+            app_config__namespace=namespace,
+            object_type='author',
+            object_id=models.OuterRef('pk'),
+        ).values('published_count')[:1]
+        return Person.objects.annotate(
+            num_articles=models.Subquery(num_articles)).filter(
+                num_articles__gt=0).order_by('-num_articles')
 
     def get_tags(self, request, namespace):
         """
@@ -91,24 +191,328 @@ class RelatedManager(ManagerMixin, TranslatableManager):
 
         Return list of Tag objects ordered by custom 'num_articles' attribute.
         """
-        if (request and hasattr(request, 'toolbar') and  # noqa: #W504
-                request.toolbar and toolbar_edit_mode_active(request)):
-            articles = self.namespace(namespace)
+        app_config = self._get_app_config(namespace)
+        if app_config is None:
+            return []
+        published = not (
+            request and hasattr(request, 'toolbar') and  # noqa: #W504
+            request.toolbar and toolbar_edit_mode_active(request))
+        statistics = apps.get_model(
+            'aldryn_newsblog', 'SectionStatistic').objects
+        return statistics.annotate_objects(
+            Tag.objects.all(), app_config, 'tag', published=published,
+            attname='num_articles')
+
+    def get_featured(self, request, app_config, languages, count,
+                     published=True):
+        """
+        Returns a list of the latest ``count`` featured articles of the
+        section, translated to one of the given languages (and published ones
+        only, unless ``published`` is False).
+
+        The articles are fetched once per request for the section, languages
+        and visibility, and shared by the article list view and the featured
+        and latest articles plugins.
+        """
+        if not count:
+            return []
+        key = (app_config.pk, tuple(languages), published)
+        featured = getattr(request, '_aldryn_newsblog_featured', None)
+        if featured is None:
+            featured = {}
+            if request is not None:
+                request._aldryn_newsblog_featured = featured
+        fetched_count, articles = featured.get(key, (0, []))
+        if fetched_count < count:
+            queryset = self.get_queryset().filter(app_config=app_config)
+            if published:
+                queryset = queryset.published()
+            queryset = queryset.translated(*languages).featured().distinct()
+            queryset = queryset.select_related(
+                'app_config', 'author').prefetch_related(
+                    'translations', 'categories__translations', 'tags')
+            articles = list(queryset[:count])
+            featured[key] = (count, articles)
+        return articles[:count]
+
+    def get_serial_episodes(self, article, languages, window, published=True):
+        """
+        Returns a tuple (episodes, total) for the serial of the given article:
+        up to ``window`` episodes before and after the article, ordered by
+        episode, and the number of episodes in the serial.
+
+        Only episodes translated to one of the given languages (and published
+        ones, unless ``published`` is False) are taken into account. The
+        ordered episode index is cached per serial and languages, the
+        displayed episodes are fetched in a single query.
+        """
+        if article.serial_id is None:
+            return [], 0
+        index = self._get_serial_index(article.serial_id, languages, published)
+        pks = [pk for pk, episode in index]
+        if article.pk in pks:
+            position = pks.index(article.pk)
+            total = len(pks)
+            after = position + 1
         else:
-            articles = self.published().namespace(namespace)
-        if not articles:
-            # return empty iterable early not to perform useless requests
+            # e.g. an unpublished article in preview
+            position = bisect_left(
+                [episode for pk, episode in index], article.episode)
+            total = len(pks) + 1
+            after = position
+        selected = pks[max(position - window, 0):position]
+        selected += pks[after:after + window]
+        if not selected:
+            return [], total
+        episodes = self.get_queryset().filter(pk__in=selected).select_related(
+            'app_config', 'author',
+        ).prefetch_related('translations', 'categories__translations', 'tags')
+        episodes = sorted(episodes, key=lambda episode: selected.index(episode.pk))
+        return episodes, total
+
+    def _get_serial_index(self, serial_id, languages, published):
+        """
+        Returns the ordered list of (pk, episode) of the visible episodes of
+        the serial.
+        """
+        key = get_cache_key(
+            'serial', serial_id, get_cache_version('serial', serial_id),
+            int(published), ','.join(languages))
+        index = cache.get(key)
+        if index is not None:
+            return index
+        articles = self.get_queryset().filter(serial_id=serial_id)
+        timeout = None
+        if published:
+            next_publishing_date = articles.next_publishing_date()
+            if next_publishing_date is not None:
+                timeout = max(
+                    int((next_publishing_date - now()).total_seconds()), 1)
+            articles = articles.published()
+        index = list(articles.filter(
+            translations__language_code__in=languages,
+        ).order_by('episode', 'pk').values_list('pk', 'episode').distinct())
+        cache.set(key, index, timeout)
+        return index
+
+    def _get_app_config(self, namespace):
+        return self.model._meta.get_field(
+            'app_config').related_model.objects.filter(
+                namespace=namespace).first()
+
+
+class SectionStatisticManager(models.Manager):
+    """
+    Maintains and reads the denormalized article counters per section
+    (see ``SectionStatistic``).
+    """
+    # Article lookup per object type.
+    lookups = {
+        'tag': 'tags',
+        'category': 'categories',
+        'author': 'author',
+    }
+
+    @property
+    def article_model(self):
+        return apps.get_model('aldryn_newsblog', 'Article')
+
+    def collect(self, article_ids):
+        """
+        Returns a dictionary {(app_config_id, object_type): set(object_ids)}
+        of all counters the given articles contribute to.
+        """
+        keys = defaultdict(set)
+        articles = self.article_model.objects.filter(pk__in=list(article_ids))
+        for object_type, lookup in self.lookups.items():
+            rows = articles.filter(
+                **{f'{lookup}__isnull': False}).values_list(
+                    'app_config_id', lookup)
+            for app_config_id, object_id in rows:
+                keys[(app_config_id, object_type)].add(object_id)
+        return keys
+
+    def compute(self, app_config_id, object_type, object_ids=None):
+        """
+        Counts the articles of the section for the given objects (or all
+        objects of the type). Returns {object_id: (published, total)}.
+        """
+        lookup = self.lookups[object_type]
+        # A single filter() call, so that the relation is joined once.
+        filters = {f'{lookup}__isnull': False}
+        if object_ids is not None:
+            filters[f'{lookup}__in'] = list(object_ids)
+        articles = self.article_model.objects.filter(
+            app_config_id=app_config_id, **filters)
+        rows = articles.order_by().values(lookup).annotate(
+            published=models.Count('pk', filter=models.Q(
+                is_published=True, publishing_date__lte=now())),
+            total=models.Count('pk'),
+        ).values_list(lookup, 'published', 'total')
+        return {object_id: (published, total)
+                for object_id, published, total in rows}
+
+    def refresh(self, keys):
+        """
+        Recounts the counters given as {(app_config_id, object_type):
+        object_ids} and writes them in a single transaction.
+        """
+        with transaction.atomic(using=self.db):
+            for (app_config_id, object_type), object_ids in keys.items():
+                if object_ids:
+                    self._store(app_config_id, object_type,
+                                self.compute(app_config_id, object_type,
+                                             object_ids),
+                                object_ids)
+
+    def refresh_articles(self, article_ids):
+        """Refreshes all counters the given articles contribute to."""
+        self.refresh(self.collect(article_ids))
+
+    def rebuild(self, app_config_id=None):
+        """
+        Recounts every counter of the given section (or of all sections).
+        """
+        if app_config_id is None:
+            app_config_ids = list(apps.get_model(
+                'aldryn_newsblog', 'NewsBlogConfig').objects.values_list(
+                    'pk', flat=True))
+        else:
+            app_config_ids = [app_config_id]
+        with transaction.atomic(using=self.db):
+            for app_config_id in app_config_ids:
+                for object_type in self.lookups:
+                    self._store(app_config_id, object_type,
+                                self.compute(app_config_id, object_type))
+
+    def _store(self, app_config_id, object_type, counts, object_ids=None):
+        """
+        Makes the stored rows match ``counts``. Only rows of ``object_ids``
+        are touched, or all rows of the type if object_ids is None.
+        """
+        modified_at = now()
+        existing = self.filter(app_config_id=app_config_id,
+                               object_type=object_type)
+        if object_ids is not None:
+            existing = existing.filter(object_id__in=list(object_ids))
+        existing = {row.object_id: row for row in existing.select_for_update()}
+
+        stale = [pk for pk in existing if pk not in counts]
+        if stale:
+            self.filter(app_config_id=app_config_id, object_type=object_type,
+                        object_id__in=stale).delete()
+
+        to_create, to_update = [], []
+        for object_id, (published, total) in counts.items():
+            row = existing.get(object_id)
+            if row is None:
+                to_create.append(self.model(
+                    app_config_id=app_config_id, object_type=object_type,
+                    object_id=object_id, published_count=published,
+                    total_count=total, modified_at=modified_at))
+            else:
+                row.published_count = published
+                row.total_count = total
+                row.modified_at = modified_at
+                to_update.append(row)
+        if to_create:
+            self.bulk_create(to_create)
+        if to_update:
+            self.bulk_update(
+                to_update,
+                ['published_count', 'total_count', 'modified_at'])
+
+    def get_counts(self, app_config, object_type, published=True):
+        """
+        Returns {object_id: article_count} of the objects with at least one
+        article in the section. With published=False, unpublished and
+        scheduled articles are counted as well (used in edit mode).
+        """
+        rows = self.filter(
+            app_config=app_config, object_type=object_type).values_list(
+                'object_id', 'published_count', 'total_count')
+        if published:
+            self.ensure_fresh(app_config)
+        index = 1 if published else 2
+        return {row[0]: row[index] for row in rows if row[index]}
+
+    def ensure_fresh(self, app_config):
+        """
+        Scheduled articles become visible without being saved. Recounts the
+        section if one of them went live since its oldest counter was
+        refreshed. Returns True if the section was recounted.
+        """
+        oldest = self.filter(app_config=app_config).aggregate(
+            oldest=models.Min('modified_at'))['oldest']
+        if oldest is None:
+            return False
+        went_live = self.article_model.objects.filter(
+            app_config=app_config, publishing_date__gt=oldest).published()
+        if not went_live.exists():
+            return False
+        self.rebuild(getattr(app_config, 'pk', app_config))
+        return True
+
+    def annotate_objects(self, queryset, app_config, object_type,
+                         published=True, attname='article_count'):
+        """
+        Returns the objects of ``queryset`` having articles in the section,
+        annotated with the count (as ``attname``) and ordered by it.
+        """
+        counts = self.get_counts(app_config, object_type, published)
+        if not counts:
             return []
+        objects = list(queryset.filter(pk__in=counts.keys()).order_by('pk'))
+        for obj in objects:
+            setattr(obj, attname, counts[obj.pk])
+        return sorted(objects, key=attrgetter(attname), reverse=True)
+
+
+# The age the entries of the article change log must have to be read: the
+# ids are taken when the entries are inserted, but the entries are only
+# visible once their transaction commits, possibly after entries with
+# greater ids have been read.
+CHANGE_LOG_LAG = datetime.timedelta(seconds=60)
+
+
+class ArticleChangeManager(models.Manager):
+    """
+    Writes and reads the append-only log of article changes (see
+    ``ArticleChange``) by cursor, the id of the last entry read.
+    """
 
-        # aggregate and sort
-        counted_tags = dict(
-            TaggedItem.objects.filter(
-                content_type=ContentType.objects.get_for_model(type(articles[0])),
-                object_id__in=[obj.pk for obj in articles]
-            ).values('tag').annotate(tag_count=models.Count('tag')).values_list('tag', 'tag_count'))
-
-        # and finally get the results
-        tags = Tag.objects.filter(pk__in=counted_tags.keys())
-        for tag in tags:
-            tag.num_articles = counted_tags[tag.pk]
-        return sorted(tags, key=attrgetter('num_articles'), reverse=True)
+    def record(self, articles, reason, languages=('',)):
+        """
+        Appends an entry per article and language (all languages if '').
+        """
+        return self.bulk_create([
+            self.model(
+                article_id=article.pk, app_config_id=article.app_config_id,
+                language=language, reason=reason)
+            for article in articles for language in languages
+        ])
+
+    def read(self, cursor=0, limit=1000, lag=CHANGE_LOG_LAG, **filters):
+        """
+        Returns the entries after the cursor, oldest first, up to the limit,
+        and the cursor to read the next entries from.
+
+        The entries created less than ``lag`` ago, and those after them, are
+        left for the next read, so that the entries of the transactions
+        still running when they are read are not skipped. The lag must
+        exceed the duration of the transactions which change articles.
+        """
+        cutoff = now() - lag
+        entries = list(takewhile(
+            lambda entry: entry.created_at <= cutoff,
+            self.filter(pk__gt=cursor, **filters).order_by('pk')[:limit]))
+        if entries:
+            cursor = entries[-1].pk
+        return entries, cursor
+
+    def prune(self, before):
+        """
+        Deletes the entries created before the given date, once all the
+        consumers have read them.
+        """
+        return self.filter(created_at__lt=before).delete()
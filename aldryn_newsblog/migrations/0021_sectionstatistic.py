@@ -0,0 +1,85 @@
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def populate_statistics(apps, schema_editor):
+    Article = apps.get_model('aldryn_newsblog', 'Article')
+    SectionStatistic = apps.get_model('aldryn_newsblog', 'SectionStatistic')
+    ContentType = apps.get_model('contenttypes', 'ContentType')
+    TaggedItem = apps.get_model('taggit', 'TaggedItem')
+    current = django.utils.timezone.now()
+    is_published = models.Q(is_published=True, publishing_date__lte=current)
+
+    querysets = []
+    for object_type, lookup in (('category', 'categories'),
+                                ('author', 'author')):
+        querysets.append((object_type, Article.objects.filter(
+            **{f'{lookup}__isnull': False}
+        ).order_by().values('app_config_id', lookup).annotate(
+            published=models.Count('pk', filter=is_published),
+            total=models.Count('pk'),
+        ).values_list('app_config_id', lookup, 'published', 'total')))
+
+    # The generic relation of the tags is not available in migrations.
+    content_type = ContentType.objects.filter(
+        app_label='aldryn_newsblog', model='article').first()
+    if content_type is not None:
+        articles = Article.objects.filter(pk=models.OuterRef('object_id'))
+        querysets.append(('tag', TaggedItem.objects.filter(
+            content_type=content_type,
+        ).annotate(
+            article_app_config_id=models.Subquery(
+                articles.values('app_config_id')[:1]),
+            article_published=models.Exists(articles.filter(is_published)),
+        ).order_by().values('article_app_config_id', 'tag_id').annotate(
+            published=models.Count(
+                'pk', filter=models.Q(article_published=True)),
+            total=models.Count('pk'),
+        ).values_list('article_app_config_id', 'tag_id', 'published',
+                      'total')))
+
+    statistics = []
+    for object_type, rows in querysets:
+        for app_config_id, object_id, published, total in rows:
+            if app_config_id is None:
+                continue
+            statistics.append(SectionStatistic(
+                app_config_id=app_config_id,
+                object_type=object_type,
+                object_id=object_id,
+                published_count=published,
+                total_count=total,
+                modified_at=current,
+            ))
+    SectionStatistic.objects.bulk_create(statistics, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('taggit', '0001_initial'),
+        ('aldryn_newsblog', '0020_alter_article_id_alter_articletranslation_id_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SectionStatistic',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('object_type', models.CharField(choices=[('tag', 'tag'), ('category', 'category'), ('author', 'author')], max_length=16, verbose_name='object type')),
+                ('object_id', models.PositiveIntegerField(verbose_name='object id')),
+                ('published_count', models.PositiveIntegerField(default=0, verbose_name='published articles')),
+                ('total_count', models.PositiveIntegerField(default=0, verbose_name='all articles')),
+                ('modified_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='modified at')),
+                ('app_config', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='aldryn_newsblog.newsblogconfig', verbose_name='Section')),
+            ],
+            options={
+                'verbose_name': 'section statistic',
+                'verbose_name_plural': 'section statistics',
+                'unique_together': {('app_config', 'object_type', 'object_id')},
+            },
+        ),
+        migrations.RunPython(populate_statistics, migrations.RunPython.noop),
+    ]
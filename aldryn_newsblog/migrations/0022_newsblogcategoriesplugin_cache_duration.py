@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('aldryn_newsblog', '0021_sectionstatistic'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='newsblogcategoriesplugin',
+            name='cache_duration',
+            field=models.PositiveSmallIntegerField(default=0, help_text="The maximum duration (in seconds) that this plugin's content should be cached."),
+        ),
+    ]
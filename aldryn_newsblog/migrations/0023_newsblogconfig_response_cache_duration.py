@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('aldryn_newsblog', '0022_newsblogcategoriesplugin_cache_duration'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='newsblogconfig',
+            name='response_cache_duration',
+            field=models.PositiveIntegerField(blank=True, default=0, help_text='Cache the article list and detail pages for anonymous visitors for up to this many seconds. Zero disables the cache.', verbose_name='Response cache duration'),
+        ),
+    ]
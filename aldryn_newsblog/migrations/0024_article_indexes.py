@@ -0,0 +1,23 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('aldryn_newsblog', '0023_newsblogconfig_response_cache_duration'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='article',
+            index=models.Index(fields=['app_config', 'is_published', 'publishing_date'], name='newsblog_article_published'),
+        ),
+        migrations.AddIndex(
+            model_name='article',
+            index=models.Index(fields=['app_config', 'is_featured', 'is_published', 'publishing_date'], name='newsblog_article_featured'),
+        ),
+        migrations.AddIndex(
+            model_name='article',
+            index=models.Index(fields=['serial', 'episode'], name='newsblog_article_episodes'),
+        ),
+    ]
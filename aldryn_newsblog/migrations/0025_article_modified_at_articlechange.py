@@ -0,0 +1,40 @@
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('aldryn_newsblog', '0024_article_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='article',
+            name='modified_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now, verbose_name='modified at'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='articletranslation',
+            name='translation_modified_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now, verbose_name='translation modified at'),
+            preserve_default=False,
+        ),
+        migrations.CreateModel(
+            name='ArticleChange',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('article_id', models.PositiveIntegerField(verbose_name='article id')),
+                ('app_config_id', models.PositiveIntegerField(verbose_name='section id')),
+                ('language', models.CharField(blank=True, max_length=15, verbose_name='language')),
+                ('reason', models.CharField(choices=[('created', 'created'), ('updated', 'updated'), ('translation', 'translation changed'), ('content', 'content changed'), ('relations', 'categories or tags changed'), ('deleted', 'deleted')], max_length=16, verbose_name='reason')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='created at')),
+            ],
+            options={
+                'verbose_name': 'article change',
+                'verbose_name_plural': 'article changes',
+                'indexes': [models.Index(fields=['app_config_id', 'id'], name='newsblog_change_section')],
+            },
+        ),
+    ]
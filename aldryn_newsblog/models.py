@@ -1,20 +1,27 @@
 import django.core.validators
 from django.conf import settings
 from django.contrib.contenttypes.models import ContentType
-from django.core.exceptions import ImproperlyConfigured
+from django.core.exceptions import ImproperlyConfigured, ObjectDoesNotExist
 from django.db import connection, models
-from django.db.models.signals import post_save
+from django.db.models.signals import (
+    m2m_changed, post_delete, post_save, pre_delete,
+)
 from django.dispatch import receiver
-from django.urls import reverse
+from django.urls import NoReverseMatch, reverse
 from django.utils.encoding import force_str
 from django.utils.timezone import now
 from django.utils.translation import gettext
 from django.utils.translation import gettext_lazy as _
 from django.utils.translation import override
 
+from cms.models.contentmodels import PageContent
 from cms.models.fields import PlaceholderField
 from cms.models.pluginmodel import CMSPlugin
-from cms.utils.i18n import get_current_language, get_redirect_on_fallback
+from cms.signals import urls_need_reloading
+from cms.utils.i18n import (
+    get_current_language, get_default_language, get_fallback_languages,
+    get_language_list, get_redirect_on_fallback,
+)
 
 from aldryn_apphooks_config.fields import AppHookConfigField
 from aldryn_categories.fields import CategoryManyToManyField
@@ -25,17 +32,33 @@ from aldryn_translation_tools.models import (
 )
 from djangocms_text.fields import HTMLField
 from filer.fields.image import FilerImageField
+from parler.cache import is_missing
 from parler.models import TranslatableModel, TranslatedFields
+from parler.utils.context import switch_language
 from sortedm2m.fields import SortedManyToManyField
 from taggit.managers import TaggableManager
-from taggit.models import Tag
+from taggit.models import Tag, TaggedItem
 
 from aldryn_newsblog.compat import toolbar_edit_mode_active
 from aldryn_newsblog.utils.utilities import get_valid_languages_from_request
 
 from .cms_appconfig import NewsBlogConfig
-from .managers import RelatedManager
-from .utils import get_plugin_index_data, get_request, strip_tags
+from .managers import (
+    ArticleChangeManager, RelatedManager, SectionStatisticManager,
+)
+from .utils import (
+    autocomplete, clear_published_app_configs, get_plugins_index_data,
+    get_request, strip_tags,
+)
+from .utils import slugs
+from .utils.cache import bump_cache_version, bump_section_version
+
+
+try:
+    from djangocms_versioning import constants
+    from djangocms_versioning.signals import post_version_operation
+except ImportError:  # pragma: no cover - versioning not installed
+    post_version_operation = None
 
 
 if settings.LANGUAGES:
@@ -84,6 +107,12 @@ class Article(TranslatedAutoSlugifyMixin,
         'ALDRYN_NEWSBLOG_UPDATE_SEARCH_DATA_ON_SAVE',
         False
     )
+    # The values of these fields, as loaded from the database, are kept in
+    # _loaded_values to find out what a save has changed.
+    tracked_fields = (
+        'app_config_id', 'author_id', 'is_published', 'publishing_date',
+        'serial_id', 'episode',
+    )
 
     translations = TranslatedFields(
         title=models.CharField(_('title'), max_length=234),
@@ -114,7 +143,10 @@ class Article(TranslatedAutoSlugifyMixin,
             verbose_name=_('meta keywords'), blank=True, default=''),
         meta={'unique_together': (('language_code', 'slug', ), )},
 
-        search_data=models.TextField(blank=True, editable=False)
+        search_data=models.TextField(blank=True, editable=False),
+        # Also updated when the content of the language changes.
+        translation_modified_at=models.DateTimeField(
+            _('translation modified at'), auto_now=True),
     )
 
     content = PlaceholderField('newsblog_article_content',
@@ -167,11 +199,30 @@ class Article(TranslatedAutoSlugifyMixin,
 
     serial = models.ForeignKey(Serial, verbose_name=_('Serial'), null=True, blank=True, on_delete=models.SET_NULL)
     episode = models.PositiveIntegerField(verbose_name=_('Episode'), default=1)
+    # Also updated when the translations, the content, the categories or the
+    # tags change.
+    modified_at = models.DateTimeField(_('modified at'), auto_now=True)
 
     objects = RelatedManager()
 
     class Meta:
         ordering = ['-publishing_date']
+        indexes = [
+            # Published articles of a section, ordered by publishing_date
+            # (lists, archives, feeds, sitemaps).
+            models.Index(
+                fields=['app_config', 'is_published', 'publishing_date'],
+                name='newsblog_article_published'),
+            # Featured articles of a section.
+            models.Index(
+                fields=['app_config', 'is_featured', 'is_published',
+                        'publishing_date'],
+                name='newsblog_article_featured'),
+            # Episodes of a serial in order.
+            models.Index(
+                fields=['serial', 'episode'],
+                name='newsblog_article_episodes'),
+        ]
 
     @property
     def published(self):
@@ -193,29 +244,67 @@ class Article(TranslatedAutoSlugifyMixin,
         """Returns the url for this Article in the selected permalink format."""
         if not language:
             language = get_current_language()
-        kwargs = {}
+        return self._reverse_absolute_url(language)
+
+    def get_absolute_urls(self, languages=None):
+        """
+        Returns a dict of the urls of this Article in the languages (all the
+        languages of the site by default), e.g. for the language chooser.
+
+        The translations are loaded in a single query and the urls are kept
+        on the instance. Languages which have no url map to None.
+        """
+        if languages is None:
+            languages = get_language_list(getattr(settings, 'SITE_ID', None))
+        urls = self.__dict__.setdefault('_absolute_urls', {})
+        missing = [language for language in languages if language not in urls]
+        if missing:
+            slugs = None
+            if 's' in self.app_config.permalink_type:
+                slugs = {
+                    translation.language_code: translation.slug
+                    for translation in self.translations.all()
+                }
+            for language in missing:
+                try:
+                    urls[language] = self._reverse_absolute_url(
+                        language, slugs)
+                except NoReverseMatch:
+                    urls[language] = None
+        return {language: urls[language] for language in languages}
+
+    def _reverse_absolute_url(self, language, slugs=None):
+        """
+        Reverses the url of this Article in the language. The slugs of the
+        translations by language may be given to spare their lookups.
+        """
         permalink_type = self.app_config.permalink_type
-        if 'y' in permalink_type:
-            kwargs.update(year=self.publishing_date.year)
-        if 'm' in permalink_type:
-            kwargs.update(month="%02d" % self.publishing_date.month)
-        if 'd' in permalink_type:
-            kwargs.update(day="%02d" % self.publishing_date.day)
-        if 'i' in permalink_type:
-            kwargs.update(pk=self.pk)
+        slug = None
         if 's' in permalink_type:
-            slug, lang = self.known_translation_getter(
-                'slug', default=None, language_code=language)
+            site_id = getattr(settings, 'SITE_ID', None)
+            if slugs is None:
+                slug, lang = self.known_translation_getter(
+                    'slug', default=None, language_code=language)
+            else:
+                # Same as known_translation_getter(), on the given slugs.
+                lang = next((
+                    lang for lang in
+                    [language] + get_fallback_languages(language, site_id)
+                    if lang in slugs), None)
+                slug = slugs[lang] if lang else None
             if not slug:
                 # Fallback to any available language to avoid NoReverseMatch
-                slug = self.safe_translation_getter(
-                    'slug', default=None, any_language=True)
+                if slugs is None:
+                    slug = self.safe_translation_getter(
+                        'slug', default=None, any_language=True)
+                else:
+                    slug = next((slug for slug in slugs.values() if slug), None)
                 lang = language
             if slug and lang:
-                site_id = getattr(settings, 'SITE_ID', None)
                 if get_redirect_on_fallback(language, site_id):
                     language = lang
-                kwargs.update(slug=slug)
+        kwargs = self.get_permalink_kwargs(
+            permalink_type, self.publishing_date, self.pk, slug)
 
         if self.app_config and self.app_config.namespace:
             namespace = f'{self.app_config.namespace}:'
@@ -225,6 +314,25 @@ class Article(TranslatedAutoSlugifyMixin,
         with override(language):
             return reverse(f'{namespace}article-detail', kwargs=kwargs)
 
+    @staticmethod
+    def get_permalink_kwargs(permalink_type, publishing_date, pk, slug=None):
+        """
+        Returns the kwargs of the article-detail url of an article in the
+        permalink type of its section.
+        """
+        kwargs = {}
+        if 'y' in permalink_type:
+            kwargs.update(year=publishing_date.year)
+        if 'm' in permalink_type:
+            kwargs.update(month="%02d" % publishing_date.month)
+        if 'd' in permalink_type:
+            kwargs.update(day="%02d" % publishing_date.day)
+        if 'i' in permalink_type:
+            kwargs.update(pk=pk)
+        if 's' in permalink_type and slug:
+            kwargs.update(slug=slug)
+        return kwargs
+
     def get_search_data(self, language=None, request=None):
         """
         Provides an index for use with Haystack, or, for populating
@@ -245,19 +353,67 @@ class Article(TranslatedAutoSlugifyMixin,
             text_bits.append(force_str(tag.name))
         if self.content:
             plugins = self.content.cmsplugin_set.filter(language=language)
-            for base_plugin in plugins:
-                plugin_text_content = ' '.join(
-                    get_plugin_index_data(base_plugin, request))
-                text_bits.append(plugin_text_content)
+            text_bits.extend(get_plugins_index_data(plugins, request))
         return ' '.join(text_bits)
 
+    def get_changed_fields(self):
+        """
+        Returns the names of the tracked fields, and of the fields of the
+        loaded translations, changed since the article was loaded or saved.
+        """
+        loaded = getattr(self, '_loaded_values', None)
+        if loaded is None:
+            changed = set(self.tracked_fields)
+        else:
+            changed = {
+                name for name, value in loaded.items()
+                if getattr(self, name) != value
+            }
+        translation_model = self._parler_meta.root_model
+        for translation in self._translations_cache[translation_model].values():
+            if is_missing(translation):
+                continue
+            names = translation._get_field_names()
+            if translation.pk is None:
+                changed.update(names)
+            else:
+                changed.update(
+                    name for name, old, new in zip(
+                        names, translation._original_values,
+                        translation._get_field_values())
+                    if old != new)
+        return changed
+
+    def _slug_exists(self, slug, slug_filter=None, qs=None):
+        # The saved slug of the translation is known to be unique.
+        if qs is None and slug_filter is None and self.pk is not None:
+            translation = self._translations_cache[
+                self._parler_meta.root_model].get(self.get_current_language())
+            if (translation is not None and not is_missing(translation) and  # noqa: W504
+                    translation.pk is not None and  # noqa: W504
+                    slug == translation._original_values[
+                        translation._get_field_names().index('slug')]):
+                return False
+        return super()._slug_exists(slug, slug_filter=slug_filter, qs=qs)
+
+    def make_new_slug(self, slug=None, qs=None):
+        if qs is not None:
+            return super().make_new_slug(slug=slug, qs=qs)
+        if not slug:
+            slug = self._get_ideal_slug()
+        language = self.get_current_language() or get_default_language()
+        # One query for all the candidates, rather than one per candidate.
+        return slugs.allocate_slugs(
+            language, [slug], exclude_pks=[self.pk] if self.pk else (),
+            max_length=self.get_slug_max_length())[0]
+
     def save(self, *args, **kwargs):
-        # Update the search index
-        if self.update_search_on_save:
-            self.search_data = self.get_search_data()
+        changed = self.get_changed_fields()
+        if self.update_search_on_save and self.pk is not None:
+            self.update_translations_search_data()
 
         # Ensure there is an owner.
-        if self.app_config.create_authors and self.author is None:
+        if self.author_id is None and self.app_config.create_authors:
             self.author = Person.objects.get_or_create(
                 user=self.owner,
                 defaults={
@@ -266,12 +422,172 @@ class Article(TranslatedAutoSlugifyMixin,
                         self.owner.last_name,
                     )),
                 })[0]
+        created = self.pk is None
         # slug would be generated by TranslatedAutoSlugifyMixin
         super().save(*args, **kwargs)
+        if created and self.update_search_on_save:
+            # The search data needs the article to be saved.
+            self.update_translations_search_data(store=True)
+        # The urls may depend on the changes.
+        if changed & {'app_config_id', 'publishing_date', 'slug'}:
+            self.__dict__.pop('_absolute_urls', None)
+        # The post_save receivers have seen the changes, start over.
+        self._loaded_values = {
+            name: getattr(self, name) for name in self.tracked_fields}
+
+    def update_translations_search_data(self, store=False):
+        """
+        Recomputes the search data of the loaded translations about to be
+        saved, but of those whose search data was just set, e.g. by
+        update_search_data(). The other translations are not written: when
+        the setting is enabled for the class, their stored search data
+        follows the changes of the categories, tags and content on its own,
+        otherwise all the loaded translations are recomputed. With
+        ``store``, the loaded translations are updated at once in the
+        database instead.
+        """
+        translation_model = self._parler_meta.root_model
+        followed = type(self).update_search_on_save
+        translations = []
+        for translation in self._translations_cache[translation_model].values():
+            if is_missing(translation):
+                continue
+            if not store:
+                if (followed and translation.pk is not None and  # noqa: W504
+                        not translation.is_modified):
+                    continue
+                names = translation._get_field_names()
+                if translation.search_data != translation._original_values[
+                        names.index('search_data')]:
+                    continue
+            with switch_language(self, translation.language_code):
+                translation.search_data = self.get_search_data(
+                    translation.language_code)
+            translations.append(translation)
+        if store and translations:
+            translation_model.objects.bulk_update(translations, ['search_data'])
+            for translation in translations:
+                translation._original_values = translation._get_field_values()
+
+    def save_translations(self, *args, **kwargs):
+        # The modification date of the article is set by its own save.
+        self._saving_translations = True
+        try:
+            super().save_translations(*args, **kwargs)
+        finally:
+            self._saving_translations = False
 
     def __str__(self):
         return self.safe_translation_getter('title', any_language=True)
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the values the statistics and caches depend on, so that
+        # a later save can tell what has to be refreshed.
+        instance._loaded_values = {
+            name: getattr(instance, name)
+            for name in cls.tracked_fields
+            if name in field_names
+        }
+        return instance
+
+
+class SectionStatistic(models.Model):
+    """
+    Denormalized number of articles per tag, category and author in a
+    section. The rows are maintained from the article signals below, so
+    that sidebars do not need to count articles on every render.
+    """
+    TAG = 'tag'
+    CATEGORY = 'category'
+    AUTHOR = 'author'
+
+    OBJECT_TYPE_CHOICES = (
+        (TAG, _('tag')),
+        (CATEGORY, _('category')),
+        (AUTHOR, _('author')),
+    )
+
+    # Article fields which influence the counters of the article's objects.
+    ARTICLE_FIELDS = (
+        'app_config_id', 'author_id', 'is_published', 'publishing_date')
+
+    app_config = models.ForeignKey(
+        NewsBlogConfig,
+        verbose_name=_('Section'),
+        on_delete=models.CASCADE,
+    )
+    object_type = models.CharField(
+        _('object type'), max_length=16, choices=OBJECT_TYPE_CHOICES)
+    object_id = models.PositiveIntegerField(_('object id'))
+    published_count = models.PositiveIntegerField(
+        _('published articles'), default=0)
+    total_count = models.PositiveIntegerField(_('all articles'), default=0)
+    modified_at = models.DateTimeField(_('modified at'), default=now)
+
+    objects = SectionStatisticManager()
+
+    class Meta:
+        verbose_name = _('section statistic')
+        verbose_name_plural = _('section statistics')
+        unique_together = (('app_config', 'object_type', 'object_id'), )
+
+    def __str__(self):
+        return f'{self.object_type} {self.object_id}: {self.published_count}/{self.total_count}'
+
+
+class ArticleChange(models.Model):
+    """
+    Append-only log of the changes of the articles, per language: indexers,
+    cache warmers or exporters read the entries after the last one they have
+    processed (see ``ArticleChangeManager.read()``). The entries outlive the
+    articles, so that their deletion can be read too.
+    """
+    CREATED = 'created'
+    UPDATED = 'updated'
+    TRANSLATION = 'translation'
+    CONTENT = 'content'
+    RELATIONS = 'relations'
+    DELETED = 'deleted'
+
+    REASON_CHOICES = (
+        (CREATED, _('created')),
+        (UPDATED, _('updated')),
+        (TRANSLATION, _('translation changed')),
+        (CONTENT, _('content changed')),
+        (RELATIONS, _('categories or tags changed')),
+        (DELETED, _('deleted')),
+    )
+
+    id = models.BigAutoField(primary_key=True)
+    article_id = models.PositiveIntegerField(_('article id'))
+    app_config_id = models.PositiveIntegerField(_('section id'))
+    # Empty for the changes of all languages.
+    language = models.CharField(_('language'), max_length=15, blank=True)
+    reason = models.CharField(
+        _('reason'), max_length=16, choices=REASON_CHOICES)
+    created_at = models.DateTimeField(_('created at'), default=now)
+
+    objects = ArticleChangeManager()
+
+    class Meta:
+        verbose_name = _('article change')
+        verbose_name_plural = _('article changes')
+        indexes = [
+            # The changes of a section after a cursor.
+            models.Index(
+                fields=['app_config_id', 'id'], name='newsblog_change_section'),
+        ]
+
+    def __str__(self):
+        return f'{self.article_id} {self.language}: {self.reason}'
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError('The article changes cannot be modified.')
+        super().save(*args, **kwargs)
+
 
 class PluginEditModeMixin:
     def get_edit_mode(self, request):
@@ -346,44 +662,22 @@ class NewsBlogArticleSearchPlugin(NewsBlogCMSPlugin):
 class NewsBlogAuthorsPlugin(PluginEditModeMixin, NewsBlogCMSPlugin):
     def get_authors(self, request):
         """
-        Returns a queryset of authors (people who have published an article),
+        Returns a list of authors (people who have published an article),
         annotated by the number of articles (article_count) that are visible to
         the current user. If this user is anonymous, then this will be all
         articles that are published and whose publishing_date has passed. If the
         user is a logged-in cms operator, then it will be all articles.
         """
-
-        # The basic subquery (for logged-in content managers in edit mode)
-        subquery = """
-            SELECT COUNT(*)
-            FROM aldryn_newsblog_article
-            WHERE
-                aldryn_newsblog_article.author_id =
-                    aldryn_people_person.id AND
-                aldryn_newsblog_article.app_config_id = %d"""
-
-        # For other users, limit subquery to published articles
-        if not self.get_edit_mode(request):
-            subquery += """ AND
-                aldryn_newsblog_article.is_published {} AND
-                aldryn_newsblog_article.publishing_date <= {}
-            """.format(SQL_IS_TRUE, SQL_NOW_FUNC)
-
-        # Now, use this subquery in the construction of the main query.
-        query = """
-            SELECT ({}) as article_count, aldryn_people_person.*
-            FROM aldryn_people_person
-        """.format(subquery % (self.app_config.pk, ))
-
-        raw_authors = list(Person.objects.raw(query))
-        authors = [author for author in raw_authors if author.article_count]
-        return sorted(authors, key=lambda x: x.article_count, reverse=True)
+        return SectionStatistic.objects.annotate_objects(
+            Person.objects.all(), self.app_config, SectionStatistic.AUTHOR,
+            published=not self.get_edit_mode(request))
 
     def __str__(self):
         return gettext('%s authors') % (self.app_config.get_app_title(), )
 
 
-class NewsBlogCategoriesPlugin(PluginEditModeMixin, NewsBlogCMSPlugin):
+class NewsBlogCategoriesPlugin(PluginEditModeMixin, AdjustableCacheModelMixin,
+                               NewsBlogCMSPlugin):
     def __str__(self):
         return gettext('%s categories') % (self.app_config.get_app_title(), )
 
@@ -395,33 +689,9 @@ class NewsBlogCategoriesPlugin(PluginEditModeMixin, NewsBlogCMSPlugin):
         publishing_date has passed. If the user is a logged-in cms operator,
         then it will be all articles.
         """
-
-        subquery = """
-            SELECT COUNT(*)
-            FROM aldryn_newsblog_article, aldryn_newsblog_article_categories
-            WHERE
-                aldryn_newsblog_article_categories.category_id =
-                    aldryn_categories_category.id AND
-                aldryn_newsblog_article_categories.article_id =
-                    aldryn_newsblog_article.id AND
-                aldryn_newsblog_article.app_config_id = %d
-        """ % (self.app_config.pk, )
-
-        if not self.get_edit_mode(request):
-            subquery += """ AND
-                aldryn_newsblog_article.is_published {} AND
-                aldryn_newsblog_article.publishing_date <= {}
-            """.format(SQL_IS_TRUE, SQL_NOW_FUNC)
-
-        query = """
-            SELECT ({}) as article_count, aldryn_categories_category.*
-            FROM aldryn_categories_category
-        """.format(subquery)
-
-        raw_categories = list(Category.objects.raw(query))
-        categories = [
-            category for category in raw_categories if category.article_count]
-        return sorted(categories, key=lambda x: x.article_count, reverse=True)
+        return SectionStatistic.objects.annotate_objects(
+            Category.objects.all(), self.app_config, SectionStatistic.CATEGORY,
+            published=not self.get_edit_mode(request))
 
 
 class NewsBlogFeaturedArticlesPlugin(PluginEditModeMixin, NewsBlogCMSPlugin):
@@ -434,17 +704,13 @@ class NewsBlogFeaturedArticlesPlugin(PluginEditModeMixin, NewsBlogCMSPlugin):
     def get_articles(self, request):
         if not self.article_count:
             return Article.objects.none()
-        queryset = Article.objects
-        if not self.get_edit_mode(request):
-            queryset = queryset.published()
         languages = get_valid_languages_from_request(
             self.app_config.namespace, request)
         if self.language not in languages:
-            return queryset.none()
-        queryset = queryset.translated(*languages).filter(
-            app_config=self.app_config,
-            is_featured=True)
-        return queryset[:self.article_count]
+            return Article.objects.none()
+        return Article.objects.get_featured(
+            request, self.app_config, languages, self.article_count,
+            published=not self.get_edit_mode(request))
 
     def __str__(self):
         if not self.pk:
@@ -480,21 +746,21 @@ class NewsBlogLatestArticlesPlugin(PluginEditModeMixin,
         latest_articles.
         """
         queryset = Article.objects
-        featured_qs = Article.objects.all().filter(is_featured=True)
-        if not self.get_edit_mode(request):
+        edit_mode = self.get_edit_mode(request)
+        if not edit_mode:
             queryset = queryset.published()
-            featured_qs = featured_qs.published()
         languages = get_valid_languages_from_request(
             self.app_config.namespace, request)
         if self.language not in languages:
             return queryset.none()
         queryset = queryset.translated(*languages).filter(
             app_config=self.app_config)
-        featured_qs = featured_qs.translated(*languages).filter(
-            app_config=self.app_config)
-        exclude_featured = featured_qs.values_list(
-            'pk', flat=True)[:self.exclude_featured]
-        queryset = queryset.exclude(pk__in=list(exclude_featured))
+        featured = Article.objects.get_featured(
+            request, self.app_config, languages, self.exclude_featured,
+            published=not edit_mode)
+        if featured:
+            queryset = queryset.exclude(
+                pk__in=[article.pk for article in featured])
         return queryset[:self.latest_articles]
 
     def __str__(self):
@@ -523,7 +789,9 @@ class NewsBlogRelatedPlugin(PluginEditModeMixin, AdjustableCacheModelMixin,
             article.app_config.namespace, request)
         if self.language not in languages:
             return Article.objects.none()
-        qs = article.related.translated(*languages)
+        qs = article.related.translated(*languages).distinct()
+        qs = qs.select_related('app_config', 'author').prefetch_related(
+            'translations')
         if not self.get_edit_mode(request):
             qs = qs.published()
         return qs
@@ -536,38 +804,15 @@ class NewsBlogTagsPlugin(PluginEditModeMixin, NewsBlogCMSPlugin):
 
     def get_tags(self, request):
         """
-        Returns a queryset of tags, annotated by the number of articles
+        Returns a list of tags, annotated by the number of articles
         (article_count) that are visible to the current user. If this user is
         anonymous, then this will be all articles that are published and whose
         publishing_date has passed. If the user is a logged-in cms operator,
         then it will be all articles.
         """
-
-        article_content_type = ContentType.objects.get_for_model(Article)
-
-        subquery = """
-            SELECT COUNT(*)
-            FROM aldryn_newsblog_article, taggit_taggeditem
-            WHERE
-                taggit_taggeditem.tag_id = taggit_tag.id AND
-                taggit_taggeditem.content_type_id = %d AND
-                taggit_taggeditem.object_id = aldryn_newsblog_article.id AND
-                aldryn_newsblog_article.app_config_id = %d"""
-
-        if not self.get_edit_mode(request):
-            subquery += """ AND
-                aldryn_newsblog_article.is_published {} AND
-                aldryn_newsblog_article.publishing_date <= {}
-            """.format(SQL_IS_TRUE, SQL_NOW_FUNC)
-
-        query = """
-            SELECT ({}) as article_count, taggit_tag.*
-            FROM taggit_tag
-        """.format(subquery % (article_content_type.id, self.app_config.pk))
-
-        raw_tags = list(Tag.objects.raw(query))
-        tags = [tag for tag in raw_tags if tag.article_count]
-        return sorted(tags, key=lambda x: x.article_count, reverse=True)
+        return SectionStatistic.objects.annotate_objects(
+            Tag.objects.all(), self.app_config, SectionStatistic.TAG,
+            published=not self.get_edit_mode(request))
 
     def __str__(self):
         return gettext('%s tags') % (self.app_config.get_app_title(), )
@@ -591,3 +836,457 @@ def update_search_data(sender, instance, **kwargs):
                     instance.language).get(content=placeholder.pk)
                 article.search_data = article.get_search_data(instance.language)
                 article.save()
+
+
+def refresh_search_data(article_ids, chunk_size=100):
+    """
+    Recomputes and stores the search data of all the translations of the
+    given articles, with one update query per chunk of articles.
+    """
+    article_ids = list(article_ids)
+    translation_model = Article._parler_meta.root_model
+    for start in range(0, len(article_ids), chunk_size):
+        articles = Article.objects.filter(
+            pk__in=article_ids[start:start + chunk_size],
+        ).select_related('app_config').prefetch_related(
+            'translations', 'categories__translations', 'tags')
+        translations = []
+        for article in articles:
+            for translation in article.translations.all():
+                with switch_language(article, translation.language_code):
+                    translation.search_data = article.get_search_data(
+                        translation.language_code)
+                translations.append(translation)
+        translation_model.objects.bulk_update(translations, ['search_data'])
+
+
+@receiver(post_save, sender=Article, dispatch_uid='article_update_statistics')
+def update_statistics_on_save(sender, instance, created, raw=False, **kwargs):
+    """
+    Refreshes the section statistics of the article's tags, categories and
+    author if a field they depend on has changed.
+    """
+    if raw:
+        return
+    loaded = getattr(instance, '_loaded_values', {})
+    changed = any(
+        loaded.get(name) != getattr(instance, name)
+        for name in SectionStatistic.ARTICLE_FIELDS)
+    if not created and not changed:
+        return
+    keys = SectionStatistic.objects.collect([instance.pk])
+    # The article may have left its previous section or author.
+    if loaded.get('author_id'):
+        app_config_id = loaded.get('app_config_id', instance.app_config_id)
+        keys[(app_config_id, SectionStatistic.AUTHOR)].add(
+            loaded['author_id'])
+    if loaded.get('app_config_id') not in (None, instance.app_config_id):
+        for (app_config_id, object_type), object_ids in list(keys.items()):
+            if app_config_id == instance.app_config_id:
+                keys[(loaded['app_config_id'], object_type)] |= object_ids
+    SectionStatistic.objects.refresh(keys)
+
+
+@receiver(pre_delete, sender=Article, dispatch_uid='article_collect_statistics')
+def collect_statistics_on_delete(sender, instance, **kwargs):
+    # The tags and categories are gone once the article is deleted.
+    instance._statistic_keys = SectionStatistic.objects.collect([instance.pk])
+
+
+@receiver(post_delete, sender=Article,
+          dispatch_uid='article_delete_statistics')
+def update_statistics_on_delete(sender, instance, **kwargs):
+    keys = getattr(instance, '_statistic_keys', None)
+    if keys:
+        SectionStatistic.objects.refresh(keys)
+
+
+@receiver(m2m_changed, dispatch_uid='article_m2m_statistics')
+def update_statistics_on_m2m_change(sender, instance, action, reverse, model,
+                                    pk_set, **kwargs):
+    """
+    Refreshes the section statistics when tags or categories are added to
+    or removed from articles (in either direction of the relation).
+    """
+    if sender is Article.categories.through:
+        object_type = SectionStatistic.CATEGORY
+    elif sender is Article.tags.through and (
+            isinstance(instance, Article) or model is Article):
+        object_type = SectionStatistic.TAG
+    else:
+        return
+
+    if action == 'pre_clear':
+        # pk_set is not provided on clear, remember what was attached.
+        if reverse:
+            instance._statistic_keys = SectionStatistic.objects.collect(
+                instance.article_set.values_list('pk', flat=True)
+                if object_type == SectionStatistic.CATEGORY else
+                TaggedItem.objects.filter(
+                    tag=instance,
+                    content_type=ContentType.objects.get_for_model(Article),
+                ).values_list('object_id', flat=True))
+        else:
+            instance._statistic_keys = SectionStatistic.objects.collect(
+                [instance.pk])
+        return
+    if action == 'post_clear':
+        keys = getattr(instance, '_statistic_keys', {})
+    elif action in ('post_add', 'post_remove'):
+        if reverse:
+            keys = {}
+            app_config_ids = Article.objects.filter(
+                pk__in=pk_set).values_list('app_config_id', flat=True)
+            for app_config_id in set(app_config_ids):
+                keys[(app_config_id, object_type)] = {instance.pk}
+        else:
+            keys = {(instance.app_config_id, object_type): pk_set}
+    else:
+        return
+    SectionStatistic.objects.refresh({
+        key: object_ids for key, object_ids in keys.items()
+        if key[1] == object_type
+    })
+
+
+@receiver(post_save, sender=Article, dispatch_uid='article_invalidate_cache')
+@receiver(post_delete, sender=Article, dispatch_uid='article_invalidate_cache')
+def invalidate_article_cache(sender, instance, **kwargs):
+    """
+    Invalidates the cached responses of the article's section (and of its
+    previous section, if the article was moved).
+    """
+    bump_section_version(instance.app_config_id)
+    loaded = getattr(instance, '_loaded_values', {})
+    if loaded.get('app_config_id') not in (None, instance.app_config_id):
+        bump_section_version(loaded['app_config_id'])
+    for serial_id in {instance.serial_id, loaded.get('serial_id')}:
+        if serial_id is not None:
+            bump_cache_version('serial', serial_id)
+
+
+@receiver(post_save, sender=Article._parler_meta.root_model,
+          dispatch_uid='article_translation_invalidate_cache')
+@receiver(post_delete, sender=Article._parler_meta.root_model,
+          dispatch_uid='article_translation_invalidate_cache')
+def invalidate_article_translation_cache(sender, instance, **kwargs):
+    if kwargs.get('raw'):
+        return
+    try:
+        article = instance.master
+    except ObjectDoesNotExist:
+        # The article is being deleted together with its translations.
+        return
+    bump_section_version(article.app_config_id)
+    if article.serial_id is not None:
+        bump_cache_version('serial', article.serial_id)
+
+
+@receiver(post_save, sender=Article, dispatch_uid='article_update_autocomplete')
+@receiver(post_delete, sender=Article, dispatch_uid='article_update_autocomplete')
+def update_autocomplete_index(sender, instance, **kwargs):
+    if kwargs.get('raw'):
+        return
+    loaded = getattr(instance, '_loaded_values', None)
+    # The entries of the index depend on these fields and on the translations.
+    if kwargs.get('created') is False and loaded is not None and all(
+            name in loaded and getattr(instance, name) == loaded[name]
+            for name in ('app_config_id', 'is_published', 'publishing_date')):
+        return
+    app_config_ids = {instance.app_config_id}
+    if loaded and loaded.get('app_config_id') is not None:
+        app_config_ids.add(loaded['app_config_id'])
+    autocomplete.update_article(
+        instance, app_config_ids, deleted=kwargs['signal'] is post_delete)
+
+
+@receiver(post_save, sender=Article._parler_meta.root_model,
+          dispatch_uid='article_translation_update_autocomplete')
+@receiver(post_delete, sender=Article._parler_meta.root_model,
+          dispatch_uid='article_translation_update_autocomplete')
+def update_translation_autocomplete_index(sender, instance, **kwargs):
+    if kwargs.get('raw'):
+        return
+    if kwargs.get('created') is False:
+        # Parler resets the original values after the post_save signal.
+        original = dict(zip(
+            instance._get_field_names(), instance._original_values))
+        if (original['title'] == instance.title and  # noqa: W504
+                original['slug'] == instance.slug):
+            return
+    try:
+        article = instance.master
+    except ObjectDoesNotExist:
+        return
+    autocomplete.update_article(
+        article, {article.app_config_id}, [instance.language_code],
+        deleted=kwargs['signal'] is post_delete)
+
+
+@receiver(m2m_changed, dispatch_uid='article_m2m_invalidate_cache')
+def invalidate_article_m2m_cache(sender, instance, action, reverse, model,
+                                 pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if sender not in (Article.categories.through, Article.tags.through,
+                      Article.related.through):
+        return
+    if isinstance(instance, Article):
+        bump_section_version(instance.app_config_id)
+    elif model is Article:
+        articles = Article.objects.all()
+        if pk_set is not None:
+            articles = articles.filter(pk__in=pk_set)
+        for app_config_id in set(articles.values_list(
+                'app_config_id', flat=True)):
+            bump_section_version(app_config_id)
+
+
+def touch_articles(articles, reason, language=''):
+    """
+    Updates the modification dates of the articles (and of their translations
+    of the language) and logs the change.
+    """
+    timestamp = now()
+    pks = [article.pk for article in articles]
+    Article.objects.filter(pk__in=pks).update(modified_at=timestamp)
+    if language:
+        Article._parler_meta.root_model.objects.filter(
+            master_id__in=pks, language_code=language,
+        ).update(translation_modified_at=timestamp)
+    ArticleChange.objects.record(articles, reason, [language])
+
+
+@receiver(post_save, sender=Article, dispatch_uid='article_log_changes')
+@receiver(post_delete, sender=Article, dispatch_uid='article_log_changes')
+def log_article_changes(sender, instance, **kwargs):
+    if kwargs.get('raw'):
+        return
+    if 'created' not in kwargs:
+        reason = ArticleChange.DELETED
+    elif kwargs['created']:
+        reason = ArticleChange.CREATED
+    else:
+        reason = ArticleChange.UPDATED
+    ArticleChange.objects.record([instance], reason)
+
+
+@receiver(post_save, sender=Article._parler_meta.root_model,
+          dispatch_uid='article_translation_log_changes')
+@receiver(post_delete, sender=Article._parler_meta.root_model,
+          dispatch_uid='article_translation_log_changes')
+def log_article_translation_changes(sender, instance, **kwargs):
+    if kwargs.get('raw'):
+        return
+    try:
+        article = instance.master
+    except ObjectDoesNotExist:
+        return
+    if not getattr(article, '_saving_translations', False):
+        Article.objects.filter(pk=article.pk).update(modified_at=now())
+    ArticleChange.objects.record(
+        [article], ArticleChange.TRANSLATION, [instance.language_code])
+
+
+@receiver(m2m_changed, dispatch_uid='article_m2m_log_changes')
+def log_article_m2m_changes(sender, instance, action, reverse, model, pk_set,
+                            **kwargs):
+    if sender not in (Article.categories.through, Article.tags.through):
+        return
+    if isinstance(instance, Article):
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            touch_articles([instance], ArticleChange.RELATIONS)
+        return
+    if model is not Article:
+        return
+    if action == 'pre_clear':
+        # pk_set is not provided on clear, remember what was attached.
+        if sender is Article.categories.through:
+            instance._cleared_article_ids = list(
+                instance.article_set.values_list('pk', flat=True))
+        else:
+            instance._cleared_article_ids = list(TaggedItem.objects.filter(
+                tag=instance,
+                content_type=ContentType.objects.get_for_model(Article),
+            ).values_list('object_id', flat=True))
+        return
+    if action == 'post_clear':
+        pk_set = getattr(instance, '_cleared_article_ids', [])
+    elif action not in ('post_add', 'post_remove'):
+        return
+    articles = list(Article.objects.filter(pk__in=pk_set).select_related(
+        None).only('pk', 'app_config_id'))
+    if articles:
+        touch_articles(articles, ArticleChange.RELATIONS)
+
+
+@receiver(m2m_changed, dispatch_uid='article_m2m_update_search_data')
+def update_search_data_on_m2m_change(sender, instance, action, reverse, model,
+                                     pk_set, **kwargs):
+    """
+    Recomputes the search data of the articles whose categories or tags
+    changed, in either direction of the relation.
+    """
+    if not Article.update_search_on_save:
+        return
+    if sender not in (Article.categories.through, Article.tags.through):
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if isinstance(instance, Article):
+        article_ids = [instance.pk]
+    elif model is not Article:
+        return
+    elif action == 'post_clear':
+        # Remembered on pre_clear by log_article_m2m_changes().
+        article_ids = getattr(instance, '_cleared_article_ids', [])
+    else:
+        article_ids = pk_set
+    refresh_search_data(article_ids)
+
+
+@receiver(post_save, sender=Category._parler_meta.root_model,
+          dispatch_uid='category_translation_update_search_data')
+@receiver(post_save, sender=Tag, dispatch_uid='tag_update_search_data')
+def update_search_data_on_rename(sender, instance, created, raw=False,
+                                 **kwargs):
+    """
+    Recomputes the search data of the articles of a renamed category or tag.
+    """
+    if raw or created or not Article.update_search_on_save:
+        return
+    if isinstance(instance, Tag):
+        article_ids = TaggedItem.objects.filter(
+            tag=instance,
+            content_type=ContentType.objects.get_for_model(Article),
+        ).values_list('object_id', flat=True)
+    else:
+        article_ids = Article.objects.filter(
+            categories=instance.master_id).values_list('pk', flat=True)
+    refresh_search_data(article_ids)
+
+
+@receiver(post_save, dispatch_uid='article_content_log_changes')
+@receiver(post_delete, dispatch_uid='article_content_log_changes')
+def log_article_content_changes(sender, instance, **kwargs):
+    if not isinstance(instance, CMSPlugin) or kwargs.get('raw'):
+        return
+    try:
+        slot = getattr(instance.placeholder, 'slot', '')
+    except ObjectDoesNotExist:
+        # The placeholder is being deleted together with its plugins.
+        return
+    if slot != Article._meta.get_field('content').slotname:
+        return
+    articles = list(Article.objects.filter(
+        content=instance.placeholder_id).select_related(None).only(
+            'pk', 'app_config_id'))
+    if articles:
+        touch_articles(articles, ArticleChange.CONTENT, instance.language)
+
+
+@receiver(post_save, sender=NewsBlogConfig, dispatch_uid='section_invalidate_cache')
+@receiver(post_delete, sender=NewsBlogConfig, dispatch_uid='section_invalidate_cache')
+def invalidate_section_cache(sender, instance, **kwargs):
+    bump_section_version(instance.pk)
+    # The permalinks in the autocomplete index may have changed.
+    autocomplete.clear_index(instance.pk)
+    clear_published_app_configs()
+
+
+def get_related_section_ids(instance):
+    """
+    Returns the ids of the sections of the articles of the given tag,
+    category or person.
+    """
+    if isinstance(instance, Tag):
+        articles = Article.objects.filter(pk__in=TaggedItem.objects.filter(
+            tag=instance,
+            content_type=ContentType.objects.get_for_model(Article),
+        ).values('object_id'))
+    elif isinstance(instance, Category):
+        articles = Article.objects.filter(categories=instance)
+    else:
+        articles = Article.objects.filter(author=instance)
+    return set(articles.values_list('app_config_id', flat=True).distinct())
+
+
+RELATED_MODELS = (Tag, Category, Person)
+
+
+def collect_related_sections(sender, instance, **kwargs):
+    # The relations are gone once the object is deleted.
+    instance._related_section_ids = get_related_section_ids(instance)
+
+
+def invalidate_related_sections_cache(sender, instance, raw=False, **kwargs):
+    """
+    Invalidates the cached responses of the sections whose articles show
+    the changed tag, category or person, e.g. in the JSON API.
+    """
+    if raw:
+        return
+    if not isinstance(instance, RELATED_MODELS):
+        # A translation of a category or person.
+        try:
+            instance = instance.master
+        except ObjectDoesNotExist:
+            return
+    section_ids = getattr(instance, '_related_section_ids', None)
+    if section_ids is None:
+        section_ids = get_related_section_ids(instance)
+    for section_id in section_ids:
+        bump_section_version(section_id)
+
+
+for model in RELATED_MODELS:
+    pre_delete.connect(
+        collect_related_sections, sender=model,
+        dispatch_uid=f'{model._meta.label_lower}_collect_sections')
+for model in RELATED_MODELS + (
+        Category._parler_meta.root_model, Person._parler_meta.root_model):
+    for signal in (post_save, post_delete):
+        signal.connect(
+            invalidate_related_sections_cache, sender=model,
+            dispatch_uid=f'{model._meta.label_lower}_invalidate_sections')
+
+
+@receiver(urls_need_reloading, dispatch_uid='newsblog_urls_need_reloading')
+def invalidate_published_app_configs(**kwargs):
+    clear_published_app_configs()
+
+
+if post_version_operation is not None:
+    @receiver(post_version_operation, sender=PageContent,
+              dispatch_uid='newsblog_page_version_operation')
+    def invalidate_published_app_configs_on_publish(sender, operation,
+                                                    **kwargs):
+        if operation in (constants.OPERATION_PUBLISH,
+                         constants.OPERATION_UNPUBLISH):
+            clear_published_app_configs()
+
+
+@receiver(post_save, dispatch_uid='plugin_invalidate_cache')
+@receiver(post_delete, dispatch_uid='plugin_invalidate_cache')
+def invalidate_plugin_cache(sender, instance, **kwargs):
+    """
+    Invalidates the cached responses when a plugin in an article's content or
+    in one of the sections' placeholders changes.
+    """
+    if not isinstance(instance, CMSPlugin) or kwargs.get('raw'):
+        return
+    try:
+        slot = getattr(instance.placeholder, 'slot', '') or ''
+    except ObjectDoesNotExist:
+        # The placeholder is being deleted together with its plugins.
+        return
+    if slot == 'newsblog_article_content':
+        app_config_ids = Article.objects.filter(
+            content=instance.placeholder_id).values_list(
+                'app_config_id', flat=True)
+    elif slot.startswith('newsblog_'):
+        app_config_ids = NewsBlogConfig.objects.values_list('pk', flat=True)
+    else:
+        return
+    for app_config_id in set(app_config_ids):
+        bump_section_version(app_config_id)
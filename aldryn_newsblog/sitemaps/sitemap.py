@@ -13,7 +13,8 @@ class NewsBlogSitemap(I18NSitemap):
         super().__init__(*args, **kwargs)
 
     def items(self):
-        qs = Article.objects.published()
+        qs = Article.objects.published().profile(
+            'sitemap', self.language)
         if self.language is not None:
             qs = qs.translated(self.language)
         if self.namespace is not None:
@@ -21,4 +22,4 @@ class NewsBlogSitemap(I18NSitemap):
         return qs
 
     def lastmod(self, obj):
-        return obj.publishing_date
+        return max(obj.publishing_date, obj.modified_at)
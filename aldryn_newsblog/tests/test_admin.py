@@ -1,11 +1,19 @@
+from datetime import timedelta
+from functools import partial
+
 from django.test import TransactionTestCase
 
 from aldryn_people.models import Person
 
+from aldryn_newsblog.admin import (
+    make_featured, make_not_featured, make_published, make_unpublished,
+)
 from aldryn_newsblog.cms_appconfig import NewsBlogConfig
-from aldryn_newsblog.models import Article
+from aldryn_newsblog.models import Article, ArticleChange, Serial
+from aldryn_newsblog.utils import autocomplete
+from aldryn_newsblog.utils.cache import get_cache_version, get_section_version
 
-from . import NewsBlogTestsMixin
+from . import NewsBlogTestCase, NewsBlogTestsMixin
 
 
 class AdminTest(NewsBlogTestsMixin, TransactionTestCase):
@@ -35,3 +43,47 @@ class AdminTest(NewsBlogTestsMixin, TransactionTestCase):
         self.assertContains(response, f"""<option value="{user.pk}" selected>{user.username}</option>""", html=True)
         self.assertContains(response, f"""<option value="{person.pk}" selected>{user.get_full_name()}</option>""",
                             html=True)
+
+
+class AdminActionsTest(NewsBlogTestCase):
+
+    def test_actions_invalidate_the_section(self):
+        self.create_article(is_published=False)
+        for action in (make_published, make_featured, make_not_featured,
+                       make_unpublished):
+            version = get_section_version(self.app_config.pk)
+            action(None, None, Article.objects.all())
+            self.assertNotEqual(
+                get_section_version(self.app_config.pk), version)
+
+    def test_publish_actions_invalidate_the_serial(self):
+        serial = Serial.objects.create(name='serial')
+        self.create_article(serial=serial, episode=1, is_published=False)
+        for action in (make_published, make_unpublished):
+            version = get_cache_version('serial', serial.pk)
+            action(None, None, Article.objects.all())
+            self.assertNotEqual(get_cache_version('serial', serial.pk), version)
+
+    def test_publish_actions_update_the_autocomplete_index(self):
+        self.create_article(title='Apple pie', is_published=False)
+        lookup = partial(
+            autocomplete.lookup, self.app_config.pk, self.language, 'apple')
+        self.assertEqual(lookup(), [])
+        make_published(None, None, Article.objects.all())
+        self.assertEqual([title for title, url in lookup()], ['Apple pie'])
+        make_unpublished(None, None, Article.objects.all())
+        self.assertEqual(lookup(), [])
+
+    def test_actions_log_the_changes(self):
+        article = self.create_article(is_published=False)
+        for action in (make_published, make_featured, make_not_featured,
+                       make_unpublished):
+            modified_at = article.modified_at
+            __, cursor = ArticleChange.objects.read(lag=timedelta(0))
+            action(None, None, Article.objects.all())
+            entries, __ = ArticleChange.objects.read(cursor, lag=timedelta(0))
+            self.assertEqual(
+                [(entry.article_id, entry.reason) for entry in entries],
+                [(article.pk, ArticleChange.UPDATED)])
+            article = self.reload(article)
+            self.assertGreater(article.modified_at, modified_at)
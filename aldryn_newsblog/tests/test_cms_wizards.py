@@ -1,5 +1,11 @@
+from unittest import mock
+
+from cms.signals import urls_need_reloading
+
+from aldryn_newsblog.cms_appconfig import NewsBlogConfig
 from aldryn_newsblog.cms_wizards import CreateNewsBlogArticleForm
 from aldryn_newsblog.tests import NewsBlogTestCase
+from aldryn_newsblog.utils import get_published_app_configs
 
 
 class CreateNewsBlogArticleFormTestCase(NewsBlogTestCase):
@@ -44,3 +50,29 @@ class CreateNewsBlogArticleFormTestCase(NewsBlogTestCase):
         article = form.save()
         self.assertTrue(article.__class__.objects.filter(id=article.id).exists())
         self.assertFalse(article.content.get_plugins('en').exists())
+
+
+class PublishedAppConfigsTestCase(NewsBlogTestCase):
+
+    def test_published_app_configs_are_cached(self):
+        self.assertEqual(get_published_app_configs(), [self.app_config])
+        with self.assertNumQueries(0):
+            self.assertEqual(get_published_app_configs(), [self.app_config])
+
+        # A section without an apphooked page is not listed.
+        NewsBlogConfig.objects.create(namespace='another')
+        count = NewsBlogConfig.objects.count()
+        with mock.patch('aldryn_newsblog.utils.utilities.is_valid_namespace',
+                        return_value=True) as is_valid_namespace:
+            self.assertEqual(len(get_published_app_configs()), count)
+            self.assertEqual(is_valid_namespace.call_count, count)
+            get_published_app_configs()
+            self.assertEqual(is_valid_namespace.call_count, count)
+            urls_need_reloading.send(sender=None)
+            get_published_app_configs()
+            self.assertEqual(is_valid_namespace.call_count, 2 * count)
+        # Changing an apphook triggers the reloading of the URLs.
+        urls_need_reloading.send(sender=None)
+        self.assertEqual(
+            [config.pk for config in get_published_app_configs()],
+            [self.app_config.pk])
@@ -1,7 +1,18 @@
-from django.core.management import call_command
+import csv
+import json
+import os
+import tempfile
+from io import StringIO
+from unittest import mock, skipUnless
+
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.db.models.signals import post_save
+from django.test.utils import CaptureQueriesContext
 from django.utils.translation import activate
 
-from aldryn_newsblog.models import Article
+from aldryn_newsblog.cms_appconfig import NewsBlogConfig
+from aldryn_newsblog.models import Article, ArticleChange, SectionStatistic
 
 from . import NewsBlogTestCase
 
@@ -30,3 +41,165 @@ class TestCommands(NewsBlogTestCase):
         call_command('rebuild_article_search_data', languages=[self.language])
         # now verify the article's search_data has been updated.
         self.assertEqual(article.search_data, search_data)
+
+    def test_check_article_statistics_command(self):
+        article = self.create_article()
+        article.tags.add('tag1')
+        statistics = SectionStatistic.objects.filter(
+            app_config=self.app_config, object_type=SectionStatistic.TAG)
+        statistics.update(published_count=5)
+
+        out = StringIO()
+        call_command('check_article_statistics', stdout=out)
+        self.assertIn('1 section(s) are inconsistent', out.getvalue())
+        self.assertEqual(statistics.get().published_count, 5)
+
+        call_command('check_article_statistics', repair=True, stdout=out)
+        self.assertEqual(statistics.get().published_count, 1)
+
+        out = StringIO()
+        call_command('check_article_statistics', stdout=out)
+        self.assertIn('consistent', out.getvalue())
+
+    @skipUnless(connection.features.can_return_rows_from_bulk_insert,
+                'The import requires the keys of bulk inserts.')
+    def test_import_articles_command(self):
+        existing = self.create_article(slug='weekly-update')
+        category_slug = self.category1.safe_translation_getter('slug')
+        lines = [
+            {
+                'section': self.app_config.namespace,
+                'is_published': True,
+                'author': existing.author_id,
+                'tags': ['sport', 'weekly'],
+                'categories': [category_slug],
+                'translations': {
+                    'en': {
+                        'title': 'Weekly update',
+                        'lead_in': '<p>The lead</p>',
+                        'body': '<p>The body<script>alert(1)</script></p>',
+                    },
+                    'de': {'title': 'Wochenbericht'},
+                },
+            },
+            {'translations': {'en': {'title': 'Weekly update'}}},
+        ]
+        with tempfile.NamedTemporaryFile('w', suffix='.jsonl', delete=False) as f:
+            for line in lines:
+                f.write(json.dumps(line) + '\n')
+        self.addCleanup(os.remove, f.name)
+
+        receiver = mock.Mock()
+        post_save.connect(receiver, sender=Article)
+        self.addCleanup(post_save.disconnect, receiver, sender=Article)
+        out = StringIO()
+        call_command(
+            'import_articles', f.name, owner=existing.owner.username,
+            section=self.app_config.namespace, chunk_size=1, stdout=out)
+        receiver.assert_not_called()
+        self.assertIn('Imported 2 article(s).', out.getvalue())
+        self.assertEqual(ArticleChange.objects.filter(
+            reason=ArticleChange.CREATED).exclude(
+                article_id=existing.pk).count(), 2)
+
+        first, second = Article.objects.exclude(
+            pk=existing.pk).order_by('pk')
+        self.assertEqual(first.author, existing.author)
+        self.assertEqual(
+            sorted(tag.name for tag in first.tags.all()), ['sport', 'weekly'])
+        self.assertEqual(list(first.categories.all()), [self.category1])
+        self.assertEqual(
+            sorted(first.get_available_languages()), ['de', 'en'])
+        self.assertEqual(
+            [first.slug, second.slug], ['weekly-update-1', 'weekly-update-2'])
+        self.assertEqual(first.content.get_plugins().count(), 1)
+        self.assertEqual(second.content.get_plugins().count(), 0)
+        # The search data is built at the end, from the cleaned body.
+        self.assertIn('The lead', first.search_data)
+        self.assertIn('The body', first.search_data)
+        self.assertNotIn('alert', first.search_data)
+        self.assertIn('sport', first.search_data)
+        statistics = SectionStatistic.objects.filter(
+            app_config=self.app_config, object_type=SectionStatistic.TAG)
+        self.assertEqual(statistics.count(), 2)
+
+    @skipUnless(connection.features.can_return_rows_from_bulk_insert,
+                'The import requires the keys of bulk inserts.')
+    def test_import_articles_command_stops_at_an_invalid_line(self):
+        lines = [
+            {'translations': {'en': {'title': 'First', 'lead_in': 'Lead'}},
+             'tags': ['sport']},
+            {'translations': {'en': {'title': 'Second'}},
+             'categories': ['unknown']},
+        ]
+        with tempfile.NamedTemporaryFile('w', suffix='.jsonl', delete=False) as f:
+            for line in lines:
+                f.write(json.dumps(line) + '\n')
+        self.addCleanup(os.remove, f.name)
+
+        with self.assertRaisesMessage(CommandError, 'Line 2: Unknown categories'):
+            call_command(
+                'import_articles', f.name, owner=self.create_user().username,
+                section=self.app_config.namespace, chunk_size=1,
+                stdout=StringIO())
+        # The articles imported before the error are complete.
+        article = Article.objects.get()
+        self.assertEqual(article.search_data, 'Lead sport')
+        self.assertTrue(SectionStatistic.objects.filter(
+            app_config=self.app_config,
+            object_type=SectionStatistic.TAG).exists())
+
+    def test_import_articles_command_requires_bulk_insert_keys(self):
+        with mock.patch.object(
+                type(connection.features), 'can_return_rows_from_bulk_insert',
+                False):
+            with self.assertRaisesMessage(CommandError, 'primary keys'):
+                call_command('import_articles', '-', stdout=StringIO())
+        self.assertFalse(Article.objects.exists())
+
+    def test_export_articles_command(self):
+        self.app_config.permalink_type = 'ymds'
+        self.app_config.save()
+        articles = [self.create_article(), self.create_article(
+            is_published=False)]
+        articles[0].tags.add('sport')
+        articles[0].categories.add(self.category1)
+        articles[1].create_translation('de', title='Titel', slug='titel')
+
+        out = StringIO()
+        call_command('export_articles', stdout=out)
+        exported = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual([data['id'] for data in exported],
+                         [article.pk for article in articles])
+        self.assertEqual(exported[0]['section'], self.app_config.namespace)
+        self.assertEqual(exported[0]['tags'], ['sport'])
+        self.assertEqual(exported[0]['categories'], [self.category1.pk])
+        self.assertFalse(exported[1]['is_published'])
+        self.assertEqual(sorted(exported[1]['translations']), ['de', 'en'])
+        for article, data in zip(articles, exported):
+            self.assertEqual(data['author'], article.author_id)
+            self.assertEqual(data['owner'], article.owner.username)
+            for language, translation in data['translations'].items():
+                self.assertEqual(
+                    translation['url'],
+                    article.get_absolute_url(language=language))
+
+        # The number of queries does not grow with the articles.
+        with CaptureQueriesContext(connection) as queries:
+            call_command('export_articles', stdout=StringIO())
+        self.create_article()
+        with self.assertNumQueries(len(queries)):
+            call_command('export_articles', stdout=StringIO())
+
+        # The articles of sections without an apphook page have no url.
+        article = self.create_article(
+            app_config=NewsBlogConfig.objects.create(namespace='another'))
+        article.create_translation('de', title='Anderer Titel')
+        out = StringIO()
+        call_command(
+            'export_articles', format='csv', sections=['another'],
+            languages=['de'], stdout=out)
+        rows = list(csv.DictReader(StringIO(out.getvalue())))
+        self.assertEqual(
+            [(row['id'], row['title'], row['url']) for row in rows],
+            [(str(article.pk), 'Anderer Titel', '')])
@@ -1,3 +1,5 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import NoReverseMatch
 from django.utils.translation import override
 
@@ -39,3 +41,33 @@ class TestI18N(NewsBlogTestCase):
         # not available either (should raise NoReverseMatch)
         with self.assertRaises(NoReverseMatch):
             article.get_absolute_url(language='it')
+
+    def test_absolute_urls(self):
+        with override('en'):
+            article = self.create_article(
+                title='God Save the Queen!', slug='god-save-queen')
+        article.create_translation('de',
+            title='Einigkeit und Recht und Freiheit!',
+            slug='einigkeit-und-recht-und-freiheit')
+        article = self.reload(article)
+
+        # The translations are loaded at once, then the urls are kept.
+        with CaptureQueriesContext(connection) as queries:
+            urls = article.get_absolute_urls()
+            self.assertEqual(article.get_absolute_urls(['de']), {
+                'de': '/de/page/einigkeit-und-recht-und-freiheit/'})
+        translation_queries = [
+            query for query in queries.captured_queries
+            if 'aldryn_newsblog_article_translation' in query['sql']]
+        self.assertEqual(len(translation_queries), 1)
+        self.assertEqual(urls, {
+            'en': '/en/page/god-save-queen/',
+            'de': '/de/page/einigkeit-und-recht-und-freiheit/',
+            'fr': '/en/page/god-save-queen/',
+            # No url, see test_absolute_url_fallback().
+            'it': None,
+        })
+        # Same as one by one.
+        for language in ('en', 'de', 'fr'):
+            self.assertEqual(
+                article.get_absolute_url(language=language), urls[language])
@@ -1,4 +1,11 @@
-from aldryn_newsblog.models import Article
+import datetime
+from unittest import mock, skipUnless
+
+from django.db import connection
+from django.utils.timezone import now
+
+from aldryn_newsblog.admin import make_published, make_unpublished
+from aldryn_newsblog.models import Article, SectionStatistic, Serial
 
 from . import NewsBlogTestCase
 
@@ -20,3 +27,251 @@ class TestManagers(NewsBlogTestCase):
         article_url = article.get_absolute_url()
         response = self.client.get(article_url)
         self.assertEqual(response.status_code, 404)
+
+    def test_field_profiles(self):
+        for i in range(3):
+            self.create_article()
+        urls = [article.get_absolute_url() for article in Article.objects.all()]
+        with self.assertNumQueries(2):
+            articles = list(Article.objects.profile('menu'))
+            self.assertEqual(
+                [article.get_absolute_url() for article in articles], urls)
+            self.assertTrue(all(article.title for article in articles))
+        self.assertEqual(
+            articles[0].get_deferred_fields(),
+            {'author_id', 'content_id', 'episode', 'featured_image_id',
+             'is_featured', 'is_published', 'modified_at', 'owner_id',
+             'serial_id'})
+
+    def test_field_profiles_load_the_languages_in_use(self):
+        article = self.create_article()
+        article.create_translation('de', title='Titel')
+        article.create_translation('fr', title='Titre')
+        article = Article.objects.profile('list', 'fr').get()
+        self.assertEqual(
+            sorted(article.get_available_languages()), ['en', 'fr'])
+        self.assertEqual(
+            article.get_deferred_fields(),
+            {'content_id', 'episode', 'owner_id', 'serial_id'})
+        article = Article.objects.profile('detail', 'fr').get()
+        self.assertEqual(
+            sorted(article.get_available_languages()), ['de', 'en', 'fr'])
+
+
+class TestSectionStatistics(NewsBlogTestCase):
+
+    def get_counts(self, object_type, published=True):
+        return SectionStatistic.objects.get_counts(
+            self.app_config, object_type, published=published)
+
+    def test_counts_follow_article_changes(self):
+        author = self.create_person()
+        article = self.create_article(author=author)
+        article.tags.add('tag1')
+        article.categories.add(self.category1)
+        tag = article.tags.get()
+        draft = self.create_article(author=author, is_published=False)
+        draft.tags.add('tag1')
+
+        self.assertEqual(self.get_counts(SectionStatistic.TAG), {tag.pk: 1})
+        self.assertEqual(
+            self.get_counts(SectionStatistic.TAG, published=False),
+            {tag.pk: 2})
+        self.assertEqual(
+            self.get_counts(SectionStatistic.CATEGORY),
+            {self.category1.pk: 1})
+        self.assertEqual(
+            self.get_counts(SectionStatistic.AUTHOR), {author.pk: 1})
+
+        draft.is_published = True
+        draft.save()
+        self.assertEqual(self.get_counts(SectionStatistic.TAG), {tag.pk: 2})
+
+        article.categories.remove(self.category1)
+        self.assertEqual(self.get_counts(SectionStatistic.CATEGORY), {})
+
+        other_author = self.create_person()
+        article.author = other_author
+        article.save()
+        self.assertEqual(
+            self.get_counts(SectionStatistic.AUTHOR),
+            {author.pk: 1, other_author.pk: 1})
+
+        article.delete()
+        self.assertEqual(self.get_counts(SectionStatistic.TAG), {tag.pk: 1})
+        self.assertEqual(
+            self.get_counts(SectionStatistic.AUTHOR), {author.pk: 1})
+
+    def test_scheduled_article_is_counted_once_published(self):
+        publishing_date = now() + datetime.timedelta(days=1)
+        article = self.create_article(publishing_date=publishing_date)
+        article.tags.add('tag1')
+        tag = article.tags.get()
+        self.assertEqual(self.get_counts(SectionStatistic.TAG), {})
+
+        later = publishing_date + datetime.timedelta(minutes=1)
+        with mock.patch('aldryn_newsblog.managers.now', return_value=later):
+            self.assertEqual(
+                self.get_counts(SectionStatistic.TAG), {tag.pk: 1})
+
+    def test_compute_given_objects_sharing_articles(self):
+        article = self.create_article()
+        article.tags.add('tag1', 'tag2')
+        self.create_article().tags.add('tag1')
+        tag = article.tags.get(name='tag1')
+        self.assertEqual(
+            SectionStatistic.objects.compute(
+                self.app_config.pk, SectionStatistic.TAG, [tag.pk]),
+            {tag.pk: (2, 2)})
+
+    def test_publish_actions_on_a_filtered_queryset(self):
+        article = self.create_article(is_published=False)
+        article.categories.add(self.category1)
+        make_published(None, None, Article.objects.filter(is_published=False))
+        self.assertEqual(
+            self.get_counts(SectionStatistic.CATEGORY),
+            {self.category1.pk: 1})
+        make_unpublished(None, None, Article.objects.filter(is_published=True))
+        self.assertEqual(self.get_counts(SectionStatistic.CATEGORY), {})
+
+    def test_reverse_relation_changes(self):
+        article = self.create_article()
+        self.category2.article_set.add(article)
+        self.assertEqual(
+            self.get_counts(SectionStatistic.CATEGORY),
+            {self.category2.pk: 1})
+        self.category2.article_set.clear()
+        self.assertEqual(self.get_counts(SectionStatistic.CATEGORY), {})
+
+
+class TestFeaturedArticles(NewsBlogTestCase):
+
+    def test_featured_articles_are_shared_per_request(self):
+        featured = [self.create_article(is_featured=True) for _ in range(3)]
+        self.create_article()
+        self.create_article(is_featured=True, is_published=False)
+        featured.reverse()
+        request = self.get_request(self.language)
+        languages = [self.language]
+        # The articles, their translations, categories and tags.
+        with self.assertNumQueries(4):
+            self.assertEqual(Article.objects.get_featured(
+                request, self.app_config, languages, 2), featured[:2])
+            self.assertEqual(Article.objects.get_featured(
+                request, self.app_config, languages, 1), featured[:1])
+            self.assertEqual(
+                [article.title for article in Article.objects.get_featured(
+                    request, self.app_config, languages, 2)],
+                [article.title for article in featured[:2]])
+        with self.assertNumQueries(4):
+            self.assertEqual(Article.objects.get_featured(
+                request, self.app_config, languages, 5), featured)
+        self.assertEqual(len(Article.objects.get_featured(
+            request, self.app_config, languages, 5, published=False)), 4)
+
+
+class TestSerialEpisodes(NewsBlogTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.serial = Serial.objects.create(name='serial')
+        self.episodes = [
+            self.create_article(serial=self.serial, episode=episode)
+            for episode in range(1, 8)]
+
+    def get_episodes(self, article, window=2, published=True):
+        return Article.objects.get_serial_episodes(
+            article, [self.language], window, published=published)
+
+    def test_window_around_current_episode(self):
+        episodes, total = self.get_episodes(self.episodes[3])
+        self.assertEqual(total, 7)
+        self.assertEqual(
+            [article.episode for article in episodes], [2, 3, 5, 6])
+        episodes, total = self.get_episodes(self.episodes[0])
+        self.assertEqual([article.episode for article in episodes], [2, 3])
+
+    def test_hidden_episodes(self):
+        draft = self.episodes[2]
+        draft.is_published = False
+        draft.save()
+        self.create_article(serial=self.serial, episode=8, title='other',
+                            slug='other').translations.update(
+                                language_code='de')
+        episodes, total = self.get_episodes(self.episodes[3])
+        self.assertEqual(total, 6)
+        self.assertEqual(
+            [article.episode for article in episodes], [1, 2, 5, 6])
+        episodes, total = self.get_episodes(
+            self.episodes[3], published=False)
+        self.assertEqual(total, 7)
+        self.assertEqual(
+            [article.episode for article in episodes], [2, 3, 5, 6])
+        # The draft itself, e.g. in preview.
+        episodes, total = self.get_episodes(draft)
+        self.assertEqual(
+            [article.episode for article in episodes], [1, 2, 4, 5])
+
+    def test_index_is_cached(self):
+        article = self.episodes[3]
+        self.get_episodes(article)
+        # The displayed episodes and their translations, categories and tags.
+        with self.assertNumQueries(4):
+            episodes, total = self.get_episodes(article)
+            for episode in episodes:
+                episode.title
+                list(episode.categories.all())
+                list(episode.tags.all())
+                episode.author
+        self.episodes[4].is_published = False
+        self.episodes[4].save()
+        episodes, total = self.get_episodes(article)
+        self.assertEqual(total, 6)
+        self.assertEqual(
+            [article.episode for article in episodes], [2, 3, 6, 7])
+
+
+@skipUnless(connection.vendor == 'sqlite', 'Query plans are SQLite specific.')
+class TestQueryPlans(NewsBlogTestCase):
+
+    def get_plan(self, queryset):
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            return ' | '.join(row[-1] for row in cursor.fetchall())
+
+    def assertUsesIndex(self, queryset, index, sorted_by_index=True):
+        plan = self.get_plan(queryset)
+        self.assertIn(f'USING INDEX {index}', plan.replace('COVERING ', ''))
+        if sorted_by_index:
+            self.assertNotIn('FOR ORDER BY', plan)
+
+    def test_article_list(self):
+        queryset = Article.objects.published().namespace(
+            self.app_config.namespace).translated('en', 'de')
+        self.assertUsesIndex(queryset[:10], 'newsblog_article_published')
+
+    def test_featured_articles(self):
+        queryset = Article.objects.published().translated('en').filter(
+            app_config=self.app_config).featured()
+        self.assertUsesIndex(queryset[:5], 'newsblog_article_featured')
+
+    def test_archive(self):
+        queryset = Article.objects.published().namespace(
+            self.app_config.namespace).values_list(
+                'publishing_date', flat=True)
+        self.assertUsesIndex(queryset, 'newsblog_article_published')
+
+    def test_serial_episodes(self):
+        serial = Serial.objects.create(name='serial')
+        queryset = Article.objects.filter(serial=serial).order_by('episode')
+        self.assertUsesIndex(queryset, 'newsblog_article_episodes')
+
+    def test_translations(self):
+        queryset = Article.objects.filter(
+            app_config=self.app_config).translated('en')
+        # The unique (language_code, master) index created by parler covers
+        # the translation joins.
+        self.assertUsesIndex(
+            queryset, 'aldryn_newsblog_article_translation_language_code_'
+                      'master_id', sorted_by_index=False)
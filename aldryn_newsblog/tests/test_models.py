@@ -1,12 +1,21 @@
 import os
+from datetime import timedelta
+from unittest import mock
 
 from django.conf import settings
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.utils.timezone import now
 from django.utils.translation import activate, override
 
 from cms import api
+from cms.plugin_base import CMSPluginBase
+from cms.plugin_pool import plugin_pool
 
-from aldryn_newsblog.models import Article
+from aldryn_newsblog.models import (
+    Article, ArticleChange, NewsBlogLatestArticlesPlugin,
+)
+from aldryn_newsblog.utils import extractors
 
 from . import TESTS_STATIC_ROOT, NewsBlogTestCase, NewsBlogTransactionTestCase
 
@@ -14,6 +23,11 @@ from . import TESTS_STATIC_ROOT, NewsBlogTestCase, NewsBlogTransactionTestCase
 FEATURED_IMAGE_PATH = os.path.join(TESTS_STATIC_ROOT, 'featured_image.jpg')
 
 
+class ContainerPlugin(CMSPluginBase):
+    allow_children = True
+    search_fulltext = True
+
+
 class TestModels(NewsBlogTestCase):
 
     def test_create_article(self):
@@ -169,6 +183,221 @@ class TestModels(NewsBlogTestCase):
         self.assertContains(response, title)
         self.assertContains(response, content)
 
+    def test_search_data_plugin_queries(self):
+        activate(self.language)
+        article = self.create_article()
+        queries = []
+        for count in (1, 5):
+            while article.content.get_plugins().count() < count:
+                api.add_plugin(
+                    article.content, 'TextPlugin', self.language,
+                    body=f'text {article.content.get_plugins().count()}')
+            article = self.reload(article)
+            with CaptureQueriesContext(connection) as context:
+                search_data = article.get_search_data()
+            self.assertIn(f'text {count - 1}', search_data)
+            queries.append(len(context))
+        # The plugins are loaded once per plugin type.
+        self.assertEqual(queries[0], queries[1])
+
+    def test_search_data_nested_plugins(self):
+        def render_plugin(request, instance):
+            # The output of a container includes the output of its children.
+            plugins = [instance, *instance.get_descendants()]
+            return ' '.join(f'block{plugin.pk}' for plugin in plugins)
+
+        plugin_pool.register_plugin(ContainerPlugin)
+        self.addCleanup(plugin_pool.unregister_plugin, ContainerPlugin)
+        activate(self.language)
+        article = self.create_article()
+        root = api.add_plugin(
+            article.content, 'ContainerPlugin', self.language)
+        for i in range(2):
+            child = api.add_plugin(
+                article.content, 'ContainerPlugin', self.language,
+                target=root)
+            api.add_plugin(
+                article.content, 'ContainerPlugin', self.language,
+                target=child)
+        with mock.patch(
+                'aldryn_newsblog.utils.utilities.render_plugin',
+                side_effect=render_plugin) as mocked:
+            search_data = article.get_search_data()
+        # Only the root is rendered, and each block is indexed once.
+        self.assertEqual(mocked.call_count, 1)
+        words = search_data.split()
+        self.assertEqual(len(words), 5)
+        self.assertEqual(len(set(words)), 5)
+
+    def test_search_data_extractors(self):
+        plugin_pool.register_plugin(ContainerPlugin)
+        self.addCleanup(plugin_pool.unregister_plugin, ContainerPlugin)
+        activate(self.language)
+        article = self.create_article()
+        api.add_plugin(article.content, 'TextPlugin', self.language,
+                       body='<p>extracted text</p>')
+        api.add_plugin(article.content, 'ContainerPlugin', self.language)
+        fallbacks = extractors.render_fallbacks.copy()
+        with mock.patch(
+                'aldryn_newsblog.utils.utilities.render_plugin',
+                return_value='rendered text') as mocked:
+            self.assertEqual(
+                article.get_search_data(), ' extracted text rendered text')
+            # Only the plugin without extractor is rendered, and counted.
+            self.assertEqual(mocked.call_count, 1)
+            self.assertEqual(
+                extractors.render_fallbacks - fallbacks,
+                {'ContainerPlugin': 1})
+
+            extractors.register_extractor(
+                'ContainerPlugin', lambda plugin: ['container'])
+            self.addCleanup(extractors.unregister_extractor, 'ContainerPlugin')
+            self.assertEqual(
+                article.get_search_data(), ' extracted text container')
+            self.assertEqual(mocked.call_count, 1)
+
+    def test_search_data_prefetches_search_fields(self):
+        activate(self.language)
+        article = self.create_article()
+        queries = []
+        with mock.patch.object(
+                NewsBlogLatestArticlesPlugin, 'search_fields',
+                ('app_config__namespace',), create=True):
+            for count in (1, 3):
+                while article.content.get_plugins().count() < count:
+                    api.add_plugin(
+                        article.content, 'NewsBlogLatestArticlesPlugin',
+                        self.language, app_config=self.app_config)
+                article = self.reload(article)
+                with CaptureQueriesContext(connection) as context:
+                    search_data = article.get_search_data()
+                self.assertEqual(
+                    search_data.split(), [self.app_config.namespace] * count)
+                queries.append(len(context))
+        # The sections of the plugins are loaded at once.
+        self.assertEqual(queries[0], queries[1])
+
+    def test_save_only_updates_changed_inputs(self):
+        activate(self.language)
+        Article.update_search_on_save = True
+        self.addCleanup(setattr, Article, 'update_search_on_save', False)
+        article = self.reload(self.create_article(lead_in='first lead'))
+        self.assertEqual(article.search_data, 'first lead')
+        with mock.patch.object(
+                Article, 'get_search_data', autospec=True,
+                side_effect=Article.get_search_data) as get_search_data:
+            with CaptureQueriesContext(connection) as queries:
+                article.is_featured = True
+                article.save()
+            get_search_data.assert_not_called()
+            # The slug is not checked again.
+            self.assertFalse([
+                query for query in queries.captured_queries
+                if 'EXISTS' in query['sql'] or 'LIMIT 1' in query['sql']])
+
+            article.lead_in = 'second lead'
+            article.save()
+            self.assertEqual(get_search_data.call_count, 1)
+            self.assertEqual(article.search_data, 'second lead')
+
+            # The categories and tags are followed on their own.
+            Article.objects.get(pk=article.pk).categories.add(self.category1)
+            self.assertEqual(get_search_data.call_count, 2)
+            article.save()
+            article.save()
+            self.assertEqual(get_search_data.call_count, 2)
+            self.assertEqual(
+                self.reload(article).search_data,
+                f'second lead {self.category1.name}')
+
+    def test_search_data_follows_relations(self):
+        activate(self.language)
+        Article.update_search_on_save = True
+        self.addCleanup(setattr, Article, 'update_search_on_save', False)
+        article = Article.objects.create(
+            title='Title', lead_in='lead', app_config=self.app_config,
+            owner=self.create_user(), publishing_date=now())
+        # Stored once created, without saving it again.
+        self.assertEqual(self.reload(article).search_data, 'lead')
+        article.tags.add('sport')
+        self.category1.article_set.add(article)
+        self.assertEqual(
+            self.reload(article).search_data,
+            f'lead {self.category1.name} sport')
+        self.category1.name = 'Renamed'
+        self.category1.save()
+        tag = article.tags.get()
+        tag.name = 'football'
+        tag.save()
+        self.assertEqual(
+            self.reload(article).search_data, 'lead Renamed football')
+        article.tags.clear()
+        self.assertEqual(self.reload(article).search_data, 'lead Renamed')
+        self.category1.article_set.clear()
+        self.assertEqual(self.reload(article).search_data, 'lead')
+
+    def test_change_log(self):
+        activate(self.language)
+        article = self.create_article()
+        pk = article.pk
+        created_at = article.modified_at
+        translated_at = article.translation_modified_at
+        __, cursor = ArticleChange.objects.read(lag=timedelta(0))
+
+        def read_changes():
+            nonlocal cursor
+            entries, cursor = ArticleChange.objects.read(
+                cursor, lag=timedelta(0))
+            self.assertFalse([
+                entry for entry in entries
+                if (entry.article_id, entry.app_config_id) != (
+                    pk, self.app_config.pk)])
+            # A single change may be logged more than once, e.g. when a plugin
+            # is saved twice.
+            return list(dict.fromkeys(
+                (entry.language, entry.reason) for entry in entries))
+
+        api.add_plugin(article.content, 'TextPlugin', 'de', body='Inhalt')
+        self.assertEqual(read_changes(), [('de', ArticleChange.CONTENT)])
+        self.assertEqual(read_changes(), [])
+        article = self.reload(article)
+        self.assertGreater(article.modified_at, created_at)
+        # Only the translation of the language of the content is modified.
+        self.assertEqual(article.translation_modified_at, translated_at)
+
+        article.categories.add(self.category1)
+        self.assertEqual(read_changes(), [('', ArticleChange.RELATIONS)])
+
+        article.create_translation('de', title='Titel')
+        self.assertEqual(read_changes(), [('de', ArticleChange.TRANSLATION)])
+        self.assertGreater(
+            self.reload(article).modified_at, article.modified_at)
+
+        article.title = 'New title'
+        article.save()
+        self.assertEqual(read_changes(), [
+            ('', ArticleChange.UPDATED), ('en', ArticleChange.TRANSLATION)])
+
+        article.delete()
+        self.assertIn(('', ArticleChange.DELETED), read_changes())
+        with self.assertRaises(ValueError):
+            ArticleChange.objects.last().save()
+
+    def test_change_log_leaves_recent_entries(self):
+        article = self.create_article()
+        __, cursor = ArticleChange.objects.read(lag=timedelta(0))
+        recent, old = ArticleChange.objects.record(
+            [article, article], ArticleChange.UPDATED)
+        # The entry with the lower id was committed last.
+        ArticleChange.objects.filter(pk=old.pk).update(
+            created_at=now() - timedelta(minutes=5))
+        self.assertEqual(ArticleChange.objects.read(cursor), ([], cursor))
+        ArticleChange.objects.filter(pk=recent.pk).update(
+            created_at=now() - timedelta(minutes=2))
+        entries, cursor = ArticleChange.objects.read(cursor)
+        self.assertEqual(entries, [recent, old])
+        self.assertEqual(cursor, old.pk)
+
     def test_change_title(self):
         """
         Test that we can change the title of an existing, published article
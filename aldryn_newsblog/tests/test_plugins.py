@@ -1,13 +1,17 @@
 import datetime
 import time
+from unittest import mock
 
-from django.urls import reverse
+from django.urls import resolve, reverse
 from django.utils.encoding import force_str
+from django.utils.timezone import now
 from django.utils.translation import override
 
 from cms import api
 
-from aldryn_newsblog.models import NewsBlogConfig
+from aldryn_newsblog.cms_plugins import NewsBlogSerialEpisodesPlugin
+from aldryn_newsblog.models import NewsBlogConfig, Serial
+from aldryn_newsblog.utils import get_current_article, set_current_article
 
 from . import NewsBlogTestCase
 
@@ -320,6 +324,26 @@ class TestLatestArticlesPlugin(TestPluginLanguageHelperMixin,
         article = self.create_article()
         self._test_plugin_languages_with_article(article)
 
+    def test_cache_expiration_respects_scheduled_articles(self):
+        plugin_class = self.plugin.get_plugin_class_instance()
+        self.plugin.cache_duration = 3600
+        self.assertEqual(
+            plugin_class.get_cache_expiration(None, self.plugin, None), 3600)
+
+        self.create_article(
+            publishing_date=now() + datetime.timedelta(minutes=10))
+        # Scheduled articles of other sections are not relevant.
+        self.create_article(
+            app_config=self.another_app_config,
+            publishing_date=now() + datetime.timedelta(minutes=1))
+        expiration = plugin_class.get_cache_expiration(
+            None, self.plugin, None)
+        self.assertTrue(590 < expiration <= 600)
+
+        self.plugin.cache_duration = 0
+        self.assertEqual(
+            plugin_class.get_cache_expiration(None, self.plugin, None), 0)
+
 
 class TestPrefixedLatestArticlesPlugin(TestAppConfigPluginsBase):
     plugin_to_test = 'NewsBlogLatestArticlesPlugin'
@@ -387,6 +411,35 @@ class TestRelatedArticlesPlugin(TestPluginLanguageHelperMixin,
         for article in another_language_articles:
             self.assertNotContains(response, article.title)
 
+    def test_related_articles_plugin_pk_permalink(self):
+        self.app_config.permalink_type = 'ymdi'
+        self.app_config.save()
+        main_article = self.create_article()
+        api.add_plugin(
+            main_article.content, 'NewsBlogRelatedPlugin', self.language)
+        related = self.create_article()
+        main_article.related.add(related)
+        url = main_article.get_absolute_url()
+        self.assertTrue(url.rstrip('/').endswith(str(main_article.pk)))
+        response = self.client.get(url)
+        self.assertContains(response, related.title)
+
+    def test_current_article(self):
+        article = self.create_article()
+        url = article.get_absolute_url()
+        request = self.get_request(self.language, url)
+        self.assertIsNone(get_current_article(request))
+        request = self.get_request(self.language, url)
+        request.resolver_match = resolve(url)
+        with self.assertNumQueries(1):
+            self.assertEqual(get_current_article(request), article)
+            self.assertEqual(get_current_article(request), article)
+        request = self.get_request(self.language, url)
+        request.resolver_match = resolve(url)
+        set_current_article(request, article)
+        with self.assertNumQueries(0):
+            self.assertIs(get_current_article(request), article)
+
     def test_latest_articles_plugin_language(self):
         main_article, related_article = (
             self.create_article() for _ in range(2))
@@ -397,6 +450,34 @@ class TestRelatedArticlesPlugin(TestPluginLanguageHelperMixin,
         self.assertContains(response_related, related_article.title)
 
 
+class TestSerialEpisodesPlugin(NewsBlogTestCase):
+
+    @mock.patch.object(NewsBlogSerialEpisodesPlugin, 'episodes_window', 1)
+    def test_serial_episodes_plugin(self):
+        serial = Serial.objects.create(name='serial')
+        episodes = [
+            self.create_article(serial=serial, episode=episode)
+            for episode in range(1, 6)]
+        main_article = episodes[2]
+        api.add_plugin(
+            main_article.content, 'NewsBlogSerialEpisodesPlugin',
+            self.language)
+        response = self.client.get(main_article.get_absolute_url())
+        self.assertContains(response, 'data-episode_total="5"')
+        for article in (episodes[1], episodes[3]):
+            self.assertContains(response, article.title)
+        for article in (episodes[0], episodes[4]):
+            self.assertNotContains(response, article.title)
+
+        episodes[1].is_published = False
+        episodes[1].save()
+        response = self.client.get(main_article.get_absolute_url())
+        self.assertContains(response, 'data-episode_total="4"')
+        for article in (episodes[0], episodes[3]):
+            self.assertContains(response, article.title)
+        self.assertNotContains(response, episodes[1].title)
+
+
 class TestTagsPlugin(TestAppConfigPluginsBase):
     plugin_to_test = 'NewsBlogTagsPlugin'
 
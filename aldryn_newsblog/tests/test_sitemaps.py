@@ -88,3 +88,10 @@ class TestSitemaps(NewsBlogTestCase):
         self.assertArticlesIn([multilanguage_article, de_article], de_sitemap)
         self.assertArticlesNotIn([en_article], de_sitemap)
         self.assertSitemapLanguage(de_sitemap, 'de')
+
+    def test_lastmod(self):
+        article = self.create_article()
+        sitemap = NewsBlogSitemap(language=self.language)
+        self.assertEqual(
+            [url_info['lastmod'] for url_info in sitemap.get_urls()],
+            [article.modified_at])
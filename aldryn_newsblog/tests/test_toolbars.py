@@ -0,0 +1,63 @@
+from unittest import mock
+
+from django.contrib.auth.models import Permission
+from django.urls import resolve
+
+from aldryn_newsblog.cms_toolbars import NewsBlogToolbar
+
+from . import NewsBlogTestCase
+
+
+class TestNewsBlogToolbar(NewsBlogTestCase):
+
+    def get_toolbar(self, user, url):
+        request = self.get_request(self.language, url)
+        request.user = user
+        request.resolver_match = resolve(url)
+        request.current_page = self.page
+        # Populate this toolbar only.
+        request.toolbar.populated = True
+        return NewsBlogToolbar(request, request.toolbar, True, url)
+
+    def get_labels(self, toolbar):
+        menu = toolbar.toolbar.menus.get('newsblog-app')
+        if menu is None:
+            return []
+        return [
+            str(item.name).rstrip('.') for item in menu.items
+            if hasattr(item, 'name')]
+
+    def test_no_permissions(self):
+        article = self.create_article()
+        toolbar = self.get_toolbar(
+            self.create_user(), article.get_absolute_url())
+        with mock.patch(
+                'aldryn_newsblog.cms_toolbars.get_app_instance') as get_app:
+            toolbar.populate()
+        get_app.assert_not_called()
+        self.assertEqual(self.get_labels(toolbar), [])
+
+    def test_add_permission_only(self):
+        article = self.create_article()
+        user = self.create_user(is_staff=True)
+        user.user_permissions.add(Permission.objects.get(
+            content_type__app_label='aldryn_newsblog',
+            codename='add_article'))
+        toolbar = self.get_toolbar(user, article.get_absolute_url())
+        with mock.patch(
+                'aldryn_newsblog.cms_toolbars.get_current_article') as current:
+            toolbar.populate()
+        # The article is not needed by any menu entry.
+        current.assert_not_called()
+        self.assertEqual(self.get_labels(toolbar), ['Add new article'])
+
+    def test_superuser_on_article_detail(self):
+        article = self.create_article()
+        toolbar = self.get_toolbar(
+            self.create_user(is_staff=True, is_superuser=True),
+            article.get_absolute_url())
+        toolbar.populate()
+        self.assertEqual(self.get_labels(toolbar), [
+            'Configure addon', 'Article list', 'Add new article',
+            'Edit this article', 'Delete this article',
+        ])
@@ -1,8 +1,14 @@
-from unittest import TestCase
+from unittest import TestCase, mock
 
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import NoReverseMatch, reverse
+from django.utils.translation import override
 
-from ..utils import add_prefix_to_path, default_reverse
+from ..models import Article, Serial
+from ..utils import add_prefix_to_path, default_reverse, get_field_value, slugs
+from ..utils.utilities import get_field_path
+from . import NewsBlogTestCase
 
 
 class TestAddPrefixToPath(TestCase):
@@ -68,3 +74,93 @@ class TestAddPrefixToPath(TestCase):
             except:  # noqa: E722
                 self.fail('default_reverse raised exception even though we '
                           'set a default value of: {}.'.format(default))
+
+
+class TestGetFieldValue(TestCase):
+
+    def test_fields_and_attributes(self):
+        article = Article(episode=0, serial=Serial(name='Serial'))
+        self.assertEqual(get_field_value(article, 'episode'), 0)
+        self.assertEqual(get_field_value(article, 'serial__name'), 'Serial')
+        self.assertEqual(
+            get_field_value(article, 'serial__name__upper'), 'Serial'.upper)
+        self.assertEqual(get_field_value(article, 'unknown'), '')
+        self.assertEqual(get_field_value(article, 'serial__unknown'), '')
+        self.assertEqual(get_field_value(Article(), 'serial__name'), '')
+
+    def test_field_path(self):
+        self.assertEqual(get_field_path(Article, 'serial__name'), (
+            (('serial', True), ('name', True)), 'serial'))
+        self.assertEqual(get_field_path(Article, 'episode'), (
+            (('episode', True),), None))
+        self.assertEqual(get_field_path(Article, 'unknown__name'), (
+            (('unknown', False), ('name', False)), None))
+        # Compiled once per model and path.
+        self.assertIs(
+            get_field_path(Article, 'serial__name'),
+            get_field_path(Article, 'serial__name'))
+
+
+class TestSlugs(NewsBlogTestCase):
+
+    def test_allocate_slugs(self):
+        with override(self.language):
+            for i in range(3):
+                self.create_article(title='Weekly update', slug='')
+            with CaptureQueriesContext(connection) as queries:
+                article = self.create_article(title='Weekly update', slug='')
+        self.assertEqual(article.slug, 'weekly-update-3')
+        # One lookup of the slug, and one of the highest index in use.
+        slug_lookups = [
+            query for query in queries.captured_queries
+            if 'aldryn_newsblog_article_translation"."slug" IN' in query['sql'] or  # noqa: W504
+            'REGEXP' in query['sql']]
+        self.assertEqual(len(slug_lookups), 2)
+        with self.assertNumQueries(2):
+            self.assertEqual(
+                slugs.allocate_slugs(self.language, [
+                    'weekly-update', 'weekly-update', 'other']),
+                ['weekly-update-4', 'weekly-update-5', 'other'])
+        # A gap is not filled: the index follows the highest one.
+        Article.objects.get(translations__slug='weekly-update-1').delete()
+        self.assertEqual(
+            slugs.allocate_slugs(self.language, ['weekly-update']),
+            ['weekly-update-4'])
+        # The index fits in the maximum length.
+        self.assertEqual(
+            slugs.allocate_slugs(
+                self.language, ['weekly-update'], max_length=13),
+            ['weekly-upda-4'])
+
+    def test_bulk_create_translations(self):
+        with override(self.language):
+            article = self.create_article(title='Weekly update', slug='')
+            others = [self.create_article() for i in range(2)]
+        translation_model = Article._parler_meta.root_model
+        translations = [
+            translation_model(
+                master=other, language_code='de', title='Weekly update')
+            for other in others
+        ] + [translation_model(
+            master=article, language_code='de', title='Other',
+            slug='weekly-update')]
+        get_taken_slugs = slugs.get_taken_slugs
+        lookups = []
+
+        def get_stale_taken_slugs(*args, **kwargs):
+            lookups.append(args)
+            if len(lookups) == 1:
+                # A concurrent writer takes a slug after the first lookup.
+                translation_model.objects.create(
+                    master=self.create_article(), language_code='de',
+                    title='Weekly update', slug='weekly-update')
+                return set()
+            return get_taken_slugs(*args, **kwargs)
+
+        with mock.patch.object(
+                slugs, 'get_taken_slugs', side_effect=get_stale_taken_slugs):
+            slugs.bulk_create_translations(translations)
+        self.assertEqual(len(lookups), 2)
+        self.assertEqual(
+            sorted(translation.slug for translation in translations),
+            ['weekly-update-1', 'weekly-update-2', 'weekly-update-3'])
@@ -1,16 +1,24 @@
+import json
 import os
-from datetime import date, datetime, time, timezone
+from datetime import date, datetime, time, timedelta, timezone
 from operator import itemgetter
 from random import randint
+from unittest import mock
 
 from django.conf import settings
+from django.core.cache import cache
 from django.core.files import File as DjangoFile
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
 from django.urls import NoReverseMatch, reverse
 from django.utils.timezone import make_aware
 from django.utils.timezone import now as django_timezone_now
 from django.utils.translation import override
 
 from cms import api
+from cms.plugin_base import CMSPluginBase
+from cms.plugin_pool import plugin_pool
 from cms.utils.i18n import force_language, get_current_language
 
 from easy_thumbnails.files import get_thumbnailer
@@ -19,8 +27,11 @@ from parler.tests.utils import override_parler_settings
 from parler.utils.conf import add_default_language_settings
 from parler.utils.context import smart_override, switch_language
 
-from aldryn_newsblog.models import Article, NewsBlogConfig
+from aldryn_newsblog.models import Article, NewsBlogConfig, Serial
 from aldryn_newsblog.search_indexes import ArticleIndex
+from aldryn_newsblog.utils import autocomplete
+from aldryn_newsblog.utils.cache import get_cache_version
+from aldryn_newsblog.views import ArticleSearchResultsList
 
 from . import TESTS_STATIC_ROOT, NewsBlogTestCase
 
@@ -76,6 +87,12 @@ PARLER_LANGUAGES_SHOW = {
 }
 
 
+class FormPlugin(CMSPluginBase):
+    render_template = 'aldryn_newsblog/dummy/plugins/form.html'
+    # Like the form plugins, rendered on each request.
+    cache = False
+
+
 class TestViews(NewsBlogTestCase):
 
     def test_articles_list(self):
@@ -131,6 +148,19 @@ class TestViews(NewsBlogTestCase):
         for article in articles[2:]:
             self.assertContains(response_page_2, article.title)
 
+    def test_articles_list_exclude_featured_of_section(self):
+        self.app_config.exclude_featured = 1
+        self.app_config.save()
+        article = self.create_article(is_featured=True)
+        # A more recent featured article of another section is not excluded
+        # instead.
+        self.create_article(
+            is_featured=True,
+            app_config=NewsBlogConfig.objects.create(namespace='another'))
+        response = self.client.get(
+            reverse(f'{self.app_config.namespace}:article-list'))
+        self.assertNotContains(response, article.title)
+
     def test_articles_list_pagination(self):
         namespace = self.app_config.namespace
         paginate_by = self.app_config.paginate_by
@@ -222,6 +252,411 @@ class TestViews(NewsBlogTestCase):
             kwargs={'category': 'unknown'}))
         self.assertEqual(response.status_code, 404)
 
+    def test_article_detail_non_permalink_handling(self):
+        article = self.create_article()
+        canonical_url = article.get_absolute_url()
+        # The /year/slug/ pattern resolves the article too.
+        url = reverse(f'{self.app_config.namespace}:article-detail', kwargs={
+            'year': article.publishing_date.year, 'slug': article.slug})
+        get_absolute_urls = Article.get_absolute_urls
+        for handling, status_code, url_calls in (
+                (302, 302, 1), (301, 301, 1), (404, 404, 1), (200, 200, 0)):
+            self.app_config.non_permalink_handling = handling
+            self.app_config.save()
+            with mock.patch.object(
+                    Article, 'get_absolute_urls', autospec=True,
+                    side_effect=get_absolute_urls) as mocked:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, status_code)
+            if status_code in (301, 302):
+                self.assertEqual(response['Location'], canonical_url)
+            # The URLs are resolved once, if they are needed at all.
+            self.assertEqual(mocked.call_count, url_calls)
+
+    def test_article_detail_shares_article(self):
+        serial = Serial.objects.create(name='serial')
+        article = self.create_article(serial=serial, episode=1)
+        related = self.create_article(serial=serial, episode=2)
+        article.related.add(related)
+        api.add_plugin(article.content, 'NewsBlogRelatedPlugin', self.language)
+        api.add_plugin(
+            article.content, 'NewsBlogSerialEpisodesPlugin', self.language)
+        self.client.force_login(
+            self.create_user(is_staff=True, is_superuser=True))
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                article.get_absolute_url(), {'toolbar_on': ''})
+        self.assertContains(response, related.title)
+        self.assertContains(response, 'Edit this article')
+        slug_lookups = [
+            query for query in queries.captured_queries
+            if f'"slug" = \'{article.slug}\'' in query['sql']]
+        self.assertEqual(len(slug_lookups), 1)
+
+
+class TestSearchResults(NewsBlogTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.url = reverse(f'{self.app_config.namespace}:article-search')
+        self.articles = [
+            self.create_article(title=f'needle {i}', slug=f'needle-{i}')
+            for i in range(5)]
+        self.other = self.create_article(title='haystack', slug='haystack')
+
+    def test_search_results(self):
+        response = self.client.get(self.url, {'q': 'needle'})
+        for article in self.articles:
+            self.assertContains(response, article.title)
+        self.assertNotContains(response, self.other.title)
+        self.assertEqual(response.context['result_count'], 5)
+        self.assertFalse(response.context['result_count_capped'])
+        self.assertContains(response, '5 results')
+
+    def test_search_results_count_is_capped(self):
+        with mock.patch.object(ArticleSearchResultsList, 'count_limit', 3):
+            response = self.client.get(
+                self.url, {'q': 'needle', 'max_articles': 2})
+        self.assertEqual(response.context['result_count'], 3)
+        self.assertTrue(response.context['result_count_capped'])
+        self.assertContains(response, '3+ results')
+        self.assertEqual(len(response.context['object_list']), 2)
+
+    def test_search_results_partial(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                self.url, {'q': 'needle', 'max_articles': 2},
+                HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        self.assertTemplateUsed(
+            response, 'aldryn_newsblog/includes/search_results.html')
+        self.assertEqual(len(response.context['object_list']), 2)
+        self.assertNotIn('result_count', response.context)
+        self.assertFalse(any(
+            'COUNT(' in query['sql'] and 'aldryn_newsblog_article' in query['sql']
+            for query in queries.captured_queries))
+
+
+class TestArticleApi(NewsBlogTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.list_url = reverse(f'{self.app_config.namespace}:api-article-list')
+        self.articles = [
+            self.create_article(
+                publishing_date=datetime(2024, 1, day, 12, tzinfo=timezone.utc))
+            for day in (1, 2, 3)
+        ]
+        self.create_article(is_published=False)
+        self.create_article(
+            app_config=NewsBlogConfig.objects.create(namespace='another'))
+
+    def get_ids(self, response):
+        return [result['id'] for result in response.json()['results']]
+
+    def count_article_queries(self, queries):
+        return len([
+            query for query in queries.captured_queries
+            if 'aldryn_newsblog_article' in query['sql']])
+
+    def test_list_is_paginated_by_cursor(self):
+        response = self.client.get(
+            self.list_url, {'limit': 2, 'fields': 'id,title'})
+        self.assertEqual(response.json()['results'], [
+            {'id': article.pk, 'title': article.title}
+            for article in self.articles[:0:-1]])
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(response.json()['next'])
+        # The latest date, the articles and their translations.
+        self.assertEqual(self.count_article_queries(queries), 3)
+        self.assertEqual(self.get_ids(response), [self.articles[0].pk])
+        self.assertIsNone(response.json()['next'])
+
+        self.assertEqual(self.client.get(
+            self.list_url, {'fields': 'id,secret'}).status_code, 400)
+        self.assertEqual(self.client.get(
+            self.list_url, {'cursor': 'nonsense'}).status_code, 400)
+
+    def test_list_filters(self):
+        first, second, third = self.articles
+        first.tags.add('sport')
+        second.categories.add(self.category1)
+        category_slug = self.category1.safe_translation_getter('slug')
+        author_slug = third.author.safe_translation_getter('slug')
+        for params, articles in [
+                ({'tag': 'sport'}, [first]),
+                ({'category': category_slug}, [second]),
+                ({'author': author_slug}, [third]),
+                ({'date_from': '2024-01-02'}, [third, second]),
+                ({'date_from': '2024-01-02', 'date_to': '2024-01-02'}, [second]),
+        ]:
+            self.assertEqual(
+                self.get_ids(self.client.get(self.list_url, params)),
+                [article.pk for article in articles])
+        self.assertEqual(self.client.get(
+            self.list_url, {'date_to': 'yesterday'}).status_code, 400)
+
+    def test_detail_conditional_requests(self):
+        article = self.articles[0]
+        url = reverse(
+            f'{self.app_config.namespace}:api-article-detail',
+            kwargs={'pk': article.pk})
+        response = self.client.get(url)
+        self.assertEqual(response.json()['url'], article.get_absolute_url())
+        self.assertEqual(response.json()['author']['id'], article.author_id)
+        etag = response['ETag']
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(self.count_article_queries(queries), 1)
+
+        article.title = 'New title'
+        article.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['title'], 'New title')
+
+        unpublished = Article.objects.filter(is_published=False).get()
+        self.assertEqual(self.client.get(reverse(
+            f'{self.app_config.namespace}:api-article-detail',
+            kwargs={'pk': unpublished.pk})).status_code, 404)
+
+    def test_facets(self):
+        self.articles[0].tags.add('sport')
+        self.articles[1].tags.add('sport', 'weather')
+        self.create_article(is_published=False).tags.add('weather', 'draft')
+        response = self.client.get(
+            reverse(f'{self.app_config.namespace}:api-facets'),
+            {'fields': 'tags'})
+        self.assertEqual(
+            [(tag['name'], tag['count']) for tag in response.json()['tags']],
+            [('sport', 2), ('weather', 1)])
+
+    def test_etag_follows_the_related_objects(self):
+        article = self.articles[0]
+        article.tags.add('sport')
+        article.categories.add(self.category1)
+        url = reverse(f'{self.app_config.namespace}:api-facets')
+
+        def rename_tag():
+            tag = article.tags.get()
+            tag.name = 'football'
+            tag.save()
+
+        def rename_category():
+            self.category1.name = 'Renamed'
+            self.category1.save()
+
+        def rename_author():
+            article.author.name = 'Renamed'
+            article.author.save()
+
+        for change in (rename_tag, rename_category, rename_author,
+                       article.tags.get().delete):
+            etag = self.client.get(url)['ETag']
+            self.assertEqual(self.client.get(
+                url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+            change()
+            self.assertEqual(self.client.get(
+                url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class TestAutocomplete(NewsBlogTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.url = reverse(
+            f'{self.app_config.namespace}:article-autocomplete')
+
+    def get_titles(self, query):
+        response = self.client.get(self.url, {'q': query})
+        return [result['title'] for result in response.json()['results']]
+
+    def test_autocomplete(self):
+        article = self.create_article(title='Apple pie recipe')
+        self.create_article(title='Banana bread')
+        self.create_article(title='Apple crumble', is_published=False)
+        self.create_article(
+            title='Apple cake',
+            publishing_date=django_timezone_now() + timedelta(days=1))
+        self.create_article(
+            title='Apple strudel',
+            app_config=NewsBlogConfig.objects.create(namespace='another'))
+        response = self.client.get(self.url, {'q': 'app'})
+        self.assertEqual(response.json(), {'results': [{
+            'title': 'Apple pie recipe', 'url': article.get_absolute_url(),
+        }]})
+        self.assertEqual(self.get_titles('REC app'), ['Apple pie recipe'])
+        self.assertEqual(self.get_titles('apple bread'), [])
+        self.assertEqual(self.get_titles(''), [])
+
+    def test_index_is_updated_after_changes(self):
+        article = self.create_article(title='Apple pie')
+        self.assertEqual(self.get_titles('apple'), ['Apple pie'])
+        with self.assertNumQueries(0):
+            autocomplete.lookup(self.app_config.pk, self.language, 'apple')
+        with mock.patch('aldryn_newsblog.utils.autocomplete.build_index') as build:
+            other = self.create_article(title='Apple tart')
+            self.assertEqual(
+                self.get_titles('apple'), ['Apple tart', 'Apple pie'])
+            article.title = 'Cherry pie'
+            article.save()
+            self.assertEqual(self.get_titles('apple'), ['Apple tart'])
+            self.assertEqual(self.get_titles('pie'), ['Cherry pie'])
+            self.assertEqual(self.get_titles('cherry'), ['Cherry pie'])
+            other.is_published = False
+            other.save()
+            self.assertEqual(self.get_titles('apple'), [])
+            article.delete()
+            self.assertEqual(self.get_titles('pie'), [])
+        build.assert_not_called()
+
+    def test_article_moved_to_another_section(self):
+        article = self.create_article(title='Apple pie')
+        another = NewsBlogConfig.objects.create(namespace='another')
+        self.assertEqual(self.get_titles('apple'), ['Apple pie'])
+        article.app_config = another
+        article.save()
+        self.assertEqual(self.get_titles('apple'), [])
+
+    def test_index_is_kept_by_unrelated_changes(self):
+        article = self.create_article(title='Apple pie')
+        self.assertEqual(self.get_titles('apple'), ['Apple pie'])
+        article.lead_in = 'A new lead'
+        article.is_featured = True
+        article.save()
+        with mock.patch('aldryn_newsblog.utils.autocomplete.build_index') as build:
+            self.assertEqual(self.get_titles('pie'), ['Apple pie'])
+        build.assert_not_called()
+
+    def get_lock_key(self):
+        version = get_cache_version('autocomplete', self.app_config.pk)
+        return autocomplete.get_index_key(
+            self.app_config.pk, version, self.language, 'lock')
+
+    def test_index_is_built_once_at_a_time(self):
+        self.create_article(title='Apple pie')
+        lock_key = self.get_lock_key()
+        cache.add(lock_key, True)
+        # Another process is building the index, and there is no other.
+        self.assertEqual(self.get_titles('apple'), [])
+        cache.delete(lock_key)
+        self.assertEqual(self.get_titles('apple'), ['Apple pie'])
+
+        autocomplete.clear_index(self.app_config.pk)
+        lock_key = self.get_lock_key()
+        cache.add(lock_key, True)
+        # The previous index is served while the new one is built.
+        self.assertEqual(self.get_titles('apple'), ['Apple pie'])
+        cache.delete(lock_key)
+
+    def test_index_held_by_another_process_is_invalidated(self):
+        article = self.create_article(title='Apple pie')
+        self.assertEqual(self.get_titles('apple'), ['Apple pie'])
+        cache.add(self.get_lock_key(), True)
+        article.title = 'Cherry pie'
+        with mock.patch.object(autocomplete, 'LOCK_WAIT', 0):
+            article.save()
+        self.assertEqual(self.get_titles('cherry'), ['Cherry pie'])
+
+
+class TestArticleExport(NewsBlogTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.url = reverse(f'{self.app_config.namespace}:article-export')
+
+    def test_export_is_reserved_to_staff(self):
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+        self.client.force_login(self.create_user())
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+    def test_export_streams_the_articles_of_the_section(self):
+        article = self.create_article(is_published=False)
+        self.create_article(
+            app_config=NewsBlogConfig.objects.create(namespace='another'))
+        self.client.force_login(self.create_user(is_staff=True))
+        response = self.client.get(self.url)
+        self.assertTrue(response.streaming)
+        self.assertEqual(
+            response['Content-Disposition'],
+            f'attachment; filename="{self.app_config.namespace}.jsonl"')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual([json.loads(line)['id'] for line in lines], [article.pk])
+
+        response = self.client.get(self.url, {'format': 'csv'})
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        content = b''.join(response.streaming_content).decode()
+        self.assertIn(article.get_absolute_url(), content)
+        self.assertEqual(
+            self.client.get(self.url, {'format': 'xml'}).status_code, 400)
+
+
+class TestResponseCache(NewsBlogTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.app_config.response_cache_duration = 300
+        self.app_config.save()
+
+    def test_article_list_is_cached_until_articles_change(self):
+        article = self.create_article()
+        url = reverse(f'{self.app_config.namespace}:article-list')
+        self.assertContains(self.client.get(url), article.title)
+
+        # Updates bypassing the signals are not seen
+        Article.objects.filter(pk=article.pk).update(is_published=False)
+        self.assertContains(self.client.get(url), article.title)
+
+        # ...but a regular save invalidates the cached responses.
+        article.is_published = False
+        article.save()
+        self.assertNotContains(self.client.get(url), article.title)
+
+    def test_article_detail_is_cached(self):
+        article = self.create_article()
+        url = article.get_absolute_url()
+        self.assertContains(self.client.get(url), article.title)
+        Article.objects.filter(pk=article.pk).update(is_published=False)
+        self.assertContains(self.client.get(url), article.title)
+
+    def test_cache_is_bypassed_for_staff(self):
+        article = self.create_article()
+        url = reverse(f'{self.app_config.namespace}:article-list')
+        self.assertContains(self.client.get(url), article.title)
+        Article.objects.filter(pk=article.pk).update(is_featured=True)
+        article.translations.update(title='changed-title')
+
+        self.client.force_login(self.create_user(is_staff=True))
+        self.assertContains(self.client.get(url), 'changed-title')
+
+    def test_cache_expires_with_scheduled_articles(self):
+        article = self.create_article(
+            publishing_date=django_timezone_now() + timedelta(seconds=1))
+        url = reverse(f'{self.app_config.namespace}:article-list')
+        self.assertNotContains(self.client.get(url), article.title)
+        Article.objects.filter(pk=article.pk).update(
+            publishing_date=django_timezone_now())
+        # The response was not cached, since the scheduled article is due.
+        self.assertContains(self.client.get(url), article.title)
+
+    def test_pages_with_a_csrf_token_are_not_cached(self):
+        plugin_pool.register_plugin(FormPlugin)
+        self.addCleanup(plugin_pool.unregister_plugin, FormPlugin)
+        article = self.create_article()
+        api.add_plugin(article.content, 'FormPlugin', self.language)
+        url = article.get_absolute_url()
+        client = Client(enforce_csrf_checks=True)
+        tokens = set()
+        for i in range(2):
+            response = client.get(url)
+            self.assertContains(response, 'csrfmiddlewaretoken')
+            tokens.add(response.cookies['csrftoken'].value)
+            client.cookies.clear()
+        # Each visitor gets their own token.
+        self.assertEqual(len(tokens), 2)
+        Article.objects.filter(pk=article.pk).update(is_published=False)
+        self.assertEqual(client.get(url).status_code, 404)
+
 
 class TestTemplatePrefixes(NewsBlogTestCase):
 
@@ -2,9 +2,10 @@ from django.urls import path, re_path
 
 from aldryn_newsblog.feeds import CategoryFeed, LatestArticlesFeed, TagFeed
 from aldryn_newsblog.views import (
-    ArticleDetail, ArticleList, ArticleSearchResultsList, AuthorArticleList,
-    CategoryArticleList, DayArticleList, MonthArticleList, TagArticleList,
-    YearArticleList,
+    ArticleApiDetail, ArticleApiFacets, ArticleApiList, ArticleAutocomplete,
+    ArticleDetail, ArticleExport, ArticleList, ArticleSearchResultsList,
+    AuthorArticleList, CategoryArticleList, DayArticleList, MonthArticleList,
+    TagArticleList, YearArticleList,
 )
 
 
@@ -14,6 +15,12 @@ urlpatterns = [
     path('feed/', LatestArticlesFeed(), name='article-list-feed'),
 
     path('search/', ArticleSearchResultsList.as_view(), name='article-search'),
+    path('autocomplete/', ArticleAutocomplete.as_view(), name='article-autocomplete'),
+    path('export/', ArticleExport.as_view(), name='article-export'),
+
+    path('api/articles/', ArticleApiList.as_view(), name='api-article-list'),
+    path('api/articles/<int:pk>/', ArticleApiDetail.as_view(), name='api-article-detail'),
+    path('api/facets/', ArticleApiFacets.as_view(), name='api-facets'),
 
     re_path(r'^author/(?P<author>\w[-\w]*)/$', AuthorArticleList.as_view(), name='article-list-by-author'),
 
@@ -1,4 +1,6 @@
 from .utilities import (  # NOQA
-    add_prefix_to_path, default_reverse, get_cleaned_bits, get_field_value,
-    get_plugin_index_data, get_request, strip_tags,
+    add_prefix_to_path, clear_published_app_configs, default_reverse,
+    get_cleaned_bits, get_current_article, get_field_value,
+    get_plugin_index_data, get_plugins_index_data, get_published_app_configs,
+    get_request, set_current_article, strip_tags,
 )
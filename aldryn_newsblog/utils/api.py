@@ -0,0 +1,181 @@
+"""
+Field selection, serialization and keyset pagination of the read-only JSON
+API of the sections. The articles are paginated by (publishing_date, pk),
+from the latest, with an opaque cursor rather than a page number, so that
+deep pages cost as little as the first one.
+"""
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import datetime, time, timedelta
+
+from django.db.models import Q
+from django.utils.dateparse import parse_date, parse_datetime
+from django.utils.timezone import is_naive, make_aware
+
+
+# The fields of the articles, and the relations to load for them.
+ARTICLE_FIELDS = {
+    'id': (),
+    'url': (),
+    'title': (),
+    'slug': (),
+    'lead_in': (),
+    'meta_title': (),
+    'meta_description': (),
+    'publishing_date': (),
+    'modified_at': (),
+    'is_featured': (),
+    'featured_image': (),
+    'author': ('author__translations',),
+    'categories': ('categories__translations',),
+    'tags': ('tags',),
+}
+
+LIST_FIELDS = (
+    'id', 'url', 'title', 'lead_in', 'publishing_date', 'author',
+    'categories', 'tags',
+)
+
+FACETS = ('tags', 'categories', 'authors')
+
+
+def get_fields(value, default, allowed):
+    """
+    Returns the fields selected by the comma-separated value, or the default
+    ones if it is empty. Raises ValueError for unknown fields.
+    """
+    if not value:
+        return list(default)
+    fields = [field.strip() for field in value.split(',') if field.strip()]
+    unknown = [field for field in fields if field not in allowed]
+    if unknown:
+        raise ValueError(f'Unknown fields: {", ".join(unknown)}.')
+    return list(dict.fromkeys(fields))
+
+
+def get_prefetches(fields):
+    return [
+        lookup for field in fields for lookup in ARTICLE_FIELDS[field]]
+
+
+def parse_date_bound(value, end=False):
+    """
+    Returns the datetime of the ISO date or datetime value. A date is the
+    start of the day, or the start of the next day if ``end`` is True, so
+    that the range includes the whole day. Raises ValueError if invalid.
+    """
+    value = value.strip()
+    try:
+        # parse_datetime() accepts a bare date too, as its midnight.
+        day = parse_date(value)
+    except ValueError:
+        day = None
+    if day is not None:
+        if end:
+            day += timedelta(days=1)
+        moment = datetime.combine(day, time())
+    else:
+        moment = parse_datetime(value)
+        if moment is None:
+            raise ValueError(f'Invalid date: {value}.')
+    if is_naive(moment):
+        moment = make_aware(moment)
+    return moment
+
+
+def encode_cursor(article):
+    value = f'{article.publishing_date.isoformat()}|{article.pk}'
+    return urlsafe_b64encode(value.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    Returns the (publishing_date, pk) of the cursor. Raises ValueError if it
+    is invalid.
+    """
+    try:
+        value = urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        publishing_date, pk = value.split('|')
+        publishing_date = parse_datetime(publishing_date)
+        pk = int(pk)
+    except (TypeError, ValueError, UnicodeDecodeError):
+        publishing_date = None
+    if publishing_date is None:
+        raise ValueError('Invalid cursor.')
+    return publishing_date, pk
+
+
+def paginate(queryset, cursor=None, limit=10):
+    """
+    Returns the page of the articles of the queryset after the cursor, from
+    the latest, and the cursor of the next page or None.
+    """
+    queryset = queryset.order_by('-publishing_date', '-pk')
+    if cursor:
+        publishing_date, pk = decode_cursor(cursor)
+        queryset = queryset.filter(
+            Q(publishing_date__lt=publishing_date) |  # noqa: W504
+            Q(publishing_date=publishing_date, pk__lt=pk))
+    articles = list(queryset[:limit + 1])
+    if len(articles) > limit:
+        return articles[:limit], encode_cursor(articles[limit - 1])
+    return articles, None
+
+
+def serialize_person(person):
+    if person is None:
+        return None
+    return {
+        'id': person.pk,
+        'name': person.safe_translation_getter(
+            'name', default='', any_language=True),
+        'slug': person.safe_translation_getter(
+            'slug', default='', any_language=True),
+    }
+
+
+def serialize_category(category):
+    return {
+        'id': category.pk,
+        'name': category.safe_translation_getter(
+            'name', default='', any_language=True),
+        'slug': category.safe_translation_getter(
+            'slug', default='', any_language=True),
+    }
+
+
+def serialize_tag(tag):
+    return {'id': tag.pk, 'name': tag.name, 'slug': tag.slug}
+
+
+def serialize_article(article, fields, language):
+    """
+    Returns a dict of the selected fields of the article, translated in the
+    language (or its fallbacks).
+    """
+    data = {}
+    for field in fields:
+        if field == 'id':
+            data[field] = article.pk
+        elif field == 'url':
+            data[field] = article.get_absolute_url(language)
+        elif field in ('publishing_date', 'modified_at', 'is_featured'):
+            data[field] = getattr(article, field)
+        elif field == 'featured_image':
+            image = article.featured_image
+            data[field] = image.url if image else None
+        elif field == 'author':
+            data[field] = serialize_person(article.author)
+        elif field == 'categories':
+            data[field] = [
+                serialize_category(category)
+                for category in article.categories.all()]
+        elif field == 'tags':
+            data[field] = [serialize_tag(tag) for tag in article.tags.all()]
+        else:
+            data[field] = article.safe_translation_getter(
+                field, default='', language_code=language)
+    return data
+
+
+def serialize_facet(obj, serializer):
+    return dict(serializer(obj), count=obj.article_count)
@@ -0,0 +1,309 @@
+"""
+A compact prefix index of the article titles of a section per language, used
+by the autocomplete view. The index is kept in the Django cache, split in one
+shard per first character of the title words so that a lookup only loads the
+shards of its words. It is built on first use and then updated article by
+article as they are saved, with a finite timeout. While an invalidated index
+is rebuilt, the lookups are served from the last complete one.
+"""
+import time
+from bisect import bisect_left, insort
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.timezone import now
+
+from .cache import bump_cache_version, get_cache_key, get_cache_version
+
+
+# The number of seconds a build or an update of the index may take before
+# another process may take it over.
+LOCK_TIMEOUT = 60
+
+# How many times, and how many seconds apart, an update tries to take the
+# lock of an index held by another process before invalidating it.
+LOCK_ATTEMPTS = 20
+LOCK_WAIT = 0.05
+
+# The entries of the articles are stored in this many shards by primary key.
+ENTRY_SHARDS = 16
+
+EMPTY_SHARD = {'words': [], 'articles': {}}
+
+
+def get_timeout():
+    return getattr(settings, 'ALDRYN_NEWSBLOG_AUTOCOMPLETE_TIMEOUT', 60 * 60)
+
+
+def normalize(value):
+    return value.casefold()
+
+
+def get_words(title):
+    return sorted(set(normalize(title).split()))
+
+
+def get_index_key(app_config_id, version, language, *names):
+    return get_cache_key(
+        'autocomplete', app_config_id, version, language, *names)
+
+
+def get_built_key(app_config_id, language):
+    # The version of the last complete index of the section in the language.
+    return get_cache_key('autocomplete', app_config_id, 'built', language)
+
+
+def acquire_lock(key, attempts=1):
+    for attempt in range(attempts):
+        if cache.add(key, True, LOCK_TIMEOUT):
+            return True
+        if attempt + 1 < attempts:
+            time.sleep(LOCK_WAIT)
+    return False
+
+
+def get_entry(article, language):
+    """
+    Returns the index entry (publishing timestamp, title, url) of the
+    article in the language, or None if it is not listed.
+    """
+    if not (article.is_published and article.has_translation(language)):
+        return None
+    title = article.safe_translation_getter(
+        'title', language_code=language, default=None)
+    if not title:
+        return None
+    return (
+        article.publishing_date.timestamp(),
+        title,
+        article.get_absolute_url(language=language),
+    )
+
+
+def build_index(app_config_id, language):
+    """
+    Returns the index {character: shard} of the published articles of the
+    section in the language. A shard {'words': [(word, pk), ...], 'articles':
+    {pk: entry}} has the sorted words starting with the character.
+    """
+    article_model = apps.get_model('aldryn_newsblog', 'Article')
+    articles = article_model.objects.filter(
+        app_config_id=app_config_id, is_published=True,
+    ).translated(language).distinct().select_related(
+        'app_config').prefetch_related('translations')
+    index = {}
+    for article in articles:
+        entry = get_entry(article, language)
+        if entry is None:
+            continue
+        for word in get_words(entry[1]):
+            shard = index.setdefault(word[0], {'words': [], 'articles': {}})
+            shard['words'].append((word, article.pk))
+            shard['articles'][article.pk] = entry
+    for shard in index.values():
+        shard['words'].sort()
+    return index
+
+
+def load_shards(app_config_id, version, language, characters):
+    """
+    Returns the list of the characters of the stored index of the version and
+    its shards {character: shard} for the given characters, or (None, None)
+    if the index is missing or partly evicted.
+    """
+    # The list of the characters of the shards, stored after them.
+    manifest_key = get_index_key(app_config_id, version, language, 'shards')
+    keys = {
+        character: get_index_key(
+            app_config_id, version, language, ord(character))
+        for character in characters
+    }
+    cached = cache.get_many([manifest_key, *keys.values()])
+    manifest = cached.get(manifest_key)
+    if manifest is None or any(
+            key not in cached and character in manifest
+            for character, key in keys.items()):
+        return None, None
+    return manifest, {
+        character: cached.get(key, EMPTY_SHARD)
+        for character, key in keys.items()
+    }
+
+
+def store_index(app_config_id, version, language, index):
+    entries = [{} for __ in range(ENTRY_SHARDS)]
+    for shard in index.values():
+        for pk, entry in shard['articles'].items():
+            entries[pk % ENTRY_SHARDS][pk] = entry
+    values = {
+        get_index_key(app_config_id, version, language, ord(character)): shard
+        for character, shard in index.items()
+    }
+    # The entries are read by the updates, to find the words of an article.
+    values.update({
+        get_index_key(app_config_id, version, language, 'entries', number):
+            shard
+        for number, shard in enumerate(entries)
+    })
+    timeout = get_timeout()
+    cache.set_many(values, timeout)
+    cache.set(
+        get_index_key(app_config_id, version, language, 'shards'),
+        set(index), timeout)
+    cache.set(get_built_key(app_config_id, language), version, timeout)
+
+
+def get_shards(app_config_id, language, characters):
+    """
+    Returns the shards {character: shard} of the index of the section in the
+    language for the given characters. A missing index is built by a single
+    process at a time, the others get the shards of the last complete index
+    meanwhile, or empty shards if there is none.
+    """
+    version = get_cache_version('autocomplete', app_config_id)
+    manifest, shards = load_shards(
+        app_config_id, version, language, characters)
+    if manifest is not None:
+        return shards
+
+    lock_key = get_index_key(app_config_id, version, language, 'lock')
+    if acquire_lock(lock_key):
+        try:
+            index = build_index(app_config_id, language)
+            store_index(app_config_id, version, language, index)
+        finally:
+            cache.delete(lock_key)
+        return {
+            character: index.get(character, EMPTY_SHARD)
+            for character in characters
+        }
+
+    built = cache.get(get_built_key(app_config_id, language))
+    if built is not None and built != version:
+        manifest, shards = load_shards(
+            app_config_id, built, language, characters)
+        if manifest is not None:
+            return shards
+    return {character: EMPTY_SHARD for character in characters}
+
+
+def update_entry(app_config_id, language, article, deleted=False):
+    """
+    Updates the entry of the article in the index of the section in the
+    language, if it is built. The index is invalidated instead if it is held
+    by another process for too long, or partly evicted.
+    """
+    version = get_cache_version('autocomplete', app_config_id)
+    lock_key = get_index_key(app_config_id, version, language, 'lock')
+    if not acquire_lock(lock_key, LOCK_ATTEMPTS):
+        clear_index(app_config_id)
+        return
+    try:
+        manifest = cache.get(
+            get_index_key(app_config_id, version, language, 'shards'))
+        if manifest is None:
+            # The index is built with the article on next use.
+            return
+        entries_key = get_index_key(
+            app_config_id, version, language, 'entries',
+            article.pk % ENTRY_SHARDS)
+        entries = cache.get(entries_key)
+        if entries is None:
+            clear_index(app_config_id)
+            return
+        old = entries.get(article.pk)
+        new = None
+        if not deleted and article.app_config_id == app_config_id:
+            new = get_entry(article, language)
+        if new == old:
+            return
+        old_words = get_words(old[1]) if old else []
+        new_words = get_words(new[1]) if new else []
+        manifest, shards = load_shards(
+            app_config_id, version, language,
+            {word[0] for word in old_words + new_words})
+        if manifest is None:
+            clear_index(app_config_id)
+            return
+
+        for word in old_words:
+            shard = shards[word[0]]
+            position = bisect_left(shard['words'], (word, article.pk))
+            if shard['words'][position:position + 1] == [(word, article.pk)]:
+                del shard['words'][position]
+            shard['articles'].pop(article.pk, None)
+        for word in new_words:
+            shard = shards[word[0]]
+            if shard is EMPTY_SHARD:
+                shard = shards[word[0]] = {'words': [], 'articles': {}}
+            insort(shard['words'], (word, article.pk))
+            shard['articles'][article.pk] = new
+        if new is None:
+            del entries[article.pk]
+        else:
+            entries[article.pk] = new
+
+        values = {
+            get_index_key(app_config_id, version, language, ord(character)):
+                shard
+            for character, shard in shards.items()
+        }
+        values[entries_key] = entries
+        timeout = get_timeout()
+        cache.set_many(values, timeout)
+        if not manifest.issuperset(shards):
+            cache.set(
+                get_index_key(app_config_id, version, language, 'shards'),
+                manifest | set(shards), timeout)
+    finally:
+        cache.delete(lock_key)
+
+
+def update_article(article, app_config_ids, languages=None, deleted=False):
+    """
+    Updates the entries of the article in the indexes of the sections, in the
+    given languages or all of them.
+    """
+    if languages is None:
+        languages = [language for language, __ in settings.LANGUAGES]
+    for app_config_id in app_config_ids:
+        for language in languages:
+            update_entry(app_config_id, language, article, deleted)
+
+
+def clear_index(app_config_id):
+    """
+    Invalidates the indexes of the section, which are rebuilt on next use.
+    """
+    bump_cache_version('autocomplete', app_config_id)
+
+
+def lookup(app_config_id, language, query, limit=10):
+    """
+    Returns a list of (title, url) of the latest published articles of the
+    section whose title has words starting with every word of the query.
+    """
+    terms = normalize(query).split()
+    if not terms:
+        return []
+    shards = get_shards(app_config_id, language, {term[0] for term in terms})
+    matches = None
+    for term in terms:
+        words = shards[term[0]]['words']
+        pks = set()
+        position = bisect_left(words, (term,))
+        while position < len(words) and words[position][0].startswith(term):
+            pks.add(words[position][1])
+            position += 1
+        matches = pks if matches is None else matches & pks
+        if not matches:
+            return []
+    # The matching articles are in the shards of all the terms.
+    articles = shards[terms[0][0]]['articles']
+    timestamp = now().timestamp()
+    entries = [
+        articles[pk] for pk in matches if articles[pk][0] <= timestamp
+    ]
+    entries.sort(key=lambda entry: entry[0], reverse=True)
+    return [(title, url) for __, title, url in entries[:limit]]
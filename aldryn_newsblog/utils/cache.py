@@ -0,0 +1,44 @@
+from uuid import uuid4
+
+from django.core.cache import cache
+
+
+CACHE_PREFIX = 'aldryn_newsblog'
+
+
+def get_cache_key(*bits):
+    """
+    Returns a cache key of the given bits, prefixed with the app name.
+    """
+    return ':'.join([CACHE_PREFIX] + [str(bit) for bit in bits])
+
+
+def get_cache_version(*bits):
+    """
+    Returns the current cache version of the given scope, e.g. ('serial', 1).
+    Keys containing the version are invalidated at once by
+    bump_cache_version().
+
+    The version is a random token rather than a counter, so an evicted
+    version never brings back stale entries.
+    """
+    key = get_cache_key('version', *bits)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, uuid4().hex, None)
+        version = cache.get(key)
+    return version
+
+
+def bump_cache_version(*bits):
+    """Invalidates all cache entries of the given scope."""
+    cache.set(get_cache_key('version', *bits), uuid4().hex, None)
+
+
+def get_section_version(app_config_id):
+    return get_cache_version('section', app_config_id)
+
+
+def bump_section_version(app_config_id):
+    """Invalidates all cache entries of the section."""
+    bump_cache_version('section', app_config_id)
@@ -0,0 +1,223 @@
+"""
+Streaming export of articles as JSON Lines or CSV. The articles are read with
+values queries in batches, with one query per batch for their translations,
+tags, categories and authors, and their urls are built from one url template
+per section and language rather than one reverse() per article.
+"""
+import csv
+import json
+from collections import defaultdict
+from itertools import islice
+
+from django.apps import apps
+from django.contrib.contenttypes.models import ContentType
+from django.core.serializers.json import DjangoJSONEncoder
+from django.urls import NoReverseMatch, reverse
+from django.utils.translation import override
+
+from taggit.models import TaggedItem
+
+
+FORMATS = {
+    'jsonl': 'application/jsonl; charset=utf-8',
+    'csv': 'text/csv; charset=utf-8',
+}
+
+TRANSLATED_FIELDS = (
+    'title', 'slug', 'lead_in', 'meta_title', 'meta_description',
+    'meta_keywords',
+)
+
+CSV_COLUMNS = (
+    'id', 'section', 'language', 'title', 'slug', 'url', 'lead_in',
+    'meta_title', 'meta_description', 'meta_keywords', 'publishing_date',
+    'modified_at', 'is_published', 'is_featured', 'author', 'author_name', 'owner', 'tags',
+    'categories',
+)
+
+# The values of the url kwargs the url templates are reversed with.
+MARKERS = {
+    'year': 1970, 'month': '01', 'day': '01', 'pk': 1, 'slug': 'slug',
+}
+
+
+class UrlBuilder:
+    """
+    Builds the urls of articles from their values as get_absolute_url() does,
+    with one reverse() per section, language and set of url kwargs.
+    """
+
+    def __init__(self):
+        self.templates = {}
+
+    def get_template(self, namespace, language, names):
+        """
+        Returns the url template, e.g. "/en/news/{year}/{slug}/", of the
+        article-detail url of the section with the given kwargs, or None if
+        it cannot be reversed.
+        """
+        kwargs = {name: MARKERS[name] for name in names}
+        with override(language):
+            try:
+                prefix = reverse(f'{namespace}:article-list')
+                url = reverse(f'{namespace}:article-detail', kwargs=kwargs)
+            except NoReverseMatch:
+                return None
+        segments = url[len(prefix):].strip('/').split('/')
+        if not url.startswith(prefix):
+            segments = None
+        if segments != [str(value) for value in kwargs.values()]:
+            # An unexpected url pattern: reverse the urls one by one.
+            return False
+        return prefix + ''.join(f'{{{name}}}/' for name in names)
+
+    def build(self, namespace, permalink_type, language, publishing_date, pk,
+              slug):
+        article_model = apps.get_model('aldryn_newsblog', 'Article')
+        kwargs = article_model.get_permalink_kwargs(
+            permalink_type, publishing_date, pk, slug)
+        key = (namespace, language, tuple(kwargs))
+        if key not in self.templates:
+            self.templates[key] = self.get_template(
+                namespace, language, list(kwargs))
+        template = self.templates[key]
+        if template is None:
+            return None
+        if template is False:
+            with override(language):
+                try:
+                    return reverse(
+                        f'{namespace}:article-detail', kwargs=kwargs)
+                except NoReverseMatch:
+                    return None
+        return template.format(**kwargs)
+
+
+def get_fallback_slug(translations, language):
+    """
+    Returns the slug get_absolute_url() falls back to for a missing language.
+    """
+    if translations.get(language, {}).get('slug'):
+        return translations[language]['slug']
+    return next((
+        translation['slug'] for translation in translations.values()
+        if translation['slug']), None)
+
+
+def iter_articles(queryset, languages=None, chunk_size=500):
+    """
+    Yields a dict per article of the queryset, with its translations in the
+    given languages (all by default), tags, categories, author and urls.
+    """
+    article_model = apps.get_model('aldryn_newsblog', 'Article')
+    translation_model = article_model._parler_meta.root_model
+    person_model = article_model._meta.get_field('author').related_model
+    content_type = ContentType.objects.get_for_model(article_model)
+    builder = UrlBuilder()
+
+    rows = queryset.order_by('pk').values(
+        'pk', 'app_config__namespace', 'app_config__permalink_type',
+        'publishing_date', 'modified_at', 'is_published', 'is_featured',
+        'author_id', 'owner__username',
+    ).iterator(chunk_size=chunk_size)
+    while True:
+        batch = list(islice(rows, chunk_size))
+        if not batch:
+            return
+        pks = [row['pk'] for row in batch]
+
+        translations = defaultdict(dict)
+        qs = translation_model.objects.filter(master_id__in=pks)
+        if languages:
+            qs = qs.filter(language_code__in=languages)
+        for translation in qs.order_by('language_code').values(
+                'master_id', 'language_code', *TRANSLATED_FIELDS):
+            translations[translation.pop('master_id')][
+                translation.pop('language_code')] = translation
+
+        tags = defaultdict(list)
+        for object_id, name in TaggedItem.objects.filter(
+                content_type=content_type, object_id__in=pks,
+        ).order_by('tag__name').values_list('object_id', 'tag__name'):
+            tags[object_id].append(name)
+
+        categories = defaultdict(list)
+        for article_id, category_id in article_model.categories.through.objects.filter(
+                article_id__in=pks,
+        ).order_by('category_id').values_list('article_id', 'category_id'):
+            categories[article_id].append(category_id)
+
+        authors = defaultdict(dict)
+        for master_id, language, name in person_model._parler_meta.root_model.objects.filter(
+                master_id__in={row['author_id'] for row in batch},
+        ).values_list('master_id', 'language_code', 'name'):
+            authors[master_id][language] = name
+
+        for row in batch:
+            article_translations = translations[row['pk']]
+            for language, translation in article_translations.items():
+                translation['url'] = builder.build(
+                    row['app_config__namespace'],
+                    row['app_config__permalink_type'], language,
+                    row['publishing_date'], row['pk'],
+                    get_fallback_slug(article_translations, language))
+                names = authors.get(row['author_id'], {})
+                translation['author_name'] = names.get(
+                    language, next(iter(names.values()), None))
+            yield {
+                'id': row['pk'],
+                'section': row['app_config__namespace'],
+                'publishing_date': row['publishing_date'],
+                'modified_at': row['modified_at'],
+                'is_published': row['is_published'],
+                'is_featured': row['is_featured'],
+                'author': row['author_id'],
+                'owner': row['owner__username'],
+                'tags': tags[row['pk']],
+                'categories': categories[row['pk']],
+                'translations': article_translations,
+            }
+
+
+class Echo:
+    """
+    A file-like object returning what is written to it, for csv.writer().
+    """
+
+    def write(self, value):
+        return value
+
+
+def get_jsonl_lines(articles):
+    for article in articles:
+        yield json.dumps(article, cls=DjangoJSONEncoder) + '\n'
+
+
+def get_csv_lines(articles):
+    """
+    Yields the CSV lines of the articles, one per article translation.
+    """
+    writer = csv.writer(Echo())
+    yield writer.writerow(CSV_COLUMNS)
+    for article in articles:
+        for language, translation in article['translations'].items():
+            values = dict(
+                article, language=language,
+                publishing_date=article['publishing_date'].isoformat(),
+                modified_at=article['modified_at'].isoformat(),
+                tags=', '.join(article['tags']),
+                categories=', '.join(map(str, article['categories'])),
+                **translation)
+            yield writer.writerow([values[name] for name in CSV_COLUMNS])
+
+
+def get_lines(queryset, output_format='jsonl', languages=None,
+              chunk_size=500):
+    """
+    Returns a generator of the lines of the export of the articles of the
+    queryset in the format.
+    """
+    articles = iter_articles(queryset, languages, chunk_size)
+    if output_format == 'csv':
+        return get_csv_lines(articles)
+    return get_jsonl_lines(articles)
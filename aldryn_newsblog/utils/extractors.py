@@ -0,0 +1,51 @@
+"""
+Text extractors of the plugins indexed in the search data of the articles,
+by plugin type. An extractor takes a plugin instance and returns the values
+to index, so that the plugin does not have to be rendered.
+"""
+from collections import Counter
+
+
+extractors = {}
+
+# The number of plugins indexed by rendering them, by plugin type.
+render_fallbacks = Counter()
+
+
+def register_extractor(plugin_type, extractor=None):
+    """
+    Registers the extractor of the plugin type. May be used as a decorator.
+    """
+    if extractor is None:
+        def decorator(extractor):
+            register_extractor(plugin_type, extractor)
+            return extractor
+        return decorator
+    extractors[plugin_type] = extractor
+    return extractor
+
+
+def unregister_extractor(plugin_type):
+    extractors.pop(plugin_type, None)
+
+
+def get_extractor(plugin_type):
+    return extractors.get(plugin_type)
+
+
+def get_fields(*names):
+    """
+    Returns an extractor of the given fields of the plugin. Missing fields
+    are skipped, as they vary between the versions of the plugins.
+    """
+    def extractor(plugin):
+        return [getattr(plugin, name, '') for name in names]
+    return extractor
+
+
+# djangocms-text and djangocms-text-ckeditor
+register_extractor('TextPlugin', get_fields('body'))
+# djangocms-link
+register_extractor('LinkPlugin', get_fields('name'))
+# djangocms-picture
+register_extractor('PicturePlugin', get_fields('caption_text'))
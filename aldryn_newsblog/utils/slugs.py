@@ -0,0 +1,159 @@
+"""
+Allocation of unique article slugs per language. The slugs are looked up with
+one query per batch of slugs, and a slug which is taken gets the index after
+the highest one in use for it, found with one aggregate query, rather than
+probing the candidate slugs one by one.
+"""
+import re
+from collections import defaultdict
+
+from django.apps import apps
+from django.db import IntegrityError, models, transaction
+from django.db.models.functions import Cast, Substr
+from django.utils.encoding import force_str
+
+from slugify import slugify
+
+
+SEPARATOR = '-'
+
+# The number of slugs looked up per query.
+BATCH_SIZE = 100
+
+
+def get_translation_model():
+    return apps.get_model('aldryn_newsblog', 'Article')._parler_meta.root_model
+
+
+def get_max_length():
+    return get_translation_model()._meta.get_field('slug').max_length
+
+
+def get_ideal_slug(title, max_length=None):
+    """
+    Returns the slug of the title, as TranslatedAutoSlugifyMixin builds it.
+    """
+    article_model = apps.get_model('aldryn_newsblog', 'Article')
+    if max_length is None:
+        max_length = get_max_length()
+    slug = ''
+    if title:
+        slug = slugify(
+            force_str(title), max_length=max_length,
+            word_boundary=article_model.word_boundary,
+            save_order=article_model.save_order, separator=SEPARATOR)
+    return (slug or force_str(article_model.slug_default))[:max_length]
+
+
+def get_candidate(slug, idx, max_length):
+    """
+    Returns the slug with the index, e.g. "slug-2", truncated to fit.
+    """
+    if not idx:
+        return slug[:max_length]
+    suffix = f'{SEPARATOR}{idx}'
+    return slug[:max_length - len(suffix)] + suffix
+
+
+def get_taken_slugs(language, slugs, exclude_pks=()):
+    """
+    Returns the set of the given slugs of the language which are taken, but
+    by the excluded articles.
+    """
+    slugs = sorted(set(slugs))
+    taken = set()
+    for start in range(0, len(slugs), BATCH_SIZE):
+        qs = get_translation_model().objects.filter(
+            language_code=language, slug__in=slugs[start:start + BATCH_SIZE])
+        if exclude_pks:
+            qs = qs.exclude(master_id__in=exclude_pks)
+        taken.update(qs.values_list('slug', flat=True))
+    return taken
+
+
+def get_max_index(language, slug, exclude_pks=()):
+    """
+    Returns the highest index of the slugs of the language with the slug and
+    an index, e.g. 3 for "slug-3", or 0 if there is none.
+    """
+    qs = get_translation_model().objects.filter(
+        language_code=language,
+        slug__regex=f'^{re.escape(slug)}{re.escape(SEPARATOR)}[0-9]+$')
+    if exclude_pks:
+        qs = qs.exclude(master_id__in=exclude_pks)
+    start = len(slug) + len(SEPARATOR) + 1
+    return qs.aggregate(index=models.Max(Cast(
+        Substr('slug', start), models.BigIntegerField())))['index'] or 0
+
+
+def allocate_slugs(language, slugs, exclude_pks=(), max_length=None):
+    """
+    Returns a unique slug of the language for each of the given slugs, in
+    order: the slug itself if it is free, or else the slug with the index
+    after the highest one in use, e.g. "slug-3" after "slug-2". The returned
+    slugs are unique among them too.
+    """
+    if max_length is None:
+        max_length = get_max_length()
+    slugs = [slug[:max_length] for slug in slugs]
+    taken = get_taken_slugs(language, slugs, exclude_pks)
+    # The next index to try for each slug.
+    next_index = {}
+    allocated = []
+    for slug in slugs:
+        candidate = slug
+        if slug in taken:
+            if slug not in next_index:
+                next_index[slug] = get_max_index(
+                    language, slug, exclude_pks) + 1
+            while True:
+                candidate = get_candidate(slug, next_index[slug], max_length)
+                next_index[slug] += 1
+                if candidate in taken:
+                    continue
+                # A slug truncated to fit its index may be taken by another
+                # slug, which the highest index does not account for.
+                if (not candidate.startswith(slug) and  # noqa: W504
+                        get_taken_slugs(language, [candidate], exclude_pks)):
+                    continue
+                break
+        taken.add(candidate)
+        allocated.append(candidate)
+    return allocated
+
+
+def assign_slugs(translations):
+    """
+    Sets a unique slug on each of the given new article translations, from
+    its slug or else its title.
+    """
+    by_language = defaultdict(list)
+    for translation in translations:
+        by_language[translation.language_code].append(translation)
+    for language, translations in by_language.items():
+        slugs = allocate_slugs(language, [
+            translation.slug or get_ideal_slug(translation.title)
+            for translation in translations
+        ])
+        for translation, slug in zip(translations, slugs):
+            translation.slug = slug
+
+
+def bulk_create_translations(translations, batch_size=None, attempts=3):
+    """
+    Creates the given new article translations with unique slugs. When a
+    concurrent writer takes one of the slugs first, the slugs are allocated
+    again and the creation is retried, up to the given number of attempts.
+    """
+    ideal_slugs = [translation.slug for translation in translations]
+    for attempt in range(attempts):
+        for translation, slug in zip(translations, ideal_slugs):
+            translation.slug = slug
+        assign_slugs(translations)
+        try:
+            with transaction.atomic():
+                return get_translation_model().objects.bulk_create(
+                    translations, batch_size=batch_size)
+        except IntegrityError:
+            if attempt == attempts - 1:
+                raise
@@ -1,8 +1,14 @@
+from collections import defaultdict
+from functools import lru_cache
+
+from django.apps import apps
 from django.conf import settings
 from django.contrib.auth.models import AnonymousUser
 from django.contrib.sites.models import Site
 from django.contrib.sites.shortcuts import get_current_site
-from django.db import models
+from django.core.cache import cache
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import prefetch_related_objects
 from django.test import RequestFactory
 from django.urls import NoReverseMatch, reverse
 from django.utils import translation
@@ -11,10 +17,15 @@ from django.utils.html import strip_tags as _strip_tags
 from django.utils.text import smart_split
 
 from cms.plugin_rendering import ContentRenderer
+from cms.utils.apphook_reload import get_local_revision
 from cms.utils.i18n import force_language, get_language_object
+from cms.utils.plugins import downcast_plugins
 
 from lxml.html.clean import Cleaner as LxmlCleaner
 
+from . import extractors
+from .cache import bump_cache_version, get_cache_key, get_cache_version
+
 
 def default_reverse(*args, **kwargs):
     """
@@ -52,6 +63,50 @@ def get_request(language=None):
     return request
 
 
+def set_current_article(request, article):
+    """
+    Registers the article displayed by the request, see get_current_article().
+    """
+    request._aldryn_newsblog_article = article
+
+
+def get_current_article(request):
+    """
+    Returns the article displayed by the request, if it is handled by an
+    article detail view, or None.
+
+    The article is registered by ArticleDetail. Before (or without) that, it
+    is looked up once from the URL kwargs and remembered for the request.
+    """
+    if request is None:
+        return None
+    try:
+        return request._aldryn_newsblog_article
+    except AttributeError:
+        pass
+    resolver_match = getattr(request, 'resolver_match', None)
+    if resolver_match is None:
+        # Not resolved yet, nothing to remember.
+        return None
+    article = None
+    namespace = resolver_match.namespace
+    kwargs = resolver_match.kwargs
+    if resolver_match.view_name == f'{namespace}:article-detail':
+        articles = apps.get_model('aldryn_newsblog', 'Article').objects.filter(
+            app_config__namespace=namespace)
+        if 'pk' in kwargs:
+            articles = list(articles.filter(pk=kwargs['pk'])[:2])
+        elif 'slug' in kwargs:
+            articles = list(articles.active_translations(
+                slug=kwargs['slug']).distinct()[:2])
+        else:
+            articles = []
+        if len(articles) == 1:
+            article = articles[0]
+    set_current_article(request, article)
+    return article
+
+
 def strip_tags(value):
     """
     Returns the given HTML with all tags stripped.
@@ -74,28 +129,67 @@ def get_cleaned_bits(data):
     return smart_split(stripped)
 
 
+@lru_cache(maxsize=None)
+def get_field_path(model, path):
+    """
+    Compiles the path of fields (or attributes) from the model, e.g.
+    'picture__default_alt_text'. Returns the steps of the path as a tuple of
+    (name, is_field), and the lookup of the relations it follows, for
+    prefetch_related(), or None.
+    """
+    steps = []
+    relations = []
+    for name in path.split('__'):
+        try:
+            field = model._meta.get_field(name)
+        except (AttributeError, FieldDoesNotExist):
+            # we catch attribute error because model will not always be a
+            # model, specially when going through attributes.
+            steps.append((name, False))
+            model = None
+            continue
+        steps.append((name, True))
+        if field.is_relation and (field.many_to_one or field.one_to_one):
+            if len(relations) == len(steps) - 1:
+                relations.append(name)
+            model = field.related_model
+        else:
+            model = None
+    return tuple(steps), '__'.join(relations) or None
+
+
 def get_field_value(obj, name):
     """
     Given a model instance and a field name (or attribute),
     returns the value of the field or an empty string.
     """
-    fields = name.split('__')
-
-    name = fields[0]
+    steps, __ = get_field_path(type(obj), name)
+    value = obj
+    for name, is_field in steps:
+        if is_field and value is not None:
+            value = getattr(value, name)
+        else:
+            value = getattr(value, name, None) or ''
+    return value
 
-    try:
-        obj._meta.get_field(name)
-    except (AttributeError, models.FieldDoesNotExist):
-        # we catch attribute error because obj will not always be a model
-        # specially when going through multiple relationships.
-        value = getattr(obj, name, None) or ''
-    else:
-        value = getattr(obj, name)
 
-    if len(fields) > 1:
-        remaining = '__'.join(fields[1:])
-        return get_field_value(value, remaining)
-    return value
+def prefetch_search_fields(plugin_instances):
+    """
+    Prefetches the related objects which the search_fields of the given
+    plugin instances follow, at once for all the instances of a model.
+    """
+    instances_by_model = defaultdict(list)
+    for plugin_instance in plugin_instances:
+        if extractors.get_extractor(plugin_instance.plugin_type) is None:
+            instances_by_model[type(plugin_instance)].append(plugin_instance)
+    for model, instances in instances_by_model.items():
+        lookups = {
+            get_field_path(model, field)[1]
+            for field in getattr(model, 'search_fields', [])
+        }
+        lookups.discard(None)
+        if lookups:
+            prefetch_related_objects(instances, *sorted(lookups))
 
 
 def render_plugin(request, plugin_instance):
@@ -104,6 +198,27 @@ def render_plugin(request, plugin_instance):
     return renderer.render_plugin(plugin_instance, context)
 
 
+def is_plugin_fulltext(base_plugin, plugin_instance, plugin_type):
+    """
+    Returns True if the plugin is indexed by rendering it, False if it is
+    indexed by its extractor or from its search_fields.
+    """
+    if extractors.get_extractor(base_plugin.plugin_type) is not None:
+        return False
+    if hasattr(plugin_instance, 'search_fulltext'):
+        # check if the plugin instance has search enabled
+        return plugin_instance.search_fulltext
+    elif hasattr(base_plugin, 'search_fulltext'):
+        # now check in the base plugin instance (CMSPlugin)
+        return base_plugin.search_fulltext
+    elif hasattr(plugin_type, 'search_fulltext'):
+        # last check in the plugin class (CMSPluginBase)
+        return plugin_type.search_fulltext
+    # disabled if there's search fields defined,
+    # otherwise it's enabled.
+    return not bool(getattr(plugin_instance, 'search_fields', []))
+
+
 def get_plugin_index_data(base_plugin, request):
     text_bits = []
 
@@ -113,32 +228,44 @@ def get_plugin_index_data(base_plugin, request):
         # this is an empty plugin
         return text_bits
 
+    extractor = extractors.get_extractor(base_plugin.plugin_type)
     search_fields = getattr(plugin_instance, 'search_fields', [])
 
-    if hasattr(plugin_instance, 'search_fulltext'):
-        # check if the plugin instance has search enabled
-        search_contents = plugin_instance.search_fulltext
-    elif hasattr(base_plugin, 'search_fulltext'):
-        # now check in the base plugin instance (CMSPlugin)
-        search_contents = base_plugin.search_fulltext
-    elif hasattr(plugin_type, 'search_fulltext'):
-        # last check in the plugin class (CMSPluginBase)
-        search_contents = plugin_type.search_fulltext
-    else:
-        # disabled if there's search fields defined,
-        # otherwise it's enabled.
-        search_contents = not bool(search_fields)
-
-    if search_contents:
-        plugin_contents = render_plugin(request, plugin_instance)
-        if plugin_contents:
-            text_bits = get_cleaned_bits(plugin_contents)
+    if extractor is not None:
+        values = extractor(plugin_instance)
+    elif is_plugin_fulltext(base_plugin, plugin_instance, plugin_type):
+        extractors.render_fallbacks[base_plugin.plugin_type] += 1
+        values = [render_plugin(request, plugin_instance)]
     else:
         values = (get_field_value(plugin_instance, field) for field in search_fields)
 
-        for value in values:
-            cleaned_bits = get_cleaned_bits(value or '')
-            text_bits.extend(cleaned_bits)
+    for value in values:
+        cleaned_bits = get_cleaned_bits(value or '')
+        text_bits.extend(cleaned_bits)
+    return text_bits
+
+
+def get_plugins_index_data(plugins, request):
+    """
+    Returns the text bits of the given plugins of a placeholder, ordered by
+    position. The plugins of each type are loaded at once, and the children
+    of a rendered plugin are skipped, as its output includes theirs.
+    """
+    text_bits = []
+    rendered = set()
+    plugins = list(downcast_plugins(plugins.order_by('position')))
+    prefetch_search_fields(plugins)
+    for base_plugin in plugins:
+        if base_plugin.parent_id in rendered:
+            # Parents come first in the order of positions.
+            rendered.add(base_plugin.pk)
+            continue
+        plugin_instance, plugin_type = base_plugin.get_plugin_instance()
+        if plugin_instance is None:
+            continue
+        if is_plugin_fulltext(base_plugin, plugin_instance, plugin_type):
+            rendered.add(base_plugin.pk)
+        text_bits.extend(get_plugin_index_data(base_plugin, request))
     return text_bits
 
 
@@ -164,6 +291,34 @@ def is_valid_namespace(namespace):
     return True
 
 
+def get_published_app_configs():
+    """
+    Returns a list of app_configs that are attached to a published page.
+
+    The list is cached until an app_config is saved or the apphooks change
+    (see clear_published_app_configs()). The cache key contains the URLconf
+    revision of the process, since the result depends on its URL patterns.
+    """
+    key = get_cache_key(
+        'published_configs', get_cache_version('published_configs'),
+        get_local_revision())
+    published_configs = cache.get(key)
+    if published_configs is None:
+        published_configs = []
+        app_config_model = apps.get_model('aldryn_newsblog', 'NewsBlogConfig')
+        for config in app_config_model.objects.iterator():
+            # We don't want to let people try to create Articles here, as
+            # they'll just 404 on arrival because the apphook isn't active.
+            if is_valid_namespace(config.namespace):
+                published_configs.append(config)
+        cache.set(key, published_configs, None)
+    return published_configs
+
+
+def clear_published_app_configs():
+    bump_cache_version('published_configs')
+
+
 def is_valid_namespace_for_language(namespace, language_code):
     """
     Check if provided namespace has an app-hooked page for given language_code.
@@ -1,14 +1,27 @@
+import hashlib
 from datetime import date, datetime
 
-from django.db.models import Q
+from django.conf import settings
+from django.contrib.sites.shortcuts import get_current_site
+from django.core.cache import cache
+from django.core.exceptions import PermissionDenied
+from django.core.paginator import Paginator
+from django.db.models import Max, Q
 from django.http import (
-    Http404, HttpResponsePermanentRedirect, HttpResponseRedirect,
+    Http404, HttpResponseBadRequest, HttpResponsePermanentRedirect,
+    HttpResponseRedirect, JsonResponse, StreamingHttpResponse,
 )
 from django.shortcuts import get_object_or_404
 from django.utils import translation
-from django.views.generic import ListView
+from django.utils.cache import (
+    get_conditional_response, has_vary_header, quote_etag,
+)
+from django.utils.functional import cached_property
+from django.utils.timezone import now
+from django.views.generic import ListView, View
 from django.views.generic.detail import DetailView
 
+from cms.utils.i18n import get_current_language
 from menus.utils import set_language_changer
 
 from aldryn_apphooks_config.mixins import AppConfigMixin
@@ -21,8 +34,11 @@ from taggit.models import Tag
 from aldryn_newsblog.compat import toolbar_edit_mode_active
 from aldryn_newsblog.utils.utilities import get_valid_languages_from_request
 
-from .models import Article
-from .utils import add_prefix_to_path
+from .models import Article, SectionStatistic
+from .utils import (
+    add_prefix_to_path, api, autocomplete, export, set_current_article,
+)
+from .utils.cache import get_cache_key, get_section_version
 
 
 class TemplatePrefixMixin:
@@ -54,6 +70,87 @@ class EditModeMixin:
         return super().dispatch(request, *args, **kwargs)
 
 
+class ResponseCacheMixin:
+    """
+    Caches the rendered responses for anonymous visitors, if enabled by the
+    section's response_cache_duration. Content editors, the toolbar and
+    edit/preview mode always bypass the cache. The entries are invalidated
+    by bumping the section's cache version whenever its articles change and
+    expire when the next scheduled article of the section goes live.
+    """
+    response_cache = True
+
+    def dispatch(self, request, *args, **kwargs):
+        timeout = self.get_response_cache_timeout(request)
+        if not timeout:
+            return super().dispatch(request, *args, **kwargs)
+
+        key = self.get_response_cache_key(request)
+        response = cache.get(key)
+        if response is not None:
+            return response
+
+        def store(response):
+            if self.is_response_cacheable(request, response):
+                cache.set(key, response, timeout)
+
+        response = super().dispatch(request, *args, **kwargs)
+        if hasattr(response, 'render') and callable(response.render):
+            response.add_post_render_callback(store)
+        else:
+            store(response)
+        return response
+
+    def is_response_cacheable(self, request, response):
+        """
+        Returns whether the rendered response is the same for all anonymous
+        visitors. The CSRF middleware only sets its cookie after the view, so
+        a page using the CSRF token (e.g. a form plugin) must not be cached.
+        """
+        if response.status_code != 200 or response.cookies:
+            return False
+        if request.META.get('CSRF_COOKIE_NEEDS_UPDATE'):
+            return False
+        return not has_vary_header(response, 'Cookie')
+
+    def get_response_cache_timeout(self, request):
+        """
+        Returns the number of seconds the response may be cached, or 0 if the
+        cache must be bypassed for this request.
+        """
+        duration = getattr(self.config, 'response_cache_duration', 0)
+        if not (duration and self.response_cache):
+            return 0
+        if request.method not in ('GET', 'HEAD'):
+            return 0
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            return 0
+        toolbar = getattr(request, 'toolbar', None)
+        if toolbar and (getattr(toolbar, 'show_toolbar', False) or  # noqa: W504
+                        toolbar_edit_mode_active(request)):
+            return 0
+        next_publishing_date = Article.objects.filter(
+            app_config=self.config).next_publishing_date()
+        if next_publishing_date is not None:
+            remaining = int((next_publishing_date - now()).total_seconds())
+            duration = max(min(duration, remaining), 0)
+        return duration
+
+    def get_response_cache_key(self, request):
+        path = hashlib.md5(
+            request.get_full_path().encode('utf-8')).hexdigest()
+        return get_cache_key(
+            'response',
+            self.config.pk,
+            get_section_version(self.config.pk),
+            getattr(get_current_site(request), 'id', None),
+            translation.get_language(),
+            request.method,
+            path,
+        )
+
+
 class PreviewModeMixin(EditModeMixin):
     """
     If content editor is logged-in, show all articles. Otherwise, only the
@@ -91,8 +188,9 @@ class AppHookCheckMixin:
         return qs.translated(*self.valid_languages)
 
 
-class ArticleDetail(AppConfigMixin, AppHookCheckMixin, PreviewModeMixin,
-                    TranslatableSlugMixin, TemplatePrefixMixin, DetailView):
+class ArticleDetail(AppConfigMixin, ResponseCacheMixin, AppHookCheckMixin,
+                    PreviewModeMixin, TranslatableSlugMixin,
+                    TemplatePrefixMixin, DetailView):
     model = Article
     slug_field = 'slug'
     year_url_kwarg = 'year'
@@ -108,11 +206,16 @@ class ArticleDetail(AppConfigMixin, AppHookCheckMixin, PreviewModeMixin,
         """
         if not hasattr(self, 'object'):
             self.object = self.get_object()
-        set_language_changer(request, self.object.get_absolute_url)
-        url = self.object.get_absolute_url()
-        if self.config.non_permalink_handling == 200 or request.path == url:
-            # Continue as normal
-            return super().get(request, *args, **kwargs)
+        # The menu system asks for the URLs of the languages it displays only.
+        set_language_changer(request, self.get_article_url)
+        if self.config.non_permalink_handling == 200:
+            url = None
+        else:
+            url = self.get_article_url()
+        if url is None or request.path == url:
+            # Continue as normal, without fetching the article again.
+            context = self.get_context_data(object=self.object)
+            return self.render_to_response(context)
 
         # Check to see if the URL path matches the correct absolute_url of
         # the found object
@@ -126,6 +229,22 @@ class ArticleDetail(AppConfigMixin, AppHookCheckMixin, PreviewModeMixin,
     def post(self, request, *args, **kwargs):
         return self.get(request, *args, **kwargs)
 
+    def get_article_url(self, language=None):
+        """
+        Returns the URL of the article in the language. The URLs of all the
+        languages are resolved together, the first time one is needed.
+        """
+        if not language:
+            language = get_current_language()
+        url = self.object.get_absolute_urls().get(language)
+        if url is None:
+            # Not a language of the site, or no URL: let it raise as usual.
+            url = self.object.get_absolute_url(language)
+        return url
+
+    def get_queryset(self):
+        return super().get_queryset().profile('detail')
+
     def get_object(self, queryset=None):
         """
         Supports ALL of the types of permalinks that we've defined in urls.py.
@@ -140,13 +259,16 @@ class ArticleDetail(AppConfigMixin, AppHookCheckMixin, PreviewModeMixin,
 
         if pk is not None:
             # Let the DetailView itself handle this one
-            return DetailView.get_object(self, queryset=queryset)
+            article = DetailView.get_object(self, queryset=queryset)
         elif slug is not None:
             # Let the TranslatedSlugMixin take over
-            return super().get_object(queryset=queryset)
-
-        raise AttributeError('ArticleDetail view must be called with either '
-                             'an object pk or a slug')
+            article = super().get_object(queryset=queryset)
+        else:
+            raise AttributeError('ArticleDetail view must be called with '
+                                 'either an object pk or a slug')
+        # Share the article with the toolbar and the plugins.
+        set_current_article(self.request, article)
+        return article
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -191,8 +313,9 @@ class ArticleDetail(AppConfigMixin, AppHookCheckMixin, PreviewModeMixin,
             return None
 
 
-class ArticleListBase(AppConfigMixin, AppHookCheckMixin, TemplatePrefixMixin,
-                      PreviewModeMixin, ViewUrlMixin, ListView):
+class ArticleListBase(AppConfigMixin, ResponseCacheMixin, AppHookCheckMixin,
+                      TemplatePrefixMixin, PreviewModeMixin, ViewUrlMixin,
+                      ListView):
     model = Article
     show_header = False
 
@@ -205,6 +328,9 @@ class ArticleListBase(AppConfigMixin, AppHookCheckMixin, TemplatePrefixMixin,
             except AttributeError:
                 return 10  # sensible failsafe
 
+    def get_queryset(self):
+        return super().get_queryset().profile('list')
+
     def get_pagination_options(self):
         # Django does not handle negative numbers well
         # when using variables.
@@ -248,26 +374,59 @@ class ArticleList(ArticleListBase):
         if self.config is not None:
             # exclude featured articles from queryset, to allow featured article
             # plugin on the list view page without duplicate entries in page qs.
-            exclude_count = self.config.exclude_featured
-            if exclude_count:
-                featured_qs = Article.objects.all().filter(is_featured=True)
-                if not self.edit_mode:
-                    featured_qs = featured_qs.published()
-                exclude_featured = featured_qs[:exclude_count].values_list('pk')
-                qs = qs.exclude(pk__in=exclude_featured)
+            featured = Article.objects.get_featured(
+                self.request, self.config, self.valid_languages,
+                self.config.exclude_featured, published=not self.edit_mode)
+            if featured:
+                qs = qs.exclude(pk__in=[article.pk for article in featured])
         return qs
 
 
+class CappedCountPaginator(Paginator):
+    """
+    A paginator which counts the objects up to ``count_limit`` only. Beyond
+    that, ``count`` is ``count_limit`` and ``count_capped`` is True.
+    """
+    def __init__(self, *args, count_limit=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.count_limit = count_limit
+        self.count_capped = False
+
+    @cached_property
+    def count(self):
+        if not self.count_limit:
+            return super().count
+        # Fetches at most count_limit + 1 primary keys instead of counting
+        # all matching rows.
+        count = len(self.object_list.values_list('pk', flat=True)[
+            :self.count_limit + 1])
+        if count > self.count_limit:
+            self.count_capped = True
+            count = self.count_limit
+        return count
+
+
 class ArticleSearchResultsList(ArticleListBase):
     model = Article
+    response_cache = False
     http_method_names = ['get', 'post', ]
     partial_name = 'aldryn_newsblog/includes/search_results.html'
     template_name = 'aldryn_newsblog/article_list.html'
+    paginator_class = CappedCountPaginator
+    # The number of results is counted up to this figure only, e.g.
+    # "1000+ results". Set it to None to count all results.
+    count_limit = getattr(settings, 'ALDRYN_NEWSBLOG_SEARCH_COUNT_LIMIT', 1000)
 
     def get(self, request, *args, **kwargs):
         self.query = request.GET.get('q')
-        self.max_articles = request.GET.get('max_articles', 0)
+        try:
+            self.max_articles = max(
+                int(request.GET.get('max_articles', 0)), 0)
+        except ValueError:
+            self.max_articles = 0
         self.edit_mode = (request.toolbar and toolbar_edit_mode_active(request))
+        self.is_partial = (
+            request.headers.get('x-requested-with') == 'XMLHttpRequest')
         return super().get(request, *args, **kwargs)
 
     def post(self, request, *args, **kwargs):
@@ -276,36 +435,249 @@ class ArticleSearchResultsList(ArticleListBase):
     def get_paginate_by(self, queryset):
         """
         If a max_articles was set (by a plugin), use that figure, else,
-        paginate by the app_config's settings.
+        paginate by the app_config's settings. The partial results of AJAX
+        requests are not paginated, see get_queryset().
         """
-        return self.max_articles or super().get_paginate_by(self.get_queryset())
+        if self.is_partial:
+            return None
+        return self.max_articles or super().get_paginate_by(queryset)
+
+    def get_paginator(self, queryset, per_page, **kwargs):
+        return super().get_paginator(
+            queryset, per_page, count_limit=self.count_limit, **kwargs)
 
     def get_queryset(self):
         qs = super().get_queryset()
         if not self.edit_mode:
             qs = qs.published()
-        if self.query:
-            return qs.filter(
-                Q(translations__title__icontains=self.query) |  # noqa: #W504
-                Q(translations__lead_in__icontains=self.query) |  # noqa: #W504
-                Q(translations__search_data__icontains=self.query)
-            ).distinct()
-        else:
+        if not self.query:
             return qs.none()
+        translations = Article._parler_meta.root_model.objects.filter(
+            Q(title__icontains=self.query) |  # noqa: #W504
+            Q(lead_in__icontains=self.query) |  # noqa: #W504
+            Q(search_data__icontains=self.query)
+        ).values('master_id')
+        qs = qs.filter(pk__in=translations).distinct()
+        if self.is_partial:
+            # Only the top results are displayed, without counting them.
+            qs = qs[:self.max_articles or super().get_paginate_by(qs)]
+        return qs
 
     def get_context_data(self, **kwargs):
         cxt = super().get_context_data(**kwargs)
         cxt['query'] = self.query
+        paginator = cxt.get('paginator')
+        if paginator is not None:
+            cxt['result_count'] = paginator.count
+            cxt['result_count_capped'] = paginator.count_capped
         return cxt
 
     def get_template_names(self):
-        if self.request.is_ajax:
+        if self.is_partial:
             template_names = [self.partial_name]
         else:
             template_names = [self.template_name]
         return self.prefix_template_names(template_names)
 
 
+class ArticleAutocomplete(AppConfigMixin, AppHookCheckMixin, View):
+    """
+    Returns the titles and URLs of the latest published articles whose
+    titles match the query ``q`` word by word, as JSON.
+    """
+    limit = 10
+
+    def get(self, request, *args, **kwargs):
+        query = request.GET.get('q', '')[:100]
+        language = translation.get_language()
+        results = []
+        if self.config is not None and language in self.valid_languages:
+            results = autocomplete.lookup(
+                self.config.pk, language, query, limit=self.limit)
+        return JsonResponse({
+            'results': [{'title': title, 'url': url} for title, url in results],
+        })
+
+
+class ArticleExport(AppConfigMixin, View):
+    """
+    Streams all articles of the section, published or not, as JSON Lines or
+    as CSV with ``format=csv``. Reserved to staff.
+    """
+    chunk_size = 500
+
+    def get(self, request, *args, **kwargs):
+        if not request.user.is_staff:
+            raise PermissionDenied
+        output_format = request.GET.get('format', 'jsonl')
+        if output_format not in export.FORMATS:
+            return HttpResponseBadRequest()
+        response = StreamingHttpResponse(
+            export.get_lines(
+                Article.objects.filter(app_config=self.config),
+                output_format, chunk_size=self.chunk_size),
+            content_type=export.FORMATS[output_format])
+        response['Content-Disposition'] = (
+            f'attachment; filename="{self.namespace}.{output_format}"')
+        return response
+
+
+class ApiViewMixin:
+    """
+    Base of the read-only JSON API of a section. The responses have an ETag
+    derived from the section's cache version and latest publishing date, so
+    that conditional requests are answered without loading any article.
+    """
+    default_fields = ()
+    allowed_fields = ()
+
+    def get_queryset(self):
+        return Article.objects.published().namespace(self.namespace)
+
+    def get(self, request, *args, **kwargs):
+        if self.config is None:
+            raise Http404('No section')
+        etag = self.get_etag(request)
+        if etag is not None:
+            response = get_conditional_response(request, etag=etag)
+            if response is not None:
+                return response
+        try:
+            self.fields = api.get_fields(
+                request.GET.get('fields'), self.default_fields,
+                self.allowed_fields)
+            data = self.get_data(request, *args, **kwargs)
+        except ValueError as e:
+            return JsonResponse({'error': str(e)}, status=400)
+        response = JsonResponse(data)
+        if etag is None:
+            # Without a cache, the version is unknown: hash the content.
+            etag = quote_etag(hashlib.md5(response.content).hexdigest())
+            conditional = get_conditional_response(
+                request, etag=etag, response=response)
+            if conditional is not None:
+                return conditional
+        response['ETag'] = etag
+        return response
+
+    def get_etag(self, request):
+        version = get_section_version(self.config.pk)
+        if version is None:
+            return None
+        # Scheduled articles go live without changing the version.
+        latest = Article.objects.published().namespace(
+            self.namespace).aggregate(latest=Max('publishing_date'))['latest']
+        key = '|'.join(map(str, (
+            version, latest, translation.get_language(),
+            request.get_full_path())))
+        return quote_etag(hashlib.md5(key.encode('utf-8')).hexdigest())
+
+    def get_data(self, request, *args, **kwargs):
+        raise NotImplementedError
+
+
+class ArticleApiList(AppConfigMixin, AppHookCheckMixin, ApiViewMixin, View):
+    """
+    Lists the published articles of the section as JSON, from the latest,
+    filtered by ``category``, ``tag`` and ``author`` (slugs) and by
+    ``date_from`` and ``date_to`` (ISO dates, included). The pages are
+    chained by the ``next`` url, which has the ``cursor`` of the next page.
+    """
+    default_fields = api.LIST_FIELDS
+    allowed_fields = api.ARTICLE_FIELDS
+    max_limit = 100
+
+    def get_queryset(self):
+        qs = super().get_queryset()
+        params = self.request.GET
+        if params.get('category'):
+            qs = qs.filter(pk__in=Article.categories.through.objects.filter(
+                category__translations__slug=params['category'],
+            ).values('article_id'))
+        if params.get('tag'):
+            qs = qs.filter(tags__slug=params['tag'])
+        if params.get('author'):
+            qs = qs.filter(author__in=Person.objects.filter(
+                translations__slug=params['author']))
+        if params.get('date_from'):
+            qs = qs.filter(
+                publishing_date__gte=api.parse_date_bound(params['date_from']))
+        if params.get('date_to'):
+            qs = qs.filter(publishing_date__lt=api.parse_date_bound(
+                params['date_to'], end=True))
+        return qs
+
+    def get_limit(self):
+        try:
+            limit = int(self.request.GET.get('limit', self.config.paginate_by))
+        except ValueError:
+            raise ValueError('Invalid limit.')
+        return min(max(limit, 1), self.max_limit)
+
+    def get_data(self, request, *args, **kwargs):
+        articles, cursor = api.paginate(
+            self.get_queryset().profile('list').prefetch_related(
+                *api.get_prefetches(self.fields)),
+            request.GET.get('cursor'), self.get_limit())
+        language = translation.get_language()
+        next_url = None
+        if cursor is not None:
+            params = request.GET.copy()
+            params['cursor'] = cursor
+            next_url = f'{request.path}?{params.urlencode()}'
+        return {
+            'results': [
+                api.serialize_article(article, self.fields, language)
+                for article in articles],
+            'next': next_url,
+        }
+
+
+class ArticleApiDetail(AppConfigMixin, AppHookCheckMixin, ApiViewMixin, View):
+    """
+    Returns a published article of the section as JSON.
+    """
+    default_fields = api.ARTICLE_FIELDS
+    allowed_fields = api.ARTICLE_FIELDS
+
+    def get_data(self, request, pk, *args, **kwargs):
+        article = self.get_queryset().profile('detail').prefetch_related(
+            *api.get_prefetches(self.fields)).filter(pk=pk).first()
+        if article is None:
+            raise Http404('Article not found')
+        return api.serialize_article(
+            article, self.fields, translation.get_language())
+
+
+class ArticleApiFacets(AppConfigMixin, AppHookCheckMixin, ApiViewMixin, View):
+    """
+    Returns the tags, categories and authors of the published articles of
+    the section as JSON, with their number of articles in all languages.
+    """
+    default_fields = api.FACETS
+    allowed_fields = api.FACETS
+
+    def get_data(self, request, *args, **kwargs):
+        facets = {
+            'tags': (
+                Tag.objects.all(), SectionStatistic.TAG, api.serialize_tag),
+            'categories': (
+                Category.objects.prefetch_related('translations'),
+                SectionStatistic.CATEGORY, api.serialize_category),
+            'authors': (
+                Person.objects.prefetch_related('translations'),
+                SectionStatistic.AUTHOR, api.serialize_person),
+        }
+        data = {}
+        for field in self.fields:
+            queryset, object_type, serializer = facets[field]
+            data[field] = [
+                api.serialize_facet(obj, serializer)
+                for obj in SectionStatistic.objects.annotate_objects(
+                    queryset, self.config, object_type)]
+        return data
+
+
 class AuthorArticleList(ArticleListBase):
     """A list of articles written by a specific author."""
     def get_queryset(self):